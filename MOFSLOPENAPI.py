@@ -1,5 +1,8 @@
 import requests
 from requests import get
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit
 import json
 import os
 from datetime import datetime, timezone
@@ -22,10 +25,12 @@ from struct import *
 # import sys
 # import os
 import time
+import atexit
 # from datetime import datetime 
 import datetime as dt
-from queue import Queue
-from threading import Thread
+from queue import Queue, Empty
+from threading import Lock, Thread
+import numpy as np
 
 
 
@@ -33,66 +38,187 @@ from threading import Thread
 # Api-Version
 version = "V.1.1.0"
 
+# Broadcast response packet: Exchange(1), Scrip(4), Time(4), MsgType(1), Body(20)
+BroadcastFrame_dtype = np.dtype([
+    ("exchange", "S1"),
+    ("scrip", "<i4"),
+    ("time", "<i4"),
+    ("msgtype", "S1"),
+    ("body", "V20"),
+])
+BroadcastHeaderLength = 10
+
+def BroadcastMessage_dtype(f_fields, f_reserved):
+    # Full 30 byte frame of one message type: the header followed by the body fields, named as in
+    # the messages passed to subscribers, and f_reserved unused bytes
+    l_fields = [("exchange", "S1"), ("scrip", "<i4"), ("time", "<i4"), ("msgtype", "S1")] + f_fields
+    if f_reserved:
+        l_fields.append(("reserved", "V%d" % f_reserved))
+    return np.dtype(l_fields)
+
+LTP_dtype = BroadcastMessage_dtype([("LTP_Rate", "<f4"), ("LTP_Qty", "<i4"), ("LTP_Cumulative Qty", "<i4"), ("LTP_AvgTradePrice", "<f4"), ("LTP_Open Interest", "<i4")], 0)
+MarketDepth_dtype = BroadcastMessage_dtype([("BidRate", "<f4"), ("BidQty", "<i4"), ("BidOrder", "<i2"), ("OfferRate", "<f4"), ("OfferQty", "<i4"), ("OfferOrder", "<i2")], 0)
+DayOHLC_dtype = BroadcastMessage_dtype([("Open", "<f4"), ("High", "<f4"), ("Low", "<f4"), ("PrevDayClose", "<f4")], 4)
+DPR_dtype = BroadcastMessage_dtype([("UpperCktLimit", "<f4"), ("LowerCktLimit", "<f4")], 12)
+Index_dtype = BroadcastMessage_dtype([("Rate", "<f4")], 16)
+OpenInterest_dtype = BroadcastMessage_dtype([("Open Interest", "<i4"), ("Open Interest High", "<i4"), ("Open Interest Low", "<i4")], 8)
+
+# Scrip register / unregister request: MsgType, Length, Exchange, ExchangeType, Scrip, AddToList
+RegisterPacket_struct = Struct("=cHcciB")
+
+BroadcastBody_dtype = {
+    "A": LTP_dtype,
+    "B": MarketDepth_dtype,
+    "C": MarketDepth_dtype,
+    "D": MarketDepth_dtype,
+    "E": MarketDepth_dtype,
+    "F": MarketDepth_dtype,
+    "G": DayOHLC_dtype,
+    "W": DPR_dtype,
+    "H": Index_dtype,
+    "m": OpenInterest_dtype,
+}
+
+# Exchange code of the frame header -> exchange name in the messages ("N" is NSE or NSEFO by scrip code)
+BroadcastExchangeNames = {b"B": "BSE", b"M": "MCX", b"D": "NCDEX", b"C": "NSECD", b"G": "BSEFO"}
+# MarketDepth message type -> depth level
+BroadcastDepthLevels = {"B": 1, "C": 2, "D": 3, "E": 4, "F": 5}
+
+# REST connection pool defaults, see MOFSLOPENAPI.ConfigureHttpPool
+HttpPoolConnections = 4         # Number of hosts kept in the pool
+HttpPoolMaxsize = 16            # Keep-alive connections kept per host (concurrent callers)
+HttpConnectTimeout = 5          # Seconds
+HttpReadTimeout = 30            # Seconds
+HttpMaxRetries = 2              # Retries of failed connection attempts only
+HttpRetryBackoff = 0.2          # Seconds, doubled on every retry
+
+# Broadcast time is sent as seconds elapsed since 01-Jan-1980 (local time)
+BroadcastEpoch = datetime(1980, 1, 1, 0, 0, 0).timestamp()
+
 # ErrorLogs
 try:
     os.mkdir('Logs')
 except FileExistsError:
     null = 0
 
-try:   
-    MainPath = os.getcwd()
-    os.chdir('Logs')
-    LogPath = os.getcwd()
-    os.chdir(MainPath)
-except:
-    print('\nError in Assigning Path!!!')
-    sys.exit()
-
-
-def WriteIntoLog(f_status, f_filename, f_message):
-    try:
-        dt = datetime.now()
-        x = dt.strftime("%Y-%m-%d %H:%M:%S")
-        logmessage = str(x) + ("             ") + f_status + ("             ") + f_filename + ("             ") + f_message + "\n"
-        os.chdir(LogPath)
-        strdate = datetime.now()
-        Logfile = open(str(strdate.strftime("%d-%b-%Y")) + "_OpenApiLibrary(python).Log","a+")
-        os.chdir(MainPath)
-        Logfile.write(logmessage)
-        Logfile.close()
-    except:
-        print('\nError in Writing Logs!!!')
-        sys.exit()
-
-def WriteIntoLog_Broadcast(f_status, f_filename, f_message):
-    try:
-        dt = datetime.now()
-        x = dt.strftime("%Y-%m-%d %H:%M:%S")
-        logmessage = str(x) + ("             ") + f_status + ("             ") + f_filename + ("             ") + f_message + "\n"
-        os.chdir(LogPath)
-        strdate = datetime.now()
-        Logfile = open(str(strdate.strftime("%d-%b-%Y")) + "_OpenApiBroadcast(python).Log","a+")
-        os.chdir(MainPath)
-        Logfile.write(logmessage)
-        Logfile.close()
-    except:
-        print('\nError in Writing Logs!!!')
-        sys.exit()
-
-def WriteIntoLog_TradeStatus(f_status, f_filename, f_message):
-    try:
-        dt = datetime.now()
-        x = dt.strftime("%Y-%m-%d %H:%M:%S")
-        logmessage = str(x) + ("             ") + f_status + ("             ") + f_filename + ("             ") + f_message + "\n"
-        os.chdir(LogPath)
-        strdate = datetime.now()
-        Logfile = open(str(strdate.strftime("%d-%b-%Y")) + "_OpenApiTradeStatus(python).Log","a+")
-        os.chdir(MainPath)
-        Logfile.write(logmessage)
-        Logfile.close()
-    except:
-        print('\nError in Writing Logs!!!')
-        sys.exit()
+MainPath = os.getcwd()
+LogPath = os.path.join(MainPath, 'Logs')
+
+# Suffix of the daily log file written for each log stream
+LogLibrary = "_OpenApiLibrary(python).Log"
+LogBroadcast = "_OpenApiBroadcast(python).Log"
+LogTradeStatus = "_OpenApiTradeStatus(python).Log"
+
+# LogWriter options, see BufferedLogWriter
+LogDropDebug = False            # Discard the per-packet debug lines (heartbeats, per scrip register, web requests)
+
+
+class BufferedLogWriter(object):
+    # Log lines are queued by the caller and written by a single daemon thread that keeps one
+    # file handle open per log stream, writes whatever is queued as one batch and flushes once
+    # per batch. Files are reopened when the date changes, so every day still gets its own file.
+    # The working directory is never changed, which keeps logging safe from any thread.
+
+    def __init__(self, f_logpath, f_dropdebug = LogDropDebug):
+        self.m_LogPath = f_logpath
+        self.m_Queue = Queue()
+        self.m_Files = {}
+        self.m_FileDate = None
+        self.m_Thread = None
+        self.m_DropDebug = f_dropdebug
+        self.m_LinesWritten = 0
+        self.m_LinesDropped = 0
+        self.m_Batches = 0
+
+    def Write(self, f_stream, f_status, f_filename, f_message, f_debug = False):
+        # Debug lines are the per-packet ones (heartbeats, per scrip register, web requests),
+        # they are discarded before formatting when m_DropDebug is set
+        if f_debug and self.m_DropDebug:
+            self.m_LinesDropped += 1
+            return
+        if self.m_Thread is None:
+            self.Start()
+        self.m_Queue.put((f_stream, datetime.now(), f_status, f_filename, f_message))
+
+    def SetDropDebug(self, f_dropdebug):
+        # True discards the debug lines from now on, e.g. LogWriter.SetDropDebug(True) in production
+        self.m_DropDebug = bool(f_dropdebug)
+
+    def Start(self):
+        if self.m_Thread is None:
+            self.m_Thread = Thread(target = self.__Run, name = "MOFSLLogWriter", daemon = True)
+            self.m_Thread.start()
+
+    def Flush(self):
+        # Blocks until every line queued so far is written to disk
+        if self.m_Thread is not None:
+            self.m_Queue.join()
+
+    def Stats(self):
+        return {"LinesWritten": self.m_LinesWritten, "LinesDropped": self.m_LinesDropped,
+                "Batches": self.m_Batches, "Pending": self.m_Queue.qsize()}
+
+    def __Run(self):
+        while True:
+            l_batch = [self.m_Queue.get()]
+            while True:
+                try:
+                    l_batch.append(self.m_Queue.get_nowait())
+                except Empty:
+                    break
+            try:
+                self.__WriteBatch(l_batch)
+            except Exception as e:
+                print('\nError in Writing Logs!!!', e)
+            finally:
+                for _ in l_batch:
+                    self.m_Queue.task_done()
+
+    def __WriteBatch(self, f_batch):
+        l_dirty = set()
+        for l_stream, l_dt, l_status, l_filename, l_message in f_batch:
+            l_logfile = self.__GetFile(l_stream, l_dt.strftime("%d-%b-%Y"))
+            l_logfile.write(l_dt.strftime("%Y-%m-%d %H:%M:%S") + ("             ") + l_status + ("             ") + l_filename + ("             ") + l_message + "\n")
+            l_dirty.add(l_logfile)
+        for l_logfile in l_dirty:
+            l_logfile.flush()
+        self.m_LinesWritten += len(f_batch)
+        self.m_Batches += 1
+
+    def __GetFile(self, f_stream, f_date):
+        if f_date != self.m_FileDate:
+            # Midnight rollover, close the previous day's files
+            self.__CloseFiles()
+            self.m_FileDate = f_date
+        l_logfile = self.m_Files.get(f_stream)
+        if l_logfile is None:
+            os.makedirs(self.m_LogPath, exist_ok = True)
+            l_logfile = open(os.path.join(self.m_LogPath, f_date + f_stream), "a+")
+            self.m_Files[f_stream] = l_logfile
+        return l_logfile
+
+    def __CloseFiles(self):
+        for l_logfile in self.m_Files.values():
+            l_logfile.close()
+        self.m_Files = {}
+
+    def Close(self):
+        self.Flush()
+        self.__CloseFiles()
+
+
+LogWriter = BufferedLogWriter(LogPath)
+atexit.register(LogWriter.Flush)
+
+
+def WriteIntoLog(f_status, f_filename, f_message, f_debug = False):
+    LogWriter.Write(LogLibrary, f_status, f_filename, f_message, f_debug)
+
+def WriteIntoLog_Broadcast(f_status, f_filename, f_message, f_debug = False):
+    LogWriter.Write(LogBroadcast, f_status, f_filename, f_message, f_debug)
+
+def WriteIntoLog_TradeStatus(f_status, f_filename, f_message, f_debug = False):
+    LogWriter.Write(LogTradeStatus, f_status, f_filename, f_message, f_debug)
 
 
 # def WriteIntoLog(f_status, f_filename, f_message):
@@ -265,6 +391,307 @@ def GetLatitudeLongitude():
         return lst_latlng
 
 
+# Broadcast
+def DecodeBroadcastFrames(f_message):
+    # Views the whole message as an array of 30 byte frames (no copy) and groups the frames by
+    # message type, keeping their order within a type. Returns {msgtype: frames}, the frames of a
+    # type are a structured array of BroadcastBody_dtype[msgtype] so the handlers get the body
+    # fields as typed columns (message types without a body keep the header dtype).
+    l_frames = np.frombuffer(f_message, dtype=BroadcastFrame_dtype)
+    l_msgtypes = np.unique(l_frames["msgtype"])
+
+    l_groups = {}
+    for l_msgtype in l_msgtypes.tolist():
+        l_type = l_msgtype.decode("latin-1")
+        l_typed = np.frombuffer(f_message, dtype=BroadcastBody_dtype.get(l_type, BroadcastFrame_dtype))
+        l_groups[l_type] = l_typed if len(l_msgtypes) == 1 else l_typed[l_frames["msgtype"] == l_msgtype]
+    return l_groups
+
+
+def DecodeBroadcastMessages(f_type, f_frames):
+    # Decodes the frames of one message type column by column. Returns the messages passed to
+    # subscribers (one dict per frame, same keys and rounding as before), the exchange, scrip and
+    # time columns and the body fields as a frames x fields float64 array for BroadcastQuoteBook.
+    l_codes = f_frames["exchange"]
+    l_scrips = f_frames["scrip"]
+
+    l_exchanges = np.full(len(f_frames), None, dtype=object)
+    for l_code, l_name in BroadcastExchangeNames.items():
+        l_exchanges[l_codes == l_code] = l_name
+    l_nse = l_codes == b"N"
+    if l_nse.any():
+        l_cash = (l_scrips <= 34999) | ((l_scrips >= 888801) & (l_scrips <= 888820))
+        l_exchanges[l_nse & l_cash] = "NSE"
+        l_exchanges[l_nse & ~l_cash] = "NSEFO"
+    l_exchanges = l_exchanges.tolist()
+
+    # Frames of one message mostly share the same second, so format each distinct time only once
+    l_epochs, l_inverse = np.unique(f_frames["time"], return_inverse=True)
+    l_strtimes = np.array([time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(epoch + BroadcastEpoch)) for epoch in l_epochs.tolist()], dtype=object)
+    l_times = l_strtimes[l_inverse.reshape(-1)].tolist()
+
+    l_keys = ("Exchange", "Scrip Code", "Time") + QuoteBookFields[f_type]
+    l_columns = [l_exchanges, l_scrips.tolist(), l_times]
+    l_values = np.empty((len(f_frames), len(QuoteBookFields[f_type])))
+    for l_index, l_field in enumerate(QuoteBookFields[f_type]):
+        l_column = f_frames[l_field]
+        if l_column.dtype.kind == "f":
+            # float32 * 100 is exact in float64, so this rounds exactly like round(value, 2)
+            l_column = np.round(l_column.astype(np.float64), 2)
+        l_values[:, l_index] = l_column
+        l_columns.append(l_column.tolist())
+    if f_type == "MarketDepth":
+        l_keys += ("Level",)
+        l_columns.append([BroadcastDepthLevels.get(msgtype) for msgtype in f_frames["msgtype"].astype("U1").tolist()])
+
+    l_messages = [dict(zip(l_keys, l_row)) for l_row in zip(*l_columns)]
+    if None in l_exchanges:
+        # Unknown exchange codes have no "Exchange" in their message
+        for l_message in l_messages:
+            if l_message["Exchange"] is None:
+                del l_message["Exchange"]
+    return l_messages, (l_exchanges, l_columns[1], l_times), l_values
+
+
+def GetExchangeIndex(f_exchange):
+    l_exchange = f_exchange.upper()
+    if (l_exchange== "NSECD"):
+        return "C"
+    elif (l_exchange == "NCDEX"):
+        return "D"
+    elif (l_exchange == "BSEFO"):
+        return "G"
+    return l_exchange[0]
+
+
+def AddBroadcastSubscriber(f_registry, f_key, f_callback):
+    # Subscribers are kept as tuples so the feed thread can iterate them while other threads register
+    l_subscribers = f_registry.get(f_key, ())
+    if f_callback is not None and f_callback not in l_subscribers:
+        l_subscribers = l_subscribers + (f_callback,)
+    f_registry[f_key] = l_subscribers
+
+
+class BroadcastStreamBuffer(object):
+    # Reassembles the broadcast byte stream (websocket messages or TCP recv chunks) into complete
+    # frames. The tail of a read that does not fill a whole frame is carried over and completed
+    # by the next read, so split frames are no longer dropped.
+
+    def __init__(self, f_packetlength):
+        self.m_packetlength = f_packetlength
+        self.m_buffer = bytearray()
+
+        self.m_BytesReceived = 0
+        self.m_FramesEmitted = 0
+        self.m_BytesCarriedOver = 0
+        self.m_ReadsCarriedOver = 0
+
+    def Feed(self, f_data):
+        # Returns the complete frames of this read as a list of chunks: the frame completed from
+        # the carried over bytes (if any) followed by a memoryview over the aligned rest of f_data.
+        l_view = memoryview(f_data)
+        l_chunks = []
+        l_cursor = 0
+        self.m_BytesReceived += len(l_view)
+
+        if self.m_buffer:
+            l_cursor = min(self.m_packetlength - len(self.m_buffer), len(l_view))
+            self.m_buffer += l_view[:l_cursor]
+            if len(self.m_buffer) < self.m_packetlength:
+                self.m_BytesCarriedOver += len(l_view)
+                self.m_ReadsCarriedOver += 1
+                return l_chunks
+            l_chunks.append(bytes(self.m_buffer))
+            self.m_buffer.clear()
+
+        l_end = len(l_view) - (len(l_view) - l_cursor) % self.m_packetlength
+        if l_end > l_cursor:
+            l_chunks.append(l_view[l_cursor:l_end])
+
+        if l_end < len(l_view):
+            self.m_buffer += l_view[l_end:]
+            self.m_BytesCarriedOver += len(l_view) - l_end
+            self.m_ReadsCarriedOver += 1
+
+        self.m_FramesEmitted += sum(len(chunk) for chunk in l_chunks) // self.m_packetlength
+        return l_chunks
+
+    def Reset(self):
+        # Partial bytes of a previous connection must not be glued to the first read of a new one
+        self.m_buffer.clear()
+
+    def Stats(self):
+        return {
+            "BytesReceived": self.m_BytesReceived,
+            "FramesEmitted": self.m_FramesEmitted,
+            "BytesCarriedOver": self.m_BytesCarriedOver,
+            "ReadsCarriedOver": self.m_ReadsCarriedOver,
+            "PendingBytes": len(self.m_buffer),
+        }
+
+
+# Latest quote per scrip kept by BroadcastQuoteBook, one row per (exchange, scrip code).
+# Every section is a float64 block, the fields below are its columns (quantities are stored as floats).
+QuoteBookDepthLevels = 5
+QuoteBookFields = {
+    "LTP": ("LTP_Rate", "LTP_Qty", "LTP_Cumulative Qty", "LTP_AvgTradePrice", "LTP_Open Interest"),
+    "MarketDepth": ("BidRate", "BidQty", "BidOrder", "OfferRate", "OfferQty", "OfferOrder"),
+    "DayOHLC": ("Open", "High", "Low", "PrevDayClose"),
+    "DPR": ("UpperCktLimit", "LowerCktLimit"),
+    "Index": ("Rate",),
+    "OpenInterest": ("Open Interest", "Open Interest High", "Open Interest Low"),
+}
+QuoteBookIntFields = {"LTP_Qty", "LTP_Cumulative Qty", "LTP_Open Interest", "BidQty", "BidOrder", "OfferQty", "OfferOrder",
+                      "Open Interest", "Open Interest High", "Open Interest Low"}
+
+
+class BroadcastQuoteBook(object):
+    # Keeps the last LTP, five depth levels, day OHLC, DPR, open interest and index rate of every
+    # scrip in NumPy arrays, updated in place by the broadcast handlers on the feed thread. Readers
+    # on other threads take a consistent copy of a row with Snapshot / GetLTP / GetLTPs instead of
+    # asking the broker. Rows are never removed, the arrays double when they are full.
+
+    def __init__(self, f_capacity = 256):
+        self.m_lock = Lock()
+        self.m_rows = {}
+        self.m_capacity = f_capacity
+        # Message type -> block of capacity rows (x depth levels for MarketDepth) x fields
+        self.m_blocks = {}
+        for l_type, l_fields in QuoteBookFields.items():
+            l_shape = (f_capacity, QuoteBookDepthLevels, len(l_fields)) if l_type == "MarketDepth" else (f_capacity, len(l_fields))
+            self.m_blocks[l_type] = np.zeros(l_shape)
+        self.m_ltp = self.m_blocks["LTP"]
+        self.m_depth = self.m_blocks["MarketDepth"]
+        # Time of the last update per row and message type (per level for MarketDepth), "" until received
+        self.m_times = {l_type: np.zeros((f_capacity, QuoteBookDepthLevels) if l_type == "MarketDepth" else f_capacity, dtype="U19")
+                        for l_type in QuoteBookFields}
+        self.m_Updates = 0
+
+    def __Row(self, f_exchange, f_scrip):
+        # Called with the lock held, returns the row of the scrip, added if new
+        l_key = (f_exchange, f_scrip)
+        l_row = self.m_rows.get(l_key)
+        if l_row is None:
+            l_row = len(self.m_rows)
+            if l_row == self.m_capacity:
+                self.__Grow()
+            self.m_rows[l_key] = l_row
+        self.m_Updates += 1
+        return l_row
+
+    def __Grow(self):
+        for l_blocks in (self.m_blocks, self.m_times):
+            for l_type, l_block in l_blocks.items():
+                l_blocks[l_type] = np.concatenate((l_block, np.zeros_like(l_block)))
+        self.m_ltp = self.m_blocks["LTP"]
+        self.m_depth = self.m_blocks["MarketDepth"]
+        self.m_capacity *= 2
+
+    def UpdateLTP(self, f_exchange, f_scrip, f_time, f_rate, f_qty, f_cumulativeqty, f_avgtradeprice, f_openinterest):
+        with self.m_lock:
+            l_row = self.__Row(f_exchange, f_scrip)
+            self.m_ltp[l_row] = (f_rate, f_qty, f_cumulativeqty, f_avgtradeprice, f_openinterest)
+            self.m_times["LTP"][l_row] = f_time
+
+    def UpdateMarketDepth(self, f_exchange, f_scrip, f_time, f_level, f_bidrate, f_bidqty, f_bidorder, f_offerrate, f_offerqty, f_offerorder):
+        with self.m_lock:
+            l_row = self.__Row(f_exchange, f_scrip)
+            self.m_depth[l_row, f_level - 1] = (f_bidrate, f_bidqty, f_bidorder, f_offerrate, f_offerqty, f_offerorder)
+            self.m_times["MarketDepth"][l_row, f_level - 1] = f_time
+
+    def UpdateDayOHLC(self, f_exchange, f_scrip, f_time, f_open, f_high, f_low, f_prevdayclose):
+        self.__Update("DayOHLC", f_exchange, f_scrip, f_time, (f_open, f_high, f_low, f_prevdayclose))
+
+    def UpdateDPR(self, f_exchange, f_scrip, f_time, f_upperckt, f_lowerckt):
+        self.__Update("DPR", f_exchange, f_scrip, f_time, (f_upperckt, f_lowerckt))
+
+    def UpdateIndex(self, f_exchange, f_scrip, f_time, f_rate):
+        self.__Update("Index", f_exchange, f_scrip, f_time, (f_rate,))
+
+    def UpdateOpenInterest(self, f_exchange, f_scrip, f_time, f_openinterest, f_openinteresthigh, f_openinterestlow):
+        self.__Update("OpenInterest", f_exchange, f_scrip, f_time, (f_openinterest, f_openinteresthigh, f_openinterestlow))
+
+    def __Update(self, f_type, f_exchange, f_scrip, f_time, f_values):
+        with self.m_lock:
+            l_row = self.__Row(f_exchange, f_scrip)
+            self.m_blocks[f_type][l_row] = f_values
+            self.m_times[f_type][l_row] = f_time
+
+    def UpdateMany(self, f_type, f_exchanges, f_scrips, f_times, f_values, f_levels = None):
+        # Batch form of the Update* methods for the frames of one message type: f_values holds the
+        # fields of every frame, f_levels the depth level of every MarketDepth frame. A scrip (and
+        # level) received more than once keeps the values of its last frame.
+        with self.m_lock:
+            l_keys = list(zip(f_exchanges, f_scrips))
+            l_rows = [self.m_rows.get(key) for key in l_keys]
+            if None in l_rows:
+                l_rows = [self.__Row(exchange, scrip) for exchange, scrip in l_keys]
+            else:
+                self.m_Updates += len(l_rows)
+            l_rows = np.array(l_rows, dtype=np.intp)
+            l_index = (l_rows,) if f_levels is None else (l_rows, np.asarray(f_levels, dtype=np.intp) - 1)
+            l_cells = np.ravel_multi_index(l_index, self.m_times[f_type].shape)
+            l_last = len(l_cells) - 1 - np.unique(l_cells[::-1], return_index=True)[1]
+            l_index = tuple(axis[l_last] for axis in l_index)
+            self.m_blocks[f_type][l_index] = f_values[l_last]
+            self.m_times[f_type][l_index] = np.asarray(f_times, dtype=object)[l_last]
+
+    def GetLTP(self, f_exchange, f_scrip):
+        # Last traded price of the scrip, None until an LTP packet was received
+        with self.m_lock:
+            l_row = self.m_rows.get((f_exchange, f_scrip))
+            if l_row is None or not self.m_times["LTP"][l_row]:
+                return None
+            return float(self.m_ltp[l_row, 0])
+
+    def GetLTPs(self, f_keys):
+        # Last traded prices of a list of (exchange, scrip) as one float array, NaN where unknown
+        l_ltps = np.full(len(f_keys), np.nan)
+        with self.m_lock:
+            for l_index, l_key in enumerate(f_keys):
+                l_row = self.m_rows.get(l_key)
+                if l_row is not None and self.m_times["LTP"][l_row]:
+                    l_ltps[l_index] = self.m_ltp[l_row, 0]
+        return l_ltps
+
+    def Snapshot(self, f_exchange, f_scrip):
+        # Returns the last known message of every type received for the scrip, in the format the
+        # broadcast handlers pass to _Broadcast_on_message: {"LTP": {...}, "MarketDepth": [{...} per level], ...}.
+        # Empty when nothing was received for it.
+        with self.m_lock:
+            l_row = self.m_rows.get((f_exchange, f_scrip))
+            if l_row is None:
+                return {}
+            l_values = {l_type: l_block[l_row].tolist() for l_type, l_block in self.m_blocks.items()}
+            l_times = {l_type: l_times[l_row].tolist() for l_type, l_times in self.m_times.items()}
+
+        def Message(f_type, f_time, f_values):
+            l_message = {"Exchange": f_exchange, "Scrip Code": f_scrip, "Time": f_time}
+            for l_field, l_value in zip(QuoteBookFields[f_type], f_values):
+                l_message[l_field] = int(l_value) if l_field in QuoteBookIntFields else l_value
+            return l_message
+
+        l_snapshot = {}
+        for l_type in QuoteBookFields:
+            if l_type == "MarketDepth":
+                l_levels = []
+                for l_index, l_time in enumerate(l_times[l_type]):
+                    if l_time:
+                        l_message = Message(l_type, l_time, l_values[l_type][l_index])
+                        l_message["Level"] = l_index + 1
+                        l_levels.append(l_message)
+                if l_levels:
+                    l_snapshot[l_type] = l_levels
+            elif l_times[l_type]:
+                l_snapshot[l_type] = Message(l_type, l_times[l_type], l_values[l_type])
+        return l_snapshot
+
+    def Stats(self):
+        return {
+            "Scrips": len(self.m_rows),
+            "Capacity": self.m_capacity,
+            "Updates": self.m_Updates,
+        }
 
 class MOFSLOPENAPI(object):
 
@@ -297,14 +724,8 @@ class MOFSLOPENAPI(object):
     m_TCPscriptask = ""
     m_indextask = ""
     m_TCPindextask = ""
-    l_scrip_code = []
-    l_TCPscrip_code = []
-
-    l_exchange_index = []
-    l_TCPexchange_index = []
     m_clientcode = ""
     Websocket_version = "VER 2.0"
-    q_msg = Queue()
 
     ws1 = None
     ws2 = None
@@ -349,12 +770,168 @@ class MOFSLOPENAPI(object):
         self.m_latitudelongitude = GetLatitudeLongitude()
 
         # self.Websocket_URL = self.Websocket_URL
-        # self.l_scrip_code = []
-        # self.l_exchange_index = []
         self.Websocket_version = self.Websocket_version
 
+        self.InitBroadcastState()
+        # Guards m_HttpStats and m_HttpPoolConnections, requests are made from the feed and REST threads
+        self.m_HttpStatsLock = Lock()
+        self.ConfigureHttpPool()
+
         WriteIntoLog("SUCCESS", "MOFSLOPENAPI.py", "Initilize Constructor Done")
 
+    def ConfigureHttpPool(self, f_poolconnections = HttpPoolConnections, f_poolmaxsize = HttpPoolMaxsize,
+                          f_connecttimeout = HttpConnectTimeout, f_readtimeout = HttpReadTimeout,
+                          f_maxretries = HttpMaxRetries, f_retrybackoff = HttpRetryBackoff):
+        # validate posts over one keep-alive requests.Session instead of a new connection per call.
+        # Only connection failures are retried: the request never reached the broker, so resending
+        # is safe. Read timeouts and error statuses are not retried as an order may have been placed.
+        l_retry = Retry(total = f_maxretries, connect = f_maxretries, read = 0, status = 0,
+                        backoff_factor = f_retrybackoff, raise_on_status = False)
+        l_adapter = HTTPAdapter(pool_connections = f_poolconnections, pool_maxsize = f_poolmaxsize,
+                                max_retries = l_retry)
+
+        if getattr(self, "m_HttpSession", None) is not None:
+            self.m_HttpSession.close()
+
+        self.m_HttpSession = requests.Session()
+        self.m_HttpSession.mount("https://", l_adapter)
+        self.m_HttpSession.mount("http://", l_adapter)
+        self.m_HttpSession.headers.update(self.GetStaticHeaders())
+        self.m_HttpAdapter = l_adapter
+        self.m_HttpTimeout = (f_connecttimeout, f_readtimeout)
+
+        with self.m_HttpStatsLock:
+            # Instrumentation: endpoint path -> [requests, new connections, total seconds, max seconds]
+            self.m_HttpStats = {}
+            # urllib3 connection pool -> connections it had opened at the previous request
+            self.m_HttpPoolConnections = {}
+        # Optional callable(endpoint, seconds, reused, status_code) invoked after every request
+        self.m_HttpHook = None
+
+    def GetStaticHeaders(self):
+        # Header fields that never change, stored on the session
+        return {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "sdkversion":"Python 3.0"
+        }
+
+    def GetRequestHeaders(self):
+        # Header fields built from members callers may set after construction (apisecretkey,
+        # Authorization and vendorinfo after login, the client IP / device details), sent per request
+        l_headers = {
+            "Authorization" : self.m_strMOFSLToken,
+            "vendorinfo": self.m_vendorinfo,
+            "User-Agent" : self.m_strUseragent,
+            "apikey": self.m_strApikey, 
+            "apisecretkey" : self.m_strApiSecretkey,
+            "macaddress": self.m_strMACAddress,
+            "clientlocalip": self.m_strClientLocalIP,
+            "sourceid": self.m_strSourceID,
+            "clientpublicip": self.m_strClientPublicIP,
+
+            "osname": self.m_osname, 
+            "osversion" : self.m_osversion,
+            "installedappid": self.m_installedappid,
+            "devicemodel": self.m_devicemodel,
+            "manufacturer": self.m_manufacturer,
+            "productname": self.m_productname,
+            "productversion": self.m_productversion,
+
+            "latitude": str("%.4f" % self.m_latitudelongitude[0]),
+            "longitude": str("%.4f" % self.m_latitudelongitude[1]),
+        }
+
+        if self.m_strSourceID.upper() == "WEB":
+            l_headers["browsername"] = self.m_browsername
+            l_headers["browserversion"] = self.m_browserversion
+
+        return l_headers
+
+    def HttpStats(self):
+        # Per endpoint request count, average / max latency in ms and connection reuse ratio
+        with self.m_HttpStatsLock:
+            l_httpstats = [(l_endpoint, tuple(l_values)) for l_endpoint, l_values in self.m_HttpStats.items()]
+
+        l_stats = {}
+        l_requests = 0
+        l_newconnections = 0
+        for l_endpoint, (l_count, l_new, l_total, l_max) in l_httpstats:
+            l_stats[l_endpoint] = {
+                "Requests": l_count,
+                "NewConnections": l_new,
+                "AvgLatencyMs": round(l_total * 1000 / l_count, 3),
+                "MaxLatencyMs": round(l_max * 1000, 3),
+                "ReuseRatio": round(max(0, l_count - l_new) / l_count, 3),
+            }
+            l_requests += l_count
+            l_newconnections += l_new
+
+        return {"Endpoints": l_stats, "Requests": l_requests, "NewConnections": l_newconnections,
+                "ReuseRatio": round(max(0, l_requests - l_newconnections) / l_requests, 3) if l_requests else 0.0}
+
+    def RecordHttpRequest(self, f_URL, f_seconds, f_response):
+        # A urllib3 pool only bumps num_connections when it had to open a new connection, so a
+        # request that left the counter unchanged went over a reused keep-alive connection
+        l_new = 0
+        l_pool = getattr(f_response.raw, "_pool", None)
+        l_endpoint = urlsplit(f_URL).path
+        with self.m_HttpStatsLock:
+            if l_pool is not None:
+                l_new = l_pool.num_connections - self.m_HttpPoolConnections.get(l_pool, 0)
+                self.m_HttpPoolConnections[l_pool] = l_pool.num_connections
+
+            l_stats = self.m_HttpStats.get(l_endpoint)
+            if l_stats is None:
+                l_stats = self.m_HttpStats[l_endpoint] = [0, 0, 0.0, 0.0]
+            l_stats[0] += 1
+            l_stats[1] += l_new
+            l_stats[2] += f_seconds
+            if f_seconds > l_stats[3]:
+                l_stats[3] = f_seconds
+
+        if self.m_HttpHook is not None:
+            self.m_HttpHook(l_endpoint, f_seconds, l_new == 0, f_response.status_code)
+
+    def InitBroadcastState(self):
+        self.m_BroadcastStream = BroadcastStreamBuffer(self.m_responsepacketlength)
+        self.m_TCPBroadcastStream = BroadcastStreamBuffer(self.m_TCPresponsepacketlength)
+
+        # Subscription registry: (exchange, scrip) -> per-scrip subscriber callbacks, exchange -> index subscribers
+        self.m_ScripSubscriptions = {}
+        self.m_TCPScripSubscriptions = {}
+        self.m_IndexSubscriptions = {}
+        self.m_TCPIndexSubscriptions = {}
+
+        # Last known values of every subscribed scrip, updated by the handlers below
+        self.m_QuoteBook = BroadcastQuoteBook()
+
+        # Message type -> (handler, message type name passed to subscribers)
+        self.m_BroadcastHandlers = {
+            "A": (self.LTP, "LTP"),
+            "B": (self.MarketDepth, "MarketDepth"),
+            "C": (self.MarketDepth, "MarketDepth"),
+            "D": (self.MarketDepth, "MarketDepth"),
+            "E": (self.MarketDepth, "MarketDepth"),
+            "F": (self.MarketDepth, "MarketDepth"),
+            "G": (self.DayOHLC, "DayOHLC"),
+            "W": (self.DPR, "DPR"),
+            "H": (self.Index, "Index"),
+            "m": (self.OpenInterest, "OpenInterest"),
+        }
+        self.m_TCPBroadcastHandlers = {
+            "A": (self.TCPLTP, "LTP"),
+            "B": (self.TCPMarketDepth, "MarketDepth"),
+            "C": (self.TCPMarketDepth, "MarketDepth"),
+            "D": (self.TCPMarketDepth, "MarketDepth"),
+            "E": (self.TCPMarketDepth, "MarketDepth"),
+            "F": (self.TCPMarketDepth, "MarketDepth"),
+            "G": (self.TCPDayOHLC, "DayOHLC"),
+            "W": (self.TCPDPR, "DPR"),
+            "H": (self.TCPIndex, "Index"),
+            "m": (self.TCPOpenInterest, "OpenInterest"),
+        }
+
     def GetUrl(self, f_ApiPath):
         base_Url= self.m_Base_Url
         # ver = "/rest/v1"
@@ -477,51 +1054,19 @@ class MOFSLOPENAPI(object):
 
     def validate(self, f_URL, f_Data):
 
-        WriteIntoLog("SUCCESS", "MOFSLOPENAPI.py", "Initilize Post WebRequest Sent")
+        WriteIntoLog("SUCCESS", "MOFSLOPENAPI.py", "Initilize Post WebRequest Sent", True)
 
         try:
 
-            m_headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-                "Authorization" : self.m_strMOFSLToken,
-                "User-Agent" : self.m_strUseragent,
-                "apikey": self.m_strApikey, 
-                "apisecretkey" : self.m_strApiSecretkey,
-                "macaddress": self.m_strMACAddress,
-                "clientlocalip": self.m_strClientLocalIP,
-                "sourceid": self.m_strSourceID,
-                "clientpublicip": self.m_strClientPublicIP,
-                "vendorinfo": self.m_vendorinfo,
-
-                "osname": self.m_osname, 
-                "osversion" : self.m_osversion,
-                "installedappid": self.m_installedappid,
-                "devicemodel": self.m_devicemodel,
-                "manufacturer": self.m_manufacturer,
-                "productname": self.m_productname,
-                "productversion": self.m_productversion,
-
-                "latitude": str("%.4f" % self.m_latitudelongitude[0]),
-                "longitude": str("%.4f" % self.m_latitudelongitude[1]),
-                "sdkversion":"Python 3.0"
-
-                # "browsername": self.m_browsername,
-                # "browserversion": self.m_browserversion,
-                # "imeino": self.m_imeino
+            m_headers = self.GetRequestHeaders()
 
-            }
-
-            if self.m_strSourceID.upper() == "WEB":
-                m_headers["browsername"] = self.m_browsername
-                m_headers["browserversion"] = self.m_browserversion
-
-            # print(m_headers)            
-            response = requests.post(f_URL, headers= m_headers, data = json.dumps(f_Data))
+            l_start = time.perf_counter()
+            response = self.m_HttpSession.post(f_URL, headers= m_headers, data = json.dumps(f_Data), timeout = self.m_HttpTimeout)
+            self.RecordHttpRequest(f_URL, time.perf_counter() - l_start, response)
             # print("JSON Response ", response.content)
             j_ResponseMessage = response.content.decode('utf-8')
 
-            WriteIntoLog("SUCCESS", "MOFSLOPENAPI.py", "Post WebRequest Send Successfully")
+            WriteIntoLog("SUCCESS", "MOFSLOPENAPI.py", "Post WebRequest Send Successfully", True)
             return j_ResponseMessage
 
         except Exception as e:
@@ -1497,7 +2042,7 @@ class MOFSLOPENAPI(object):
         WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "ReLogin Packet was Sent after connection lost")
         # print("ReConnection Packet sent")
 
-    def Register(self, f_exchange, f_exchangetype, f_scriptcode):
+    def Register(self, f_exchange, f_exchangetype, f_scriptcode, f_callback = None):
         self.m_scriptask = "D"
 
         l_MaxBroadcastLimit = self.m_MaxBroadcastLimit
@@ -1514,23 +2059,13 @@ class MOFSLOPENAPI(object):
         else :
             MaxBroadcastLimit = l_MaxBroadcastLimit
 
-        if (len(self.l_scrip_code) < MaxBroadcastLimit):
-
-            if f_scriptcode not in self.l_scrip_code:
-                self.l_scrip_code.append(f_scriptcode)
+        if (len(self.m_ScripSubscriptions) < MaxBroadcastLimit):
 
-            l_exchange = f_exchange.upper()
-            if (l_exchange== "NSECD"):
-                l_exchangeindex = "C"
-            elif (l_exchange == "NCDEX"):
-                l_exchangeindex = "D"
-            elif (l_exchange == "BSEFO"):
-                l_exchangeindex = "G"
-            else :
-                l_exchangeindex = l_exchange[0]
+            l_exchangeindex = GetExchangeIndex(f_exchange)
 
             l_exchangetype = f_exchangetype.upper()
             l_exchangetypeindex = l_exchangetype[0]
+            AddBroadcastSubscriber(self.m_ScripSubscriptions, (l_exchangeindex, f_scriptcode), f_callback)
             if self.m_strMOFSLToken:
                 msg_type = ("D".encode())
                 exchange = (l_exchangeindex.encode())
@@ -1542,7 +2077,7 @@ class MOFSLOPENAPI(object):
                 self.Login_on_open()
                 self.ws1.send(RegisterPacket)
                 Log_Message = ("Script %d Register Packet Sent"%(f_scriptcode))
-                WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+                WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message, True)
                 # print(RegisterPacket)
                 # print("Register Packet sent")
             else:
@@ -1555,20 +2090,12 @@ class MOFSLOPENAPI(object):
 
     def UnRegister(self, f_exchange, f_exchangetype, f_scriptcode):
         self.m_scriptask = "D"
-        self.l_scrip_code.remove(f_scriptcode)
-
-        l_exchange = f_exchange.upper()
-        if (l_exchange== "NSECD"):
-            l_exchangeindex = "C"
-        elif (l_exchange == "NCDEX"):
-            l_exchangeindex = "D"
-        elif (l_exchange == "BSEFO"):
-                l_exchangeindex = "G"
-        else :
-            l_exchangeindex = l_exchange[0]
+
+        l_exchangeindex = GetExchangeIndex(f_exchange)
 
         l_exchangetype = f_exchangetype.upper()
         l_exchangetypeindex = l_exchangetype[0]
+        self.m_ScripSubscriptions.pop((l_exchangeindex, f_scriptcode), None)
         if self.m_strMOFSLToken:
             msg_type = ("D".encode())
             exchange = (l_exchangeindex.encode())
@@ -1581,27 +2108,71 @@ class MOFSLOPENAPI(object):
             self.Login_on_open()
             self.ws1.send(UnRegisterPacket)
             Log_Message = ("Script %d UnRegister Packet Sent"%(f_scriptcode))
-            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message, True)
             # print("UnRegister Packet sent")
         else:
             print({'status': 'ERROR', 'message': 'Authorization is InVaild In Header Parameter', 'errorcode': '', 'data': None})
 
-    def IndexRegister(self, f_exchange):
+    def RegisterMany(self, f_scrips, f_callback = None):
+        # f_scrips is a list of (exchange, exchangetype, scripcode). The login packet is sent once and
+        # all register packets are coalesced into a single write.
+        self.m_scriptask = "D"
+
+        if self.m_MaxBroadcastLimit == 0 :
+            MaxBroadcastLimit = 200
+        else :
+            MaxBroadcastLimit = self.m_MaxBroadcastLimit
+
+        l_packets = []
+        for l_exchange, l_exchangetype, l_scriptcode in f_scrips:
+            l_exchangeindex = GetExchangeIndex(l_exchange)
+            l_key = (l_exchangeindex, l_scriptcode)
+            if l_key not in self.m_ScripSubscriptions and len(self.m_ScripSubscriptions) >= MaxBroadcastLimit:
+                Log_Message = ("Script %d Register Failed, Scrip count is greater than max limit"%(l_scriptcode))
+                WriteIntoLog_Broadcast("Info", "MOFSLOPENAPI.py", Log_Message)
+                continue
+
+            AddBroadcastSubscriber(self.m_ScripSubscriptions, l_key, f_callback)
+            l_packets.append(RegisterPacket_struct.pack("D".encode(), 7, l_exchangeindex.encode(), l_exchangetype.upper()[0].encode(), l_scriptcode, 1))
+
+        if not l_packets:
+            return
+
+        if self.m_strMOFSLToken:
+            self.Login_on_open()
+            self.ws1.send(b"".join(l_packets))
+            Log_Message = ("Script Register Packet Sent for %d scrips"%(len(l_packets)))
+            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+        else:
+            print({'status': 'ERROR', 'message': 'Authorization is InVaild In Header Parameter', 'errorcode': '', 'data': None})
+
+    def UnRegisterMany(self, f_scrips):
+        # f_scrips is a list of (exchange, exchangetype, scripcode), unregistered with one login and one write
+        self.m_scriptask = "D"
+
+        l_packets = []
+        for l_exchange, l_exchangetype, l_scriptcode in f_scrips:
+            l_exchangeindex = GetExchangeIndex(l_exchange)
+            self.m_ScripSubscriptions.pop((l_exchangeindex, l_scriptcode), None)
+            l_packets.append(RegisterPacket_struct.pack("D".encode(), 7, l_exchangeindex.encode(), l_exchangetype.upper()[0].encode(), l_scriptcode, 0))
+
+        if not l_packets:
+            return
+
+        if self.m_strMOFSLToken:
+            self.Login_on_open()
+            self.ws1.send(b"".join(l_packets))
+            Log_Message = ("Script UnRegister Packet Sent for %d scrips"%(len(l_packets)))
+            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+        else:
+            print({'status': 'ERROR', 'message': 'Authorization is InVaild In Header Parameter', 'errorcode': '', 'data': None})
+
+    def IndexRegister(self, f_exchange, f_callback = None):
         self.m_indextask = "H" 
         
-        # l_exchange = f_exchange.upper()
-        # l_exchangeindex = l_exchange[0]
-        l_exchange = f_exchange.upper()
-        if (l_exchange== "NSECD"):
-            l_exchangeindex = "C"
-        elif (l_exchange == "NCDEX"):
-            l_exchangeindex = "D"
-        elif (l_exchange == "BSEFO"):
-            l_exchangeindex = "G"
-        else :
-            l_exchangeindex = l_exchange[0]
+        l_exchangeindex = GetExchangeIndex(f_exchange)
 
-        self.l_exchange_index.append(l_exchangeindex)
+        AddBroadcastSubscriber(self.m_IndexSubscriptions, l_exchangeindex, f_callback)
         
         if self.m_strMOFSLToken:
             self.Login_on_open()
@@ -1614,19 +2185,9 @@ class MOFSLOPENAPI(object):
     def IndexUnregister(self, f_exchange):
         self.m_indextask = "H"
 
-        # l_exchange = f_exchange.upper()
-        # l_exchangeindex = l_exchange[0]
-        l_exchange = f_exchange.upper()
-        if (l_exchange== "NSECD"):
-            l_exchangeindex = "C"
-        elif (l_exchange == "NCDEX"):
-            l_exchangeindex = "D"
-        elif (l_exchange == "BSEFO"):
-            l_exchangeindex = "G"
-        else :
-            l_exchangeindex = l_exchange[0]
+        l_exchangeindex = GetExchangeIndex(f_exchange)
 
-        self.l_exchange_index.remove(l_exchangeindex)
+        self.m_IndexSubscriptions.pop(l_exchangeindex, None)
         # print("IndexUnregister Packet sent")
         if self.m_strMOFSLToken:
             Log_Message = ("Index %s UnRegister Packet Sent"%(f_exchange))
@@ -1639,17 +2200,8 @@ class MOFSLOPENAPI(object):
 
     def Packet_Condition(self, message):
         # time.sleep(1)
-        msg = message
-        if len(msg) % self.m_responsepacketlength == 0:
-            self.Packet_Parsing(message)
-
-        else:
-            # q_msg = Queue()
-            for i in msg:
-                self.q_msg.put(i)
-                if len(self.q_msg) == 30:
-                        self.Packet_Parsing(self.q_msg)
-                        self.q_msg.get(self.q_msg[0:30]) 
+        for l_frames in self.m_BroadcastStream.Feed(message):
+            self.Packet_Parsing(l_frames)
 
 
     def Packet_Parsing(self, message):
@@ -1660,108 +2212,9 @@ class MOFSLOPENAPI(object):
         # print(len(msg), type(msg))
 
         if len(msg) % self.m_responsepacketlength == 0:
-        
-            l_Response30bytes=[]
-            l_headerdecodedlist=[]
-            l_msglist=[]
-            for i in range(0, len(msg), self.m_responsepacketlength):
-                l_Response30bytes.append(msg[i:i+ self.m_responsepacketlength])
-                l_30bytessplitlist = l_Response30bytes
-            
-
-            for i in l_30bytessplitlist:
-                b_exchange, b_scrip, b_time, b_msgtype = i[:1], i[1:5], i[5:9], i[9:10]
-                b_20bytesbody = i[10:30]
-
-                exchange = b_exchange.decode()
-                scrip = int.from_bytes(b_scrip, byteorder= "little", signed=True)
-                epoch1 = int.from_bytes(b_time, byteorder= "little", signed=True)
-                epoch2 = datetime(1980, 1, 1, 0, 0, 0).timestamp()
-                t = epoch1 + epoch2
-                my_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))
 
-                msgtype = b_msgtype.decode()
-                
-                l_headerdecodedlist.append(exchange)
-                l_headerdecodedlist.append(scrip)
-                l_headerdecodedlist.append(my_time)
-                l_headerdecodedlist.append(msgtype)
-
-                l_headerdecodedlist.append(b_20bytesbody)
-            # print(l_headerdecodedlist)
-            # print(len(l_headerdecodedlist), type(l_headerdecodedlist))
-                    
-            l_msglist = [l_headerdecodedlist[i:i+5] for i in range(0, len(l_headerdecodedlist), 5)]
-            # print(l_msglist)
-            # print(len(l_msglist), type(l_msglist)) 
-
-
-
-            if self.m_scriptask == "D":
-                for i in l_msglist:
-
-                    l_msg = i
-                    msg_type = i[3]
-                    l_scripcode = i[1]
-                    if (l_scripcode in self.l_scrip_code):
-                        if msg_type == "A":
-                            self.LTP(l_msg)
-                        elif (msg_type =="B" or msg_type =="C" or msg_type =="D"or msg_type =="E" or msg_type =="F"):
-                            self.MarketDepth(l_msg)
-                        elif msg_type == "G":
-                            self.DayOHLC(l_msg)
-                        elif msg_type == "W":
-                            self.DPR(l_msg)
-                        elif msg_type == "m":
-                            self.OpenInterest(l_msg)
-                        elif  msg_type == "1":
-                            # Log_Message = ("Heartbeat request %s received"%(l_msg))
-                            # WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "Heartbeat request received")
-                            self.Heartbeat(l_msg)
-                        else:
-                            # self._Broadcast_on_message(self.ws1,msg_type,l_msg)
-                            pass
-            else:
-                for i in l_msglist:
-                    l_msg = i
-                    msg_type = i[3]
-                    
-                    if msg_type == "1":
-                        # Log_Message_1 = ("Heartbeat request %s received"%(l_msg))
-                        # WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "Heartbeat request received")
-                        self.Heartbeat(l_msg)
-                    else:
-                        # self._Broadcast_on_message(self.ws1,msg_type,l_msg)
-                        pass      
-            
-            if self.m_indextask == "H":
-                for i in l_msglist:
-                    l_msg = i
-                    msg_type = i[3]
-                    l_exchange = i[0]
-                    if (l_exchange in self.l_exchange_index):
-                        if msg_type == "H":
-                            self.Index(l_msg)
-                        elif  msg_type == "1":
-                            # Log_Message_2 = ("Heartbeat request %s received"%(l_msg))
-                            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "Heartbeat request received")
-                            self.Heartbeat(l_msg)
-                        # elif msg_type == "G":
-                        #     self.DayOHLC(l_msg)
-                        else:
-                            # self._Broadcast_on_message(self.ws1,msg_type,l_msg)
-                            pass
-            else:
-                for i in l_msglist:
-                    l_msg = i
-                    msg_type = i[3]
-                    
-                    if msg_type == "1":
-                        WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "Heartbeat request received")
-                        self.Heartbeat(l_msg)
-                    else:
-                        # self._Broadcast_on_message(self.ws1,msg_type,l_msg)
-                        pass                        
+            l_groups = DecodeBroadcastFrames(msg)
+            self.Packet_Dispatch(l_groups)
         else:
             l_message_type = "NotSpecified"
             self._Broadcast_on_message(self.ws1,l_message_type,msg)
@@ -1769,221 +2222,72 @@ class MOFSLOPENAPI(object):
             # print(len(msg), type(msg))
 
 
-    def LTP(self, f_msg):
-        l_LTPResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-        b_Rate, b_Qty, b_Cumulative_Qty, b_AvgTradePrice, b_Open_Interest = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:12], l_msg[4][12:16], l_msg[4][16:]
-
-        flt_1 = unpack("f", b_Rate)
-        l_Rateflt = float('.'.join(str(elem) for elem in flt_1))
-        l_Rate = round(l_Rateflt, 2)
-
-        l_Qty = int.from_bytes(b_Qty, byteorder= "little", signed=True)
-        l_Cumulative_Qty = int.from_bytes(b_Cumulative_Qty, byteorder= "little", signed=True)
-
-        flt_2 = unpack("f", b_AvgTradePrice)
-        l_AvgTradePriceflt = float('.'.join(str(elem) for elem in flt_2))
-        l_AvgTradePrice = round(l_AvgTradePriceflt, 2)
-
-        l_Open_Interest = int.from_bytes(b_Open_Interest, byteorder= "little", signed=True)
-
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_LTPResponseData["Exchange"] = "NSE"
-            else :
-                l_LTPResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_LTPResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_LTPResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_LTPResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_LTPResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_LTPResponseData["Exchange"] = "BSEFO"
-
-              
-        # l_LTPResponseData["Exchange"] = l_exchange
-        l_LTPResponseData["Scrip Code"] = l_scrip
-        l_LTPResponseData["Time"] = l_time
-        # l_LTPResponseData["Type"] = "LTP"                 #l_msgtype
-
-        l_LTPResponseData["LTP_Rate"] = l_Rate
-        l_LTPResponseData["LTP_Qty"] = l_Qty
-        l_LTPResponseData["LTP_Cumulative Qty"] = l_Cumulative_Qty
-        l_LTPResponseData["LTP_AvgTradePrice"] = l_AvgTradePrice
-        l_LTPResponseData["LTP_Open Interest"] = l_Open_Interest
-
-        self._Broadcast_on_message(self.ws1,"LTP",l_LTPResponseData)
-
-
-    def MarketDepth(self, f_msg):
-        l_MarketDepthResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-        b_BidRate,b_BidQty, b_BidOrder, b_OfferRate, b_OfferQty, b_OfferOrder  = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:10], l_msg[4][10:14], l_msg[4][14:18], l_msg[4][18:]
-        
-        flt_1 = unpack("f", b_BidRate)
-        l_BidRateflt = float('.'.join(str(elem) for elem in flt_1))
-        l_BidRate = round(l_BidRateflt, 2)
-
-        l_BidQty = int.from_bytes(b_BidQty, byteorder= "little", signed=True)
-        l_BidOrderflt = int.from_bytes(b_BidOrder, byteorder= "little", signed=True)
-        l_BidOrder = round(l_BidOrderflt, 2)
-
-        flt_2 = unpack("f", b_OfferRate)
-        l_OfferRateflt = float('.'.join(str(elem) for elem in flt_2))
-        l_OfferRate = round(l_OfferRateflt, 2)
-
-        l_OfferQty = int.from_bytes(b_OfferQty, byteorder= "little", signed=True)
-        l_OfferOrderflt = int.from_bytes(b_OfferOrder, byteorder= "little", signed=True)   
-        l_OfferOrder = round(l_OfferOrderflt, 2)     
-        
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_MarketDepthResponseData["Exchange"] = "NSE"
-            else :
-                l_MarketDepthResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_MarketDepthResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_MarketDepthResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_MarketDepthResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_MarketDepthResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_MarketDepthResponseData["Exchange"] = "BSEFO"
-
-
-        # l_MarketDepthResponseData["Exchange"] = l_exchange
-        l_MarketDepthResponseData["Scrip Code"] = l_scrip
-        l_MarketDepthResponseData["Time"] = l_time
-        # l_MarketDepthResponseData["Type"] = "MarketDepth"               #l_msgtype
-
-        l_MarketDepthResponseData["BidRate"] = l_BidRate
-        l_MarketDepthResponseData["BidQty"] = l_BidQty
-        l_MarketDepthResponseData["BidOrder"] = l_BidOrder
-        l_MarketDepthResponseData["OfferRate"] = l_OfferRate
-        l_MarketDepthResponseData["OfferQty"]= l_OfferQty
-        l_MarketDepthResponseData["OfferOrder"] = l_OfferOrder
-        if l_msgtype == "B":
-            l_MarketDepthResponseData["Level"] = 1
-        elif l_msgtype == "C":
-            l_MarketDepthResponseData["Level"] = 2
-        elif l_msgtype == "D":
-            l_MarketDepthResponseData["Level"] = 3
-        elif l_msgtype == "E":
-            l_MarketDepthResponseData["Level"] = 4
-        elif l_msgtype == "F":
-            l_MarketDepthResponseData["Level"] = 5
-        else:
-            pass
-
-        self._Broadcast_on_message(self.ws1,"MarketDepth",l_MarketDepthResponseData)
-
-    def DayOHLC(self, f_msg):
-        l_DayOHLCResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-        b_Open, b_High, b_Low, b_PrevDayClose, b_Reserved  = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:12], l_msg[4][12:16], l_msg[4][16:]
-
-        flt_1 = unpack("f", b_Open)
-        l_Openflt = float('.'.join(str(elem) for elem in flt_1))
-        l_Open = round(l_Openflt, 2)
-
-        flt_2 = unpack("f", b_High)
-        l_Highflt = float('.'.join(str(elem) for elem in flt_2))
-        l_High = round(l_Highflt, 2)
-
-        flt_3 = unpack("f", b_Low)
-        l_Lowflt = float('.'.join(str(elem) for elem in flt_3))
-        l_Low = round(l_Lowflt, 2)
-
-        flt_4 = unpack("f", b_PrevDayClose)
-        l_PrevDayCloseflt = float('.'.join(str(elem) for elem in flt_4))
-        l_PrevDayClose = round(l_PrevDayCloseflt, 2)
-
-        # l_Reserved = b_Reserved.decode()    
+    def Packet_Dispatch(self, f_groups):
+        self.BroadcastDispatch(f_groups, self.m_BroadcastHandlers, self.m_ScripSubscriptions, self.m_IndexSubscriptions, self.Heartbeat)
 
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_DayOHLCResponseData["Exchange"] = "NSE"
-            else :
-                l_DayOHLCResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_DayOHLCResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_DayOHLCResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_DayOHLCResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_DayOHLCResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_DayOHLCResponseData["Exchange"] = "BSEFO"
-
-        # l_DayOHLCResponseData["Exchange"] = l_exchange
-        l_DayOHLCResponseData["Scrip Code"] = l_scrip
-        l_DayOHLCResponseData["Time"] = l_time
-        # l_DayOHLCResponseData["Type"] = "DayOHLC"      #l_msgtype
-
-        l_DayOHLCResponseData["Open"] = l_Open
-        l_DayOHLCResponseData["High"] = l_High
-        l_DayOHLCResponseData["Low"] = l_Low
-        l_DayOHLCResponseData["PrevDayClose"] = l_PrevDayClose
-        # l_DayOHLCResponseData["Reserved"]= l_Reserved
-
-        self._Broadcast_on_message(self.ws1,"DayOHLC",l_DayOHLCResponseData)
-    
-
-    def DPR(self, f_msg):
-        l_DPRResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-        b_UpperCktLimit, b_LowerCktLimit, b_Reserved  = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:]
-
-        flt_1 = unpack("f", b_UpperCktLimit)
-        l_UpperCktLimitflt = float('.'.join(str(elem) for elem in flt_1))
-        l_UpperCktLimit = round(l_UpperCktLimitflt, 2)
-
-        flt_2 = unpack("f", b_LowerCktLimit)
-        l_LowerCktLimitflt = float('.'.join(str(elem) for elem in flt_2))
-        l_LowerCktLimit = round(l_LowerCktLimitflt, 2)
 
-        # l_Reserved = b_Reserved.decode()
-
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_DPRResponseData["Exchange"] = "NSE"
-            else :
-                l_DPRResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_DPRResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_DPRResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_DPRResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_DPRResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_DPRResponseData["Exchange"] = "BSEFO"
-
-        # l_DPRResponseData["Exchange"] = l_exchange
-        l_DPRResponseData["Scrip Code"] = l_scrip
-        l_DPRResponseData["Time"] = l_time
-        # l_DPRResponseData["Type"] = "DPR"      #l_msgtype
-
-        l_DPRResponseData["UpperCktLimit"] = l_UpperCktLimit
-        l_DPRResponseData["LowerCktLimit"] = l_LowerCktLimit
-        # l_DPRResponseData["Reserved"] = l_Reserved
-
-        self._Broadcast_on_message(self.ws1,"DPR",l_DPRResponseData)
+    def BroadcastDispatch(self, f_groups, f_handlers, f_scripsubscriptions, f_indexsubscriptions, f_heartbeat):
+        # Heartbeats are answered once per frame, index frames are routed by exchange and all other
+        # frames by (exchange, scrip); unsubscribed frames cost a single dict lookup. The subscribed
+        # frames of a message type go to its handler in one call, which returns one message per frame.
+        for l_msgtype, l_frames in f_groups.items():
+            if l_msgtype == "1":
+                for l_frame in l_frames:
+                    f_heartbeat(l_frame)
+                continue
 
+            l_handler = f_handlers.get(l_msgtype)
+            if l_handler is None:
+                continue
+            l_exchanges = l_frames["exchange"].astype("U1").tolist()
+            if l_msgtype == "H":
+                l_subscribers = [f_indexsubscriptions.get(exchange) for exchange in l_exchanges]
+            else:
+                l_subscribers = [f_scripsubscriptions.get(key) for key in zip(l_exchanges, l_frames["scrip"].tolist())]
+
+            l_subscribed = [index for index, subscribers in enumerate(l_subscribers) if subscribers is not None]
+            if not l_subscribed:
+                continue
+            if len(l_subscribed) < len(l_subscribers):
+                l_frames = l_frames[l_subscribed]
+                l_subscribers = [l_subscribers[index] for index in l_subscribed]
+
+            l_responses = l_handler[0](l_frames)
+            for l_response, l_callbacks in zip(l_responses, l_subscribers):
+                for l_callback in l_callbacks:
+                    l_callback(l_handler[1], l_response)
+
+
+    def BroadcastMessages(self, f_type, f_frames):
+        # Decodes the frames of one message type and stores them in the quote book in one batch
+        l_messages, (l_exchanges, l_scrips, l_times), l_values = DecodeBroadcastMessages(f_type, f_frames)
+        l_levels = [message["Level"] for message in l_messages] if f_type == "MarketDepth" else None
+        self.m_QuoteBook.UpdateMany(f_type, l_exchanges, l_scrips, l_times, l_values, l_levels)
+        return l_messages
+
+    def LTP(self, f_frames):
+        l_messages = self.BroadcastMessages("LTP", f_frames)
+        for l_message in l_messages:
+            self._Broadcast_on_message(self.ws1,"LTP",l_message)
+        return l_messages
+
+    def MarketDepth(self, f_frames):
+        l_messages = self.BroadcastMessages("MarketDepth", f_frames)
+        for l_message in l_messages:
+            self._Broadcast_on_message(self.ws1,"MarketDepth",l_message)
+        return l_messages
+
+    def DayOHLC(self, f_frames):
+        l_messages = self.BroadcastMessages("DayOHLC", f_frames)
+        for l_message in l_messages:
+            self._Broadcast_on_message(self.ws1,"DayOHLC",l_message)
+        return l_messages
+
+    def DPR(self, f_frames):
+        l_messages = self.BroadcastMessages("DPR", f_frames)
+        for l_message in l_messages:
+            self._Broadcast_on_message(self.ws1,"DPR",l_message)
+        return l_messages
 
     def Heartbeat(self, f_msg):
         # print("Heartbeat Request Packet Received")
@@ -1992,94 +2296,20 @@ class MOFSLOPENAPI(object):
         # print(HeartbeatPacket)
         self.ws1.send(HeartbeatPacket)
         Log_Message = ("Heartbeat response packet  %s sent"%(HeartbeatPacket))
-        WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+        WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message, True)
         # print("Heartbeat Response Packet sent")
 
-    def Index(self, f_msg):
-        # print("Index H Packet")
-        l_IndexResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-        b_Rate, b_Reserved  = l_msg[4][:4], l_msg[4][4:]
-
-        flt_1 = unpack("f", b_Rate)
-        l_Rateflt = float('.'.join(str(elem) for elem in flt_1))
-        l_Rate = round(l_Rateflt, 2)
-
-        # l_Reserved = b_Reserved.decode()
+    def Index(self, f_frames):
+        l_messages = self.BroadcastMessages("Index", f_frames)
+        for l_message in l_messages:
+            self._Broadcast_on_message(self.ws1,"Index",l_message)
+        return l_messages
 
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_IndexResponseData["Exchange"] = "NSE"
-            else :
-                l_IndexResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_IndexResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_IndexResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_IndexResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_IndexResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_IndexResponseData["Exchange"] = "BSEFO" 
-
-        # l_IndexResponseData["Exchange"] = l_exchange
-        l_IndexResponseData["Scrip Code"] = l_scrip
-        l_IndexResponseData["Time"] = l_time
-        # l_IndexResponseData["Type"] = "Index" #l_msgtype
-
-        l_IndexResponseData["Rate"] = l_Rate
-        # l_IndexResponseData["Reserved"] = l_Reserved
-
-        # print("Index H Packetafter")
-        self._Broadcast_on_message(self.ws1,"Index",l_IndexResponseData)
-
-    def OpenInterest(self, f_msg):
-            l_OpenInterestResponseData = {}
-            l_msg = f_msg
-            l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-            b_OpenInterest, b_OpenInterestHigh, b_OpenInterestLow, b_Reserved  = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:12], l_msg[4][12:]
-            # flt_1 = unpack("f", b_Rate)
-            # l_Rateflt = float('.'.join(str(elem) for elem in flt_1))
-            # l_Rate = round(l_Rateflt, 2)
-
-            l_OpenInterest = int.from_bytes(b_OpenInterest, byteorder= "little", signed=True)
-            l_OpenInterestHigh = int.from_bytes(b_OpenInterestHigh, byteorder= "little", signed=True)
-            l_OpenInterestLow = int.from_bytes(b_OpenInterestLow, byteorder= "little", signed=True)
-
-            # l_Reserved = b_Reserved.decode()
-
-            if l_exchange == "N":
-                if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                    l_OpenInterestResponseData["Exchange"] = "NSE"
-                else :
-                    l_OpenInterestResponseData["Exchange"] = "NSEFO"
-            elif l_exchange == "B":
-                l_OpenInterestResponseData["Exchange"] = "BSE"
-            elif l_exchange == "M":
-                l_OpenInterestResponseData["Exchange"] = "MCX"
-            elif l_exchange == "D":
-                l_OpenInterestResponseData["Exchange"] = "NCDEX"
-            elif l_exchange == "C":
-                l_OpenInterestResponseData["Exchange"] = "NSECD"
-            elif l_exchange == "G":
-                l_OpenInterestResponseData["Exchange"] = "BSEFO"
-
-
-            # l_OpenInterestResponseData["Exchange"] = l_exchange
-            l_OpenInterestResponseData["Scrip Code"] = l_scrip
-            l_OpenInterestResponseData["Time"] = l_time
-            # l_OpenInterestResponseData["Type"] = "OpenInterest"  #l_msgtype
-
-            l_OpenInterestResponseData["Open Interest"] = l_OpenInterest
-            l_OpenInterestResponseData["Open Interest High"] = l_OpenInterestHigh
-            l_OpenInterestResponseData["Open Interest Low"] = l_OpenInterestLow
-            # l_OpenInterestResponseData["Reserved"] = l_Reserved
-
-            self._Broadcast_on_message(self.ws1,"OpenInterest",l_OpenInterestResponseData)
+    def OpenInterest(self, f_frames):
+        l_messages = self.BroadcastMessages("OpenInterest", f_frames)
+        for l_message in l_messages:
+            self._Broadcast_on_message(self.ws1,"OpenInterest",l_message)
+        return l_messages
 
     def Broadcast_Logout(self):
         self.ws1.close()
@@ -2173,7 +2403,7 @@ class MOFSLOPENAPI(object):
 
         j_data = json.dumps(l_data)
         self.ws2.send(j_data)
-        WriteIntoLog_TradeStatus("SUCCESS", "MOFSLOPENAPI.py", "TradeStatus_HeartBeat Packet Sent")
+        WriteIntoLog_TradeStatus("SUCCESS", "MOFSLOPENAPI.py", "TradeStatus_HeartBeat Packet Sent", True)
         
 
 
@@ -2242,6 +2472,7 @@ class MOFSLOPENAPI(object):
         else:
             
             WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "Broadcast Connection Opened")
+            self.m_BroadcastStream.Reset()
             self._Broadcast_on_open(ws1)
 
             if self.BroadcastAutoRelogin_flag:
@@ -2409,7 +2640,7 @@ class MOFSLOPENAPI(object):
         WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "TCPReLogin Packet was Sent after connection lost")
         # print("ReConnection Packet sent")
 
-    def TCPRegister(self, f_exchange, f_exchangetype, f_scriptcode):
+    def TCPRegister(self, f_exchange, f_exchangetype, f_scriptcode, f_callback = None):
         self.m_TCPscriptask = "D"
 
         l_MaxBroadcastLimit = self.m_MaxBroadcastLimit
@@ -2426,23 +2657,13 @@ class MOFSLOPENAPI(object):
         else :
             MaxBroadcastLimit = l_MaxBroadcastLimit
 
-        if (len(self.l_TCPscrip_code) < MaxBroadcastLimit):
-
-            if f_scriptcode not in self.l_TCPscrip_code:
-                self.l_TCPscrip_code.append(f_scriptcode)
+        if (len(self.m_TCPScripSubscriptions) < MaxBroadcastLimit):
 
-            l_exchange = f_exchange.upper()
-            if (l_exchange== "NSECD"):
-                l_exchangeindex = "C"
-            elif (l_exchange == "NCDEX"):
-                l_exchangeindex = "D"
-            elif (l_exchange == "BSEFO"):
-                l_exchangeindex = "G"
-            else :
-                l_exchangeindex = l_exchange[0]
+            l_exchangeindex = GetExchangeIndex(f_exchange)
 
             l_exchangetype = f_exchangetype.upper()
             l_exchangetypeindex = l_exchangetype[0]
+            AddBroadcastSubscriber(self.m_TCPScripSubscriptions, (l_exchangeindex, f_scriptcode), f_callback)
             if self.m_strMOFSLToken:
                 msg_type = ("D".encode())
                 exchange = (l_exchangeindex.encode())
@@ -2454,7 +2675,7 @@ class MOFSLOPENAPI(object):
                 self.TCPLogin_on_open()
                 self.s.send(RegisterPacket)
                 Log_Message = ("TCPScript %d Register Packet Sent"%(f_scriptcode))
-                WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+                WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message, True)
                 # print(RegisterPacket)
                 # print("Register Packet sent")
             else:
@@ -2467,20 +2688,12 @@ class MOFSLOPENAPI(object):
             
     def TCPUnRegister(self, f_exchange, f_exchangetype, f_scriptcode):
         self.m_scriptask = "D"
-        self.l_TCPscrip_code.remove(f_scriptcode)
-
-        l_exchange = f_exchange.upper()
-        if (l_exchange== "NSECD"):
-            l_exchangeindex = "C"
-        elif (l_exchange == "NCDEX"):
-            l_exchangeindex = "D"
-        elif (l_exchange == "BSEFO"):
-            l_exchangeindex = "G"
-        else :
-            l_exchangeindex = l_exchange[0]
+
+        l_exchangeindex = GetExchangeIndex(f_exchange)
 
         l_exchangetype = f_exchangetype.upper()
         l_exchangetypeindex = l_exchangetype[0]
+        self.m_TCPScripSubscriptions.pop((l_exchangeindex, f_scriptcode), None)
         if self.m_strMOFSLToken:
             msg_type = ("D".encode())
             exchange = (l_exchangeindex.encode())
@@ -2493,27 +2706,71 @@ class MOFSLOPENAPI(object):
             self.TCPLogin_on_open()
             self.s.send(UnRegisterPacket)
             Log_Message = ("TCPScript %d UnRegister Packet Sent"%(f_scriptcode))
-            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message, True)
             # print("UnRegister Packet sent")
         else:
             print({'status': 'ERROR', 'message': 'Authorization is InVaild In Header Parameter', 'errorcode': '', 'data': None})
+
+    def TCPRegisterMany(self, f_scrips, f_callback = None):
+        # f_scrips is a list of (exchange, exchangetype, scripcode). The login packet is sent once and
+        # all register packets are coalesced into a single write.
+        self.m_TCPscriptask = "D"
+
+        if self.m_MaxBroadcastLimit == 0 :
+            MaxBroadcastLimit = 200
+        else :
+            MaxBroadcastLimit = self.m_MaxBroadcastLimit
+
+        l_packets = []
+        for l_exchange, l_exchangetype, l_scriptcode in f_scrips:
+            l_exchangeindex = GetExchangeIndex(l_exchange)
+            l_key = (l_exchangeindex, l_scriptcode)
+            if l_key not in self.m_TCPScripSubscriptions and len(self.m_TCPScripSubscriptions) >= MaxBroadcastLimit:
+                Log_Message = ("TCPScript %d Register Failed, Scrip count is greater than max limit"%(l_scriptcode))
+                WriteIntoLog_Broadcast("Info", "MOFSLOPENAPI.py", Log_Message)
+                continue
+
+            AddBroadcastSubscriber(self.m_TCPScripSubscriptions, l_key, f_callback)
+            l_packets.append(RegisterPacket_struct.pack("D".encode(), 7, l_exchangeindex.encode(), l_exchangetype.upper()[0].encode(), l_scriptcode, 1))
+
+        if not l_packets:
+            return
+
+        if self.m_strMOFSLToken:
+            self.TCPLogin_on_open()
+            self.s.sendall(b"".join(l_packets))
+            Log_Message = ("TCPScript Register Packet Sent for %d scrips"%(len(l_packets)))
+            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+        else:
+            print({'status': 'ERROR', 'message': 'Authorization is InVaild In Header Parameter', 'errorcode': '', 'data': None})
+
+    def TCPUnRegisterMany(self, f_scrips):
+        # f_scrips is a list of (exchange, exchangetype, scripcode), unregistered with one login and one write
+        self.m_TCPscriptask = "D"
+
+        l_packets = []
+        for l_exchange, l_exchangetype, l_scriptcode in f_scrips:
+            l_exchangeindex = GetExchangeIndex(l_exchange)
+            self.m_TCPScripSubscriptions.pop((l_exchangeindex, l_scriptcode), None)
+            l_packets.append(RegisterPacket_struct.pack("D".encode(), 7, l_exchangeindex.encode(), l_exchangetype.upper()[0].encode(), l_scriptcode, 0))
+
+        if not l_packets:
+            return
+
+        if self.m_strMOFSLToken:
+            self.TCPLogin_on_open()
+            self.s.sendall(b"".join(l_packets))
+            Log_Message = ("TCPScript UnRegister Packet Sent for %d scrips"%(len(l_packets)))
+            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+        else:
+            print({'status': 'ERROR', 'message': 'Authorization is InVaild In Header Parameter', 'errorcode': '', 'data': None})
   
-    def TCPIndexRegister(self, f_exchange):
+    def TCPIndexRegister(self, f_exchange, f_callback = None):
         self.m_TCPindextask = "H" 
         
-        # l_exchange = f_exchange.upper()
-        # l_exchangeindex = l_exchange[0]
-        l_exchange = f_exchange.upper()
-        if (l_exchange== "NSECD"):
-            l_exchangeindex = "C"
-        elif (l_exchange == "NCDEX"):
-            l_exchangeindex = "D"
-        elif (l_exchange == "BSEFO"):
-            l_exchangeindex = "G"
-        else :
-            l_exchangeindex = l_exchange[0]
+        l_exchangeindex = GetExchangeIndex(f_exchange)
 
-        self.l_TCPexchange_index.append(l_exchangeindex)
+        AddBroadcastSubscriber(self.m_TCPIndexSubscriptions, l_exchangeindex, f_callback)
         
         if self.m_strMOFSLToken:
             self.TCPLogin_on_open()
@@ -2526,19 +2783,9 @@ class MOFSLOPENAPI(object):
     def TCPIndexUnregister(self, f_exchange):
         self.m_TCPindextask = "H"
 
-        # l_exchange = f_exchange.upper()
-        # l_exchangeindex = l_exchange[0]
-        l_exchange = f_exchange.upper()
-        if (l_exchange== "NSECD"):
-            l_exchangeindex = "C"
-        elif (l_exchange == "NCDEX"):
-            l_exchangeindex = "D"
-        elif (l_exchange == "BSEFO"):
-            l_exchangeindex = "G"
-        else :
-            l_exchangeindex = l_exchange[0]
+        l_exchangeindex = GetExchangeIndex(f_exchange)
 
-        self.l_TCPexchange_index.remove(l_exchangeindex)
+        self.m_TCPIndexSubscriptions.pop(l_exchangeindex, None)
         # print("IndexUnregister Packet sent")
         if self.m_strMOFSLToken:
             Log_Message = ("TCPIndex %s UnRegister Packet Sent"%(f_exchange))
@@ -2555,22 +2802,8 @@ class MOFSLOPENAPI(object):
 
     def TCPPacket_Condition(self, message):
         # time.sleep(1)
-        msg = message
-        if len(msg) % self.m_TCPresponsepacketlength == 0:
-            self.TCPPacket_Parsing(message)
-
-        else:
-            pass
-            # print(len(msg))
-            # try :
-            #     # q_msg = Queue()
-            #     for i in msg:
-            #         self.q_msg.put(i)
-            #         if self.q_msg.qsize() == 30:
-            #                 self.Packet_Parsing(self.q_msg)
-            #                 self.q_msg.get(q_msg[o:30]) 
-            # except Exception as e: 
-            #     print(e)
+        for l_frames in self.m_TCPBroadcastStream.Feed(message):
+            self.TCPPacket_Parsing(l_frames)
 
     def TCPPacket_Parsing(self, message):
         # time.sleep(1)
@@ -2580,329 +2813,42 @@ class MOFSLOPENAPI(object):
         # print(len(msg), type(msg))
 
         if len(msg) % self.m_TCPresponsepacketlength == 0:
-        
-            l_Response30bytes=[]
-            l_headerdecodedlist=[]
-            l_msglist=[]
-            for i in range(0, len(msg), self.m_TCPresponsepacketlength):
-                l_Response30bytes.append(msg[i:i+ self.m_TCPresponsepacketlength])
-                l_30bytessplitlist = l_Response30bytes
-            
-
-            for i in l_30bytessplitlist:
-                b_exchange, b_scrip, b_time, b_msgtype = i[:1], i[1:5], i[5:9], i[9:10]
-                b_20bytesbody = i[10:30]
-
-                exchange = b_exchange.decode()
-                scrip = int.from_bytes(b_scrip, byteorder= "little", signed=True)
-                epoch1 = int.from_bytes(b_time, byteorder= "little", signed=True)
-                epoch2 = datetime(1980, 1, 1, 0, 0, 0).timestamp()
-                t = epoch1 + epoch2
-                my_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))
 
-                msgtype = b_msgtype.decode()
-                
-                l_headerdecodedlist.append(exchange)
-                l_headerdecodedlist.append(scrip)
-                l_headerdecodedlist.append(my_time)
-                l_headerdecodedlist.append(msgtype)
-
-                l_headerdecodedlist.append(b_20bytesbody)
-            # print(l_headerdecodedlist)
-            # print(len(l_headerdecodedlist), type(l_headerdecodedlist))
-                    
-            l_msglist = [l_headerdecodedlist[i:i+5] for i in range(0, len(l_headerdecodedlist), 5)]
-            # print(l_msglist)
-            # print(len(l_msglist), type(l_msglist)) 
-
-
-
-            if self.m_TCPscriptask == "D":
-                for i in l_msglist:
-
-                    l_msg = i
-                    msg_type = i[3]
-                    l_scripcode = i[1]
-                    if (l_scripcode in self.l_TCPscrip_code):
-                        if msg_type == "A":
-                            self.TCPLTP(l_msg)
-                        elif (msg_type =="B" or msg_type =="C" or msg_type =="D"or msg_type =="E" or msg_type =="F"):
-                            self.TCPMarketDepth(l_msg)
-                        elif msg_type == "G":
-                            self.TCPDayOHLC(l_msg)
-                        elif msg_type == "W":
-                            self.TCPDPR(l_msg)
-                        elif msg_type == "m":
-                            self.TCPOpenInterest(l_msg)
-                        elif  msg_type == "1":
-                            # Log_Message = ("Heartbeat request %s received"%(l_msg))
-                            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "Heartbeat request received")
-                            self.TCPHeartbeat(l_msg)
-                        else:
-                            # self._Broadcast_on_message(self.ws1,msg_type,l_msg)
-                            pass
-            else:
-                for i in l_msglist:
-                    l_msg = i
-                    msg_type = i[3]
-                    
-                    if msg_type == "1":
-                        # Log_Message_1 = ("Heartbeat request %s received"%(l_msg))
-                        WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "Heartbeat request received")
-                        self.TCPHeartbeat(l_msg)
-                    else:
-                        # self._Broadcast_on_message(self.ws1,msg_type,l_msg)
-                        pass      
-            
-            if self.m_TCPindextask == "H":
-                for i in l_msglist:
-                    l_msg = i
-                    msg_type = i[3]
-                    l_exchange = i[0]
-                    if (l_exchange in self.l_TCPexchange_index):
-                        if msg_type == "H":
-                            self.TCPIndex(l_msg)
-                        elif  msg_type == "1":
-                            # Log_Message_2 = ("Heartbeat request %s received"%(l_msg))
-                            WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "Heartbeat request received")
-                            self.TCPHeartbeat(l_msg)
-                        # elif msg_type == "G":
-                        #     self.DayOHLC(l_msg)
-                        else:
-                            # self._Broadcast_on_message(self.ws1,msg_type,l_msg)
-                            pass
-            else:
-                for i in l_msglist:
-                    l_msg = i
-                    msg_type = i[3]
-                    
-                    if msg_type == "1":
-                        WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "Heartbeat request received")
-                        self.TCPHeartbeat(l_msg)
-                    else:
-                        # self._Broadcast_on_message(self.ws1,msg_type,l_msg)
-                        pass                        
+            l_groups = DecodeBroadcastFrames(msg)
+            self.TCPPacket_Dispatch(l_groups)
         else:
             l_message_type = "NotSpecified"
             self._TCPBroadcast_on_message(l_message_type,msg)
             # print(msg)
             # print(len(msg), type(msg))
 
-    def TCPLTP(self, f_msg):
-        l_LTPResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-        b_Rate, b_Qty, b_Cumulative_Qty, b_AvgTradePrice, b_Open_Interest = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:12], l_msg[4][12:16], l_msg[4][16:]
-
-        flt_1 = unpack("f", b_Rate)
-        l_Rateflt = float('.'.join(str(elem) for elem in flt_1))
-        l_Rate = round(l_Rateflt, 2)
-
-        l_Qty = int.from_bytes(b_Qty, byteorder= "little", signed=True)
-        l_Cumulative_Qty = int.from_bytes(b_Cumulative_Qty, byteorder= "little", signed=True)
-
-        flt_2 = unpack("f", b_AvgTradePrice)
-        l_AvgTradePriceflt = float('.'.join(str(elem) for elem in flt_2))
-        l_AvgTradePrice = round(l_AvgTradePriceflt, 2)
-
-        l_Open_Interest = int.from_bytes(b_Open_Interest, byteorder= "little", signed=True)
-
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_LTPResponseData["Exchange"] = "NSE"
-            else :
-                l_LTPResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_LTPResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_LTPResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_LTPResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_LTPResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_LTPResponseData["Exchange"] = "BSEFO"
-
-              
-        # l_LTPResponseData["Exchange"] = l_exchange
-        l_LTPResponseData["Scrip Code"] = l_scrip
-        l_LTPResponseData["Time"] = l_time
-        # l_LTPResponseData["Type"] = "LTP"                 #l_msgtype
-
-        l_LTPResponseData["LTP_Rate"] = l_Rate
-        l_LTPResponseData["LTP_Qty"] = l_Qty
-        l_LTPResponseData["LTP_Cumulative Qty"] = l_Cumulative_Qty
-        l_LTPResponseData["LTP_AvgTradePrice"] = l_AvgTradePrice
-        l_LTPResponseData["LTP_Open Interest"] = l_Open_Interest
-
-        self._TCPBroadcast_on_message("LTP",l_LTPResponseData)
-
-
-    def TCPMarketDepth(self, f_msg):
-        l_MarketDepthResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-        b_BidRate,b_BidQty, b_BidOrder, b_OfferRate, b_OfferQty, b_OfferOrder  = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:10], l_msg[4][10:14], l_msg[4][14:18], l_msg[4][18:]
-        
-        flt_1 = unpack("f", b_BidRate)
-        l_BidRateflt = float('.'.join(str(elem) for elem in flt_1))
-        l_BidRate = round(l_BidRateflt, 2)
 
-        l_BidQty = int.from_bytes(b_BidQty, byteorder= "little", signed=True)
-        l_BidOrderflt = int.from_bytes(b_BidOrder, byteorder= "little", signed=True)
-        l_BidOrder = round(l_BidOrderflt, 2)
+    def TCPPacket_Dispatch(self, f_groups):
+        self.BroadcastDispatch(f_groups, self.m_TCPBroadcastHandlers, self.m_TCPScripSubscriptions, self.m_TCPIndexSubscriptions, self.TCPHeartbeat)
 
-        flt_2 = unpack("f", b_OfferRate)
-        l_OfferRateflt = float('.'.join(str(elem) for elem in flt_2))
-        l_OfferRate = round(l_OfferRateflt, 2)
+    def TCPLTP(self, f_frames):
+        l_messages = self.BroadcastMessages("LTP", f_frames)
+        for l_message in l_messages:
+            self._TCPBroadcast_on_message("LTP",l_message)
+        return l_messages
 
-        l_OfferQty = int.from_bytes(b_OfferQty, byteorder= "little", signed=True)
-        l_OfferOrderflt = int.from_bytes(b_OfferOrder, byteorder= "little", signed=True)   
-        l_OfferOrder = round(l_OfferOrderflt, 2)     
-        
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_MarketDepthResponseData["Exchange"] = "NSE"
-            else :
-                l_MarketDepthResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_MarketDepthResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_MarketDepthResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_MarketDepthResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_MarketDepthResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_MarketDepthResponseData["Exchange"] = "BSEFO"
-
-
-        # l_MarketDepthResponseData["Exchange"] = l_exchange
-        l_MarketDepthResponseData["Scrip Code"] = l_scrip
-        l_MarketDepthResponseData["Time"] = l_time
-        # l_MarketDepthResponseData["Type"] = "MarketDepth"               #l_msgtype
-
-        l_MarketDepthResponseData["BidRate"] = l_BidRate
-        l_MarketDepthResponseData["BidQty"] = l_BidQty
-        l_MarketDepthResponseData["BidOrder"] = l_BidOrder
-        l_MarketDepthResponseData["OfferRate"] = l_OfferRate
-        l_MarketDepthResponseData["OfferQty"]= l_OfferQty
-        l_MarketDepthResponseData["OfferOrder"] = l_OfferOrder
-        if l_msgtype == "B":
-            l_MarketDepthResponseData["Level"] = 1
-        elif l_msgtype == "C":
-            l_MarketDepthResponseData["Level"] = 2
-        elif l_msgtype == "D":
-            l_MarketDepthResponseData["Level"] = 3
-        elif l_msgtype == "E":
-            l_MarketDepthResponseData["Level"] = 4
-        elif l_msgtype == "F":
-            l_MarketDepthResponseData["Level"] = 5
-        else:
-            pass
+    def TCPMarketDepth(self, f_frames):
+        l_messages = self.BroadcastMessages("MarketDepth", f_frames)
+        for l_message in l_messages:
+            self._TCPBroadcast_on_message("MarketDepth",l_message)
+        return l_messages
 
-        self._TCPBroadcast_on_message("MarketDepth",l_MarketDepthResponseData)
-
-    def TCPDayOHLC(self, f_msg):
-        l_DayOHLCResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-        b_Open, b_High, b_Low, b_PrevDayClose, b_Reserved  = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:12], l_msg[4][12:16], l_msg[4][16:]
-
-        flt_1 = unpack("f", b_Open)
-        l_Openflt = float('.'.join(str(elem) for elem in flt_1))
-        l_Open = round(l_Openflt, 2)
-
-        flt_2 = unpack("f", b_High)
-        l_Highflt = float('.'.join(str(elem) for elem in flt_2))
-        l_High = round(l_Highflt, 2)
-
-        flt_3 = unpack("f", b_Low)
-        l_Lowflt = float('.'.join(str(elem) for elem in flt_3))
-        l_Low = round(l_Lowflt, 2)
-
-        flt_4 = unpack("f", b_PrevDayClose)
-        l_PrevDayCloseflt = float('.'.join(str(elem) for elem in flt_4))
-        l_PrevDayClose = round(l_PrevDayCloseflt, 2)
-
-        # l_Reserved = b_Reserved.decode()    
-
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_DayOHLCResponseData["Exchange"] = "NSE"
-            else :
-                l_DayOHLCResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_DayOHLCResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_DayOHLCResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_DayOHLCResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_DayOHLCResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_DayOHLCResponseData["Exchange"] = "BSEFO"
-
-        # l_DayOHLCResponseData["Exchange"] = l_exchange
-        l_DayOHLCResponseData["Scrip Code"] = l_scrip
-        l_DayOHLCResponseData["Time"] = l_time
-        # l_DayOHLCResponseData["Type"] = "DayOHLC"      #l_msgtype
-
-        l_DayOHLCResponseData["Open"] = l_Open
-        l_DayOHLCResponseData["High"] = l_High
-        l_DayOHLCResponseData["Low"] = l_Low
-        l_DayOHLCResponseData["PrevDayClose"] = l_PrevDayClose
-        # l_DayOHLCResponseData["Reserved"]= l_Reserved
-
-        self._TCPBroadcast_on_message("DayOHLC",l_DayOHLCResponseData)
-    
-
-    def TCPDPR(self, f_msg):
-        l_DPRResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-        b_UpperCktLimit, b_LowerCktLimit, b_Reserved  = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:]
-
-        flt_1 = unpack("f", b_UpperCktLimit)
-        l_UpperCktLimitflt = float('.'.join(str(elem) for elem in flt_1))
-        l_UpperCktLimit = round(l_UpperCktLimitflt, 2)
-
-        flt_2 = unpack("f", b_LowerCktLimit)
-        l_LowerCktLimitflt = float('.'.join(str(elem) for elem in flt_2))
-        l_LowerCktLimit = round(l_LowerCktLimitflt, 2)
-
-        # l_Reserved = b_Reserved.decode()
-
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_DPRResponseData["Exchange"] = "NSE"
-            else :
-                l_DPRResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_DPRResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_DPRResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_DPRResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_DPRResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_DPRResponseData["Exchange"] = "BSEFO"
-
-        # l_DPRResponseData["Exchange"] = l_exchange
-        l_DPRResponseData["Scrip Code"] = l_scrip
-        l_DPRResponseData["Time"] = l_time
-        # l_DPRResponseData["Type"] = "DPR"      #l_msgtype
-
-        l_DPRResponseData["UpperCktLimit"] = l_UpperCktLimit
-        l_DPRResponseData["LowerCktLimit"] = l_LowerCktLimit
-        # l_DPRResponseData["Reserved"] = l_Reserved
-
-        self._TCPBroadcast_on_message("DPR",l_DPRResponseData)
+    def TCPDayOHLC(self, f_frames):
+        l_messages = self.BroadcastMessages("DayOHLC", f_frames)
+        for l_message in l_messages:
+            self._TCPBroadcast_on_message("DayOHLC",l_message)
+        return l_messages
 
+    def TCPDPR(self, f_frames):
+        l_messages = self.BroadcastMessages("DPR", f_frames)
+        for l_message in l_messages:
+            self._TCPBroadcast_on_message("DPR",l_message)
+        return l_messages
 
     def TCPHeartbeat(self, f_msg):
         # print("Heartbeat Request Packet Received")
@@ -2911,99 +2857,24 @@ class MOFSLOPENAPI(object):
         # print(HeartbeatPacket)
         self.s.send(HeartbeatPacket)
         Log_Message = ("TCPHeartbeat response packet  %s sent"%(HeartbeatPacket))
-        WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message)
+        WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", Log_Message, True)
         # print("Heartbeat Response Packet sent")
 
-    def TCPIndex(self, f_msg):
-        # print("Index H Packet")
-        l_IndexResponseData = {}
-        l_msg = f_msg
-        l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-        b_Rate, b_Reserved  = l_msg[4][:4], l_msg[4][4:]
+    def TCPIndex(self, f_frames):
+        l_messages = self.BroadcastMessages("Index", f_frames)
+        for l_message in l_messages:
+            self._TCPBroadcast_on_message("Index",l_message)
+        return l_messages
 
-        flt_1 = unpack("f", b_Rate)
-        l_Rateflt = float('.'.join(str(elem) for elem in flt_1))
-        l_Rate = round(l_Rateflt, 2)
-
-        # l_Reserved = b_Reserved.decode()
-
-        if l_exchange == "N":
-            if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                l_IndexResponseData["Exchange"] = "NSE"
-            else :
-                l_IndexResponseData["Exchange"] = "NSEFO"
-        elif l_exchange == "B":
-            l_IndexResponseData["Exchange"] = "BSE"
-        elif l_exchange == "M":
-            l_IndexResponseData["Exchange"] = "MCX"
-        elif l_exchange == "D":
-            l_IndexResponseData["Exchange"] = "NCDEX"
-        elif l_exchange == "C":
-            l_IndexResponseData["Exchange"] = "NSECD"
-        elif l_exchange == "G":
-            l_IndexResponseData["Exchange"] = "BSEFO" 
-
-        # l_IndexResponseData["Exchange"] = l_exchange
-        l_IndexResponseData["Scrip Code"] = l_scrip
-        l_IndexResponseData["Time"] = l_time
-        # l_IndexResponseData["Type"] = "Index" #l_msgtype
-
-        l_IndexResponseData["Rate"] = l_Rate
-        # l_IndexResponseData["Reserved"] = l_Reserved
-
-        # print("Index H Packetafter")
-        self._TCPBroadcast_on_message("Index",l_IndexResponseData)
-
-    def TCPOpenInterest(self, f_msg):
+    def TCPOpenInterest(self, f_frames):
         try :
-
-            l_OpenInterestResponseData = {}
-            l_msg = f_msg
-            l_exchange, l_scrip, l_time, l_msgtype = l_msg[0], l_msg[1], l_msg[2], l_msg[3]
-
-            b_OpenInterest, b_OpenInterestHigh, b_OpenInterestLow, b_Reserved  = l_msg[4][:4], l_msg[4][4:8], l_msg[4][8:12], l_msg[4][12:]
-            # flt_1 = unpack("f", b_Rate)
-            # l_Rateflt = float('.'.join(str(elem) for elem in flt_1))
-            # l_Rate = round(l_Rateflt, 2)
-
-            l_OpenInterest = int.from_bytes(b_OpenInterest, byteorder= "little", signed=True)
-            l_OpenInterestHigh = int.from_bytes(b_OpenInterestHigh, byteorder= "little", signed=True)
-            l_OpenInterestLow = int.from_bytes(b_OpenInterestLow, byteorder= "little", signed=True)
-
-            # l_Reserved = b_Reserved.decode()
-
-            if l_exchange == "N":
-                if l_scrip <= 34999 or (l_scrip >= 888801 and l_scrip <= 888820):
-                    l_OpenInterestResponseData["Exchange"] = "NSE"
-                else :
-                    l_OpenInterestResponseData["Exchange"] = "NSEFO"
-            elif l_exchange == "B":
-                l_OpenInterestResponseData["Exchange"] = "BSE"
-            elif l_exchange == "M":
-                l_OpenInterestResponseData["Exchange"] = "MCX"
-            elif l_exchange == "D":
-                l_OpenInterestResponseData["Exchange"] = "NCDEX"
-            elif l_exchange == "C":
-                l_OpenInterestResponseData["Exchange"] = "NSECD"
-            elif l_exchange == "G":
-                l_OpenInterestResponseData["Exchange"] = "BSEFO"
-
-
-            # l_OpenInterestResponseData["Exchange"] = l_exchange
-            l_OpenInterestResponseData["Scrip Code"] = l_scrip
-            l_OpenInterestResponseData["Time"] = l_time
-            # l_OpenInterestResponseData["Type"] = "OpenInterest"  #l_msgtype
-
-            l_OpenInterestResponseData["Open Interest"] = l_OpenInterest
-            l_OpenInterestResponseData["Open Interest High"] = l_OpenInterestHigh
-            l_OpenInterestResponseData["Open Interest Low"] = l_OpenInterestLow
-            # l_OpenInterestResponseData["Reserved"] = l_Reserved
-
-            self._TCPBroadcast_on_message("OpenInterest",l_OpenInterestResponseData)
+            l_messages = self.BroadcastMessages("OpenInterest", f_frames)
+            for l_message in l_messages:
+                self._TCPBroadcast_on_message("OpenInterest",l_message)
+            return l_messages
         except Exception as e :
             print(e)
-
+            return []
 
 
     def TCPBroadcast_connect(self):
@@ -3050,6 +2921,7 @@ class MOFSLOPENAPI(object):
 
         else:
             WriteIntoLog_Broadcast("SUCCESS", "MOFSLOPENAPI.py", "TCPBroadcast Connection Opened")
+            self.m_TCPBroadcastStream.Reset()
             self._TCPBroadcast_on_open()
 
             if self.TCPBroadcastAutoRelogin_flag:
@@ -3077,17 +2949,9 @@ class MOFSLOPENAPI(object):
             if not data :
                 pass
             else:
-                if len(data) >= 102400:
-                    pass
-                    # print(len(data))
-                    # WriteIntoLog_Broadcast("FAILED", "MOFSLOPENAPI.py", "len(data)" +str(len(data)))
-                elif len(data) < 30:
-                    pass
-                    # print(len(data))
-                    # WriteIntoLog_Broadcast("FAILED", "MOFSLOPENAPI.py", "len(data)" +str(len(data)))
-                else :
-                    self.TCPBroadcastAutoRelogin_counter = 1
-                    self.TCPPacket_Condition(data)
+                # Short and full-buffer reads are split frames, TCPPacket_Condition carries the remainder over
+                self.TCPBroadcastAutoRelogin_counter = 1
+                self.TCPPacket_Condition(data)
                     
 
     def _TCPBroadcast_on_open(self):
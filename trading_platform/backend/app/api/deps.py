@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.session import AsyncSessionLocal, ReadSessionLocal, SessionLocal
+
+
+def get_db() -> Iterator[Session]:
+    """Blocking session for the request, used by the sync (threadpool) endpoints."""
+    with session_scope() as db:
+        yield db
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """AsyncSession for the request on the primary database."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db() -> AsyncIterator[AsyncSession]:
+    """
+    Read-only AsyncSession for the request.
+
+    Served by READ_REPLICA_URL when configured, autoflush is off, objects are not
+    expired on commit and any attempt to flush changes raises.
+    """
+    async with ReadSessionLocal() as db:
+        yield db
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Blocking session for code outside a request, e.g. the startup hook."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
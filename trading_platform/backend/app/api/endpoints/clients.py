@@ -1,24 +1,19 @@
-from typing import List
+import asyncio
+from typing import List, Dict, Any
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import SessionLocal
+from app.api.deps import get_db, get_read_db
 from app.models.client import Client as ClientModel
-from app.schemas.client import Client, ClientCreate
-from app.core.security import encrypt, decrypt
-from app.services.mofsl_api_service import MofslApiService
+from app.schemas.client import Client, ClientCreate, ClientUpdate
+from app.core.security import encrypt, decrypt_client_credentials, invalidate_client_credentials
+from app.services.mofsl_api_service import session_registry
+from app.services.pnl_engine import net_position, pnl_engine
 
 router = APIRouter()
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=Client, status_code=status.HTTP_201_CREATED)
 def create_client(client: ClientCreate, db: Session = Depends(get_db)):
     """
@@ -59,12 +54,39 @@ def get_client_details(client_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Client not found")
     return client
 
+@router.patch("/{client_id}", response_model=Client)
+def update_client(client_id: UUID, client_update: ClientUpdate, db: Session = Depends(get_db)):
+    """
+    Update a client's name and/or credentials.
+
+    Changed credentials are dropped from the credential cache and the client's
+    MOFSL sessions are evicted, so the next request logs in with the new ones.
+    """
+    client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    if client_update.name is not None:
+        client.name = client_update.name
+    credentials_changed = client_update.api_key is not None or client_update.api_secret is not None
+    if client_update.api_key is not None:
+        client.api_key_encrypted = encrypt(client_update.api_key)
+    if client_update.api_secret is not None:
+        client.api_secret_encrypted = encrypt(client_update.api_secret)
+    db.commit()
+    db.refresh(client)
+
+    if credentials_changed:
+        invalidate_client_credentials(client.id)
+        session_registry.invalidate(client.client_id)
+    return client
+
 @router.get("/{client_id}/portfolio")
-def get_client_portfolio(client_id: UUID, db: Session = Depends(get_db)):
+async def get_client_portfolio(client_id: UUID, db: AsyncSession = Depends(get_read_db)):
     """
     Fetch portfolio (positions and margin) for a specific client from MOFSL API.
     """
-    client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+    client = await db.get(ClientModel, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
@@ -72,15 +94,16 @@ def get_client_portfolio(client_id: UUID, db: Session = Depends(get_db)):
         # This is a placeholder for fetching the real password and 2FA
         # In a real app, you'd have a secure way to get these, perhaps from a vault
         # or by prompting the user. For now, we assume they are available.
-        decrypted_api_key = decrypt(client.api_key_encrypted)
-        decrypted_api_secret = decrypt(client.api_secret_encrypted)
+        decrypted_api_key, decrypted_api_secret = decrypt_client_credentials(
+            client.id, client.api_key_encrypted, client.api_secret_encrypted
+        )
         
         # IMPORTANT: Hardcoding password and 2FA is insecure.
         # This is a placeholder for demonstration purposes.
         temp_password = "SOME_SECURE_PASSWORD"
         temp_2fa = "SOME_2FA_VALUE"
 
-        mofsl_service = MofslApiService(
+        mofsl_service = await session_registry.get(
             api_key=decrypted_api_key,
             api_secret=decrypted_api_secret,
             client_id=client.client_id,
@@ -88,8 +111,10 @@ def get_client_portfolio(client_id: UUID, db: Session = Depends(get_db)):
             two_fa=temp_2fa,
         )
 
-        positions = mofsl_service.get_positions()
-        margin = mofsl_service.get_margin()
+        positions, margin = await asyncio.gather(
+            mofsl_service.get_positions(),
+            mofsl_service.get_margin(),
+        )
 
         return {"positions": positions, "margin_summary": margin}
 
@@ -101,24 +126,25 @@ def get_client_portfolio(client_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
 
 @router.get("/{client_id}/active-trades", response_model=List[Dict[str, Any]])
-async def get_client_active_trades(client_id: UUID, db: Session = Depends(get_db)):
+async def get_client_active_trades(client_id: UUID, db: AsyncSession = Depends(get_read_db)):
     """
     Retrieve a list of a single client's active trades (open positions).
     """
-    client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+    client = await db.get(ClientModel, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
     try:
-        decrypted_api_key = decrypt(client.api_key_encrypted)
-        decrypted_api_secret = decrypt(client.api_secret_encrypted)
+        decrypted_api_key, decrypted_api_secret = decrypt_client_credentials(
+            client.id, client.api_key_encrypted, client.api_secret_encrypted
+        )
 
         # IMPORTANT: Hardcoding password and 2FA is insecure.
         # This is a placeholder for demonstration purposes.
         temp_password = "SOME_SECURE_PASSWORD"
         temp_2fa = "SOME_2FA_VALUE"
 
-        mofsl_service = MofslApiService(
+        mofsl_service = await session_registry.get(
             api_key=decrypted_api_key,
             api_secret=decrypted_api_secret,
             client_id=client.client_id,
@@ -126,26 +152,18 @@ async def get_client_active_trades(client_id: UUID, db: Session = Depends(get_db
             two_fa=temp_2fa,
         )
 
-        all_positions = mofsl_service.get_positions()
+        all_positions = await mofsl_service.get_positions()
+        # The live P&L takes the broker's quantities and average prices over the DB ones
+        pnl_engine.apply_broker_positions(client.id, all_positions)
         
         active_trades = []
         if all_positions and isinstance(all_positions, dict) and "data" in all_positions:
             for position in all_positions["data"]:
-                buy_quantity = position.get("buyquantity", 0)
-                sell_quantity = position.get("sellquantity", 0)
-                net_quantity = buy_quantity - sell_quantity
+                net_quantity, avg_price = net_position(position)
 
                 if net_quantity != 0:
                     symbol = position.get("symbol")
                     ltp = position.get("LTP")
-                    buy_amount = position.get("buyamount", 0)
-                    sell_amount = position.get("sellamount", 0)
-
-                    avg_price = 0.0
-                    if net_quantity > 0 and buy_quantity > 0:
-                        avg_price = buy_amount / buy_quantity
-                    elif net_quantity < 0 and sell_quantity > 0:
-                        avg_price = sell_amount / sell_quantity
 
                     active_trades.append({
                         "symbol": symbol,
@@ -1,285 +1,448 @@
-from typing import List, Dict, Any
-from uuid import UUID
+import asyncio
+from functools import partial
+from typing import List, Dict, Any, Optional, Iterable, Set, Tuple
+from uuid import UUID, uuid4
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, insert, select
 from datetime import datetime
 
-from app.db.session import SessionLocal
+from app.api.deps import get_async_db
 from app.models.client import Client as ClientModel
 from app.models.trade import Trade as TradeModel, TradeStatus
 from app.models.execution import Execution as ExecutionModel, ExecutionType
 from app.models.token import Token as TokenModel
 from app.schemas.order import OrderPayload, OrderResponse, TokenExitPayload
-from app.core.security import decrypt
-from app.services.mofsl_api_service import MofslApiService
+from app.core.config import settings
+from app.core.security import decrypt_client_credentials
+from app.services.fanout import gather_bounded
+from app.services.mofsl_api_service import AsyncMofslApiService, OrderNotConfirmed, session_registry
+from app.services.pnl_engine import pnl_engine
 
 router = APIRouter()
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
+def _error_response(client_id: UUID, message: str) -> OrderResponse:
+    return OrderResponse(
+        mofsl_order_id="N/A",
+        client_id=client_id,
+        status="ERROR",
+        message=message
+    )
+
+def _broker_error_response(client_id: UUID, error: BaseException) -> OrderResponse:
+    """Maps an exception raised by a fanned out broker call to an error OrderResponse."""
+    if isinstance(error, OrderNotConfirmed):
+        # The order may have been placed, reporting it as failed would invite a duplicate retry
+        return OrderResponse(
+            mofsl_order_id="N/A",
+            client_id=client_id,
+            status="UNKNOWN",
+            message=f"{error.detail}. The order may have been placed, check the order book before retrying"
+        )
+    if isinstance(error, asyncio.TimeoutError):
+        return _error_response(client_id, f"API Error: No response from MOFSL within {settings.ORDER_CLIENT_TIMEOUT}s")
+    if isinstance(error, HTTPException):
+        return _error_response(client_id, f"API Error: {error.detail}")
+    return _error_response(client_id, f"An unexpected error occurred: {error}")
+
+async def _get_token(db: AsyncSession, symbol: str, exchange: str) -> Optional[TokenModel]:
+    result = await db.execute(
+        select(TokenModel).where(and_(TokenModel.symbol == symbol, TokenModel.exchange == exchange))
+    )
+    return result.scalars().first()
+
+async def _load_clients(db: AsyncSession, client_ids: Iterable[UUID]) -> Dict[UUID, ClientModel]:
+    """Fetches every referenced client with one IN query."""
+    client_ids = set(client_ids)
+    if not client_ids:
+        return {}
+    result = await db.execute(select(ClientModel).where(ClientModel.id.in_(client_ids)))
+    return {client.id: client for client in result.scalars()}
+
+async def _load_open_trades(db: AsyncSession, client_ids: Iterable[UUID], token_id: int) -> Dict[UUID, TradeModel]:
+    """Fetches the open trade in token_id of every given client with one IN query."""
+    client_ids = set(client_ids)
+    if not client_ids:
+        return {}
+    result = await db.execute(
+        select(TradeModel).where(
+            and_(
+                TradeModel.client_id.in_(client_ids),
+                TradeModel.token_id == token_id,
+                TradeModel.status == TradeStatus.open
+            )
+        ).order_by(TradeModel.entry_timestamp)
+    )
+    trades = result.scalars()
+
+    open_trades = {}
+    for trade in trades:
+        open_trades.setdefault(trade.client_id, trade)
+    return open_trades
+
+def _placement_failure(client_id: UUID, order_status: str, mofsl_order_id: str, message: str) -> Optional[OrderResponse]:
+    """
+    Returns the response for an order MOFSL did not place, None if it was placed.
+
+    Failed placements carry no order id ("N/A"), nothing is recorded for them.
+    """
+    if order_status == "SUCCESS" and mofsl_order_id != "N/A":
+        return None
+    return OrderResponse(
+        mofsl_order_id=mofsl_order_id,
+        client_id=client_id,
+        status=order_status if order_status != "SUCCESS" else "ERROR",
+        message=message
+    )
+
+def _execution_error(trade: Optional[TradeModel], mofsl_order_id: str, order_ids: Set[str]) -> Optional[str]:
+    """Returns why an execution can not be recorded, None if it can."""
+    if trade is None:
+        return f"Order {mofsl_order_id} placed but there is no open trade to record it against"
+    if mofsl_order_id in order_ids:
+        return f"Order {mofsl_order_id} placed but its order id was already recorded in this batch"
+    return None
+
+async def _commit_executions(db: AsyncSession, executions: List[Dict[str, Any]], responses: List[OrderResponse], recorded: List[int]):
+    """
+    Writes the pending trade changes and all execution rows in a single transaction.
+
+    If the transaction fails nothing is recorded, the responses at the `recorded`
+    indexes are then turned into errors that still carry the MOFSL order id.
+    """
     try:
-        yield db
-    finally:
-        db.close()
+        await db.flush()  # New trades first, the executions reference them
+        if executions:
+            await db.execute(insert(ExecutionModel), executions)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        for index in recorded:
+            response = responses[index]
+            responses[index] = OrderResponse(
+                mofsl_order_id=response.mofsl_order_id,
+                client_id=response.client_id,
+                status="ERROR",
+                message=f"Order placed but could not be recorded: {e}"
+            )
+
+async def _login_client(client: ClientModel) -> AsyncMofslApiService:
+    decrypted_api_key, decrypted_api_secret = decrypt_client_credentials(
+        client.id, client.api_key_encrypted, client.api_secret_encrypted
+    )
+
+    temp_password = "SOME_SECURE_PASSWORD"
+    temp_2fa = "SOME_2FA_VALUE"
+
+    return await session_registry.get(
+        api_key=decrypted_api_key,
+        api_secret=decrypted_api_secret,
+        client_id=client.client_id,
+        password=temp_password,
+        two_fa=temp_2fa,
+    )
+
+def _fill_price(order_book: Any, mofsl_order_id: str) -> Optional[float]:
+    """Returns the average traded price of an order in a MOFSL order book response, None while it is not known."""
+    if not (order_book and isinstance(order_book, dict) and isinstance(order_book.get("data"), list)):
+        return None
+    for order in order_book["data"]:
+        if mofsl_order_id in (str(order.get("uniqueorderid")), str(order.get("orderid"))):
+            price = float(order.get("averageprice") or 0.0)
+            return price if price > 0 else None
+    return None
+
+async def _place_order(mofsl_service: AsyncMofslApiService, order_details: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[float]]:
+    """Places an order, then reads its fill price from the order book: (MOFSL response, fill price or None)."""
+    response = await mofsl_service.place_order(order_details)
+    mofsl_order_id = response.get("data", {}).get("orderid", "N/A")
+    if response.get("status") != "SUCCESS" or mofsl_order_id == "N/A":
+        return response, None
+    try:
+        order_book = await asyncio.wait_for(mofsl_service.get_order_book(), settings.ORDER_CLIENT_TIMEOUT)
+    except Exception:
+        return response, None  # The order stands, only its price is not known yet
+    return response, _fill_price(order_book, str(mofsl_order_id))
+
+async def _login_and_place_order(client: ClientModel, order_details: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[float]]:
+    # Only the login is cut off by ORDER_CLIENT_TIMEOUT, cancelling a sent order would leave its outcome unknown
+    mofsl_service = await asyncio.wait_for(_login_client(client), settings.ORDER_CLIENT_TIMEOUT)
+    return await _place_order(mofsl_service, order_details)
 
 @router.post("/execute-all", response_model=List[OrderResponse], status_code=status.HTTP_200_OK)
-async def execute_all_orders(order_payload: OrderPayload, db: Session = Depends(get_db)):
+async def execute_all_orders(order_payload: OrderPayload, db: AsyncSession = Depends(get_async_db)):
     """
     Execute a batch of orders for multiple clients.
-    """
-    responses = []
 
+    Logins and order placements are sent to MOFSL concurrently (up to
+    ORDER_FANOUT_CONCURRENCY at a time, each login bounded by ORDER_CLIENT_TIMEOUT),
+    the results are then recorded in the DB and returned in input order. An order
+    MOFSL did not answer is reported as UNKNOWN, not as failed.
+    """
     # Fetch token_id for the given token_symbol and token_exchange
-    token = db.query(TokenModel).filter(
-        and_(TokenModel.symbol == order_payload.token_symbol, TokenModel.exchange == order_payload.token_exchange)
-    ).first()
+    token = await _get_token(db, order_payload.token_symbol, order_payload.token_exchange)
 
     if not token:
         # If token doesn't exist, create it. In a real scenario, you might want more robust token management.
-        new_token = TokenModel(symbol=order_payload.token_symbol, exchange=order_payload.token_exchange, description="")
+        new_token = TokenModel(
+            symbol=order_payload.token_symbol,
+            exchange=order_payload.token_exchange,
+            scrip_code=order_payload.token_scrip_code,
+            exchange_type=order_payload.token_exchange_type,
+            description="",
+        )
         db.add(new_token)
-        db.commit()
-        db.refresh(new_token)
+        await db.commit()
+        await db.refresh(new_token)
         token = new_token
+    else:
+        if token.scrip_code is None and order_payload.token_scrip_code is not None:
+            token.scrip_code = order_payload.token_scrip_code
+        if token.exchange_type is None and order_payload.token_exchange_type is not None:
+            token.exchange_type = order_payload.token_exchange_type
+
+    # 1. Bulk load the clients and their open trades; the DB session is not used by the concurrent broker calls
+    clients = await _load_clients(db, (client_order.client_id for client_order in order_payload.client_orders))
+    open_trades = await _load_open_trades(db, clients, token.id)
+
+    # 2. Login and place every order concurrently
+    calls = []
+    for client_order in order_payload.client_orders:
+        client = clients.get(client_order.client_id)
+        if not client:
+            continue
 
+        # Placeholder for actual order placement details
+        order_details = {
+            "symbol": order_payload.token_symbol,
+            "exchange": order_payload.token_exchange,
+            "quantity": client_order.quantity,
+            "type": order_payload.order_type,
+            "side": order_payload.buy_or_sell,
+            "producttype": order_payload.trade_type,
+            # Add other necessary fields for MOFSL API place order
+        }
+        calls.append(partial(_login_and_place_order, client, order_details))
+
+    results = iter(await gather_bounded(calls, settings.ORDER_FANOUT_CONCURRENCY, None))
+
+    # 3. Build the trade changes and execution rows in input order, then write them in one transaction
+    execution_type = ExecutionType.buy if order_payload.buy_or_sell == "BUY" else ExecutionType.sell
+    responses = []
+    recorded = []
+    executions = []
+    order_ids = set()
     for client_order in order_payload.client_orders:
-        client = db.query(ClientModel).filter(ClientModel.id == client_order.client_id).first()
+        client = clients.get(client_order.client_id)
         if not client:
-            responses.append(OrderResponse(
-                mofsl_order_id="N/A",
-                client_id=client_order.client_id,
-                status="ERROR",
-                message="Client not found"
-            ))
+            responses.append(_error_response(client_order.client_id, "Client not found"))
             continue
 
-        try:
-            decrypted_api_key = decrypt(client.api_key_encrypted)
-            decrypted_api_secret = decrypt(client.api_secret_encrypted)
+        result = next(results)
+        if isinstance(result, BaseException):
+            responses.append(_broker_error_response(client_order.client_id, result))
+            continue
+        mofsl_response, fill_price = result
 
-            temp_password = "SOME_SECURE_PASSWORD"
-            temp_2fa = "SOME_2FA_VALUE"
+        order_status = mofsl_response.get("status", "ERROR")
+        mofsl_order_id = mofsl_response.get("data", {}).get("orderid", "N/A")
+        message = mofsl_response.get("message", "Order placement failed")
 
-            mofsl_service = MofslApiService(
-                api_key=decrypted_api_key,
-                api_secret=decrypted_api_secret,
-                client_id=client.client_id,
-                password=temp_password,
-                two_fa=temp_2fa,
-            )
+        failure = _placement_failure(client_order.client_id, order_status, mofsl_order_id, message)
+        if failure:
+            responses.append(failure)
+            continue
 
-            # Placeholder for actual order placement details
-            order_details = {
-                "symbol": order_payload.token_symbol,
-                "exchange": order_payload.token_exchange,
-                "quantity": client_order.quantity,
-                "type": order_payload.order_type,
-                "side": order_payload.buy_or_sell,
-                "producttype": order_payload.trade_type,
-                # Add other necessary fields for MOFSL API place order
-            }
-            mofsl_response = mofsl_service.place_order(order_details)
-
-            order_status = mofsl_response.get("status", "ERROR")
-            mofsl_order_id = mofsl_response.get("data", {}).get("orderid", "N/A")
-            message = mofsl_response.get("message", "Order placement failed")
-
-            # Create a new Trade record if it's a BUY order and no open trade exists for this token/client
-            # Or update existing trade for SELL orders
-            trade = db.query(TradeModel).filter(
-                and_(
-                    TradeModel.client_id == client.id,
-                    TradeModel.token_id == token.id,
-                    TradeModel.status == TradeStatus.open
+        # Create a new Trade record if it's a BUY order and no open trade exists for this token/client
+        # Or update existing trade for SELL orders
+        trade = open_trades.get(client.id)
+        if order_payload.buy_or_sell == "BUY":
+            if not trade:
+                trade = TradeModel(
+                    id=uuid4(),
+                    client_id=client.id,
+                    token_id=token.id,
+                    quantity=client_order.quantity,
+                    avg_entry_price=fill_price or 0.0, # 0.0 while the fill price is not known
+                    status=TradeStatus.open
                 )
-            ).first()
-
-            if order_payload.buy_or_sell == "BUY":
-                if not trade:
-                    trade = TradeModel(
-                        client_id=client.id,
-                        token_id=token.id,
-                        quantity=client_order.quantity,
-                        avg_entry_price=0.0, # This should be updated with actual execution price
-                        status=TradeStatus.open
-                    )
-                    db.add(trade)
-                else:
-                    # For simplicity, just updating quantity. Real logic would average price.
-                    trade.quantity += client_order.quantity
-                db.commit()
-                db.refresh(trade)
-
-            # Record execution
-            execution_type = ExecutionType.buy if order_payload.buy_or_sell == "BUY" else ExecutionType.sell
-            new_execution = ExecutionModel(
-                trade_id=trade.id if trade else None, # Associate with trade if exists
-                mofsl_order_id=mofsl_order_id,
-                type=execution_type,
-                quantity=client_order.quantity,
-                price=0.0, # This should be updated with actual execution price
-            )
-            db.add(new_execution)
-            db.commit()
-            db.refresh(new_execution)
-            if trade: db.refresh(trade)
-
-            responses.append(OrderResponse(
-                mofsl_order_id=mofsl_order_id,
-                client_id=client_order.client_id,
-                status=order_status,
-                message=message
-            ))
+                db.add(trade)
+                open_trades[client.id] = trade
+            else:
+                # Average in the fill, the cost becomes unknown (0.0) when either price is not known
+                known = fill_price and trade.avg_entry_price
+                trade.avg_entry_price = (
+                    (trade.quantity * float(trade.avg_entry_price) + client_order.quantity * fill_price)
+                    / (trade.quantity + client_order.quantity)
+                ) if known else 0.0
+                trade.quantity += client_order.quantity
+
+        error = _execution_error(trade, mofsl_order_id, order_ids)
+        if error:
+            responses.append(_error_response(client_order.client_id, error))
+            continue
 
-        except HTTPException as e:
-            responses.append(OrderResponse(
-                mofsl_order_id="N/A",
-                client_id=client_order.client_id,
-                status="ERROR",
-                message=f"API Error: {e.detail}"
-            ))
-        except Exception as e:
-            responses.append(OrderResponse(
-                mofsl_order_id="N/A",
-                client_id=client_order.client_id,
-                status="ERROR",
-                message=f"An unexpected error occurred: {e}"
-            ))
+        # Record execution
+        order_ids.add(mofsl_order_id)
+        executions.append(dict(
+            id=uuid4(),
+            trade_id=trade.id,
+            mofsl_order_id=mofsl_order_id,
+            type=execution_type,
+            quantity=client_order.quantity,
+            price=fill_price or 0.0, # 0.0 while the fill price is not known
+        ))
+        recorded.append(len(responses))
+        responses.append(OrderResponse(
+            mofsl_order_id=mofsl_order_id,
+            client_id=client_order.client_id,
+            status=order_status,
+            message=message
+        ))
+
+    await _commit_executions(db, executions, responses, recorded)
+    pnl_engine.mark_stale()
     return responses
 
+async def _login_and_get_positions(client: ClientModel):
+    mofsl_service = await _login_client(client)
+    return mofsl_service, await mofsl_service.get_positions()
+
+def _find_exit_position(all_positions: Dict[str, Any], token_symbol: str):
+    """Returns (quantity_to_exit, ltp) of the open position in token_symbol, quantity 0 if there is none."""
+    if all_positions and isinstance(all_positions, dict) and "data" in all_positions:
+        for position in all_positions["data"]:
+            if position.get("symbol") == token_symbol:
+                buy_quantity = position.get("buyquantity", 0)
+                sell_quantity = position.get("sellquantity", 0)
+                net_quantity = buy_quantity - sell_quantity
+
+                if net_quantity != 0: # Only consider open positions
+                    return abs(net_quantity), position.get("LTP", 0.0) # Exit the absolute net quantity
+    return 0, 0.0
+
 @router.post("/exit-token", response_model=List[OrderResponse], status_code=status.HTTP_200_OK)
-async def exit_token_for_clients(exit_payload: TokenExitPayload, db: Session = Depends(get_db)):
+async def exit_token_for_clients(exit_payload: TokenExitPayload, db: AsyncSession = Depends(get_async_db)):
     """
     Handle bulk exiting a position in a specific token across multiple clients.
-    """
-    responses = []
 
-    token = db.query(TokenModel).filter(
-        and_(TokenModel.symbol == exit_payload.token_symbol, TokenModel.exchange == exit_payload.token_exchange)
-    ).first()
+    Positions of all clients are fetched concurrently, the exit quantities are
+    computed from that snapshot and the exit orders are then placed concurrently,
+    both bounded by ORDER_FANOUT_CONCURRENCY. Only the logins and position fetches
+    are cut off by ORDER_CLIENT_TIMEOUT; an exit order MOFSL did not answer is
+    reported as UNKNOWN and its trade left open, the position may already be closed.
+    """
+    token = await _get_token(db, exit_payload.token_symbol, exit_payload.token_exchange)
 
     if not token:
         raise HTTPException(status_code=404, detail=f"Token {exit_payload.token_symbol} on {exit_payload.token_exchange} not found in system.")
 
-    for client_id in exit_payload.clients_to_exit:
-        client = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+    client_by_id = await _load_clients(db, exit_payload.clients_to_exit)
+    open_trades = await _load_open_trades(db, client_by_id, token.id)
+    clients = [client_by_id.get(client_id) for client_id in exit_payload.clients_to_exit]
+
+    # 1. Login and get every client's current positions concurrently
+    found = [client for client in clients if client]
+    snapshots = await gather_bounded(
+        [partial(_login_and_get_positions, client) for client in found],
+        settings.ORDER_FANOUT_CONCURRENCY, settings.ORDER_CLIENT_TIMEOUT,
+    )
+    snapshot_by_client = dict(zip((client.id for client in found), snapshots))
+
+    # 2. One pass over the snapshot to work out what each client has to exit
+    responses: List[Optional[OrderResponse]] = []
+    exits = []  # (index into responses, client, mofsl_service, quantity_to_exit, ltp)
+    for client_id, client in zip(exit_payload.clients_to_exit, clients):
         if not client:
+            responses.append(_error_response(client_id, "Client not found"))
+            continue
+
+        snapshot = snapshot_by_client[client.id]
+        if isinstance(snapshot, BaseException):
+            responses.append(_broker_error_response(client_id, snapshot))
+            continue
+
+        mofsl_service, all_positions = snapshot
+        pnl_engine.apply_broker_positions(client.id, all_positions)
+        quantity_to_exit, current_ltp = _find_exit_position(all_positions, exit_payload.token_symbol)
+        if quantity_to_exit == 0:
             responses.append(OrderResponse(
                 mofsl_order_id="N/A",
                 client_id=client_id,
-                status="ERROR",
-                message="Client not found"
+                status="SKIPPED",
+                message=f"No open position found for {exit_payload.token_symbol} for client {client.client_id}"
             ))
             continue
 
-        try:
-            decrypted_api_key = decrypt(client.api_key_encrypted)
-            decrypted_api_secret = decrypt(client.api_secret_encrypted)
-
-            temp_password = "SOME_SECURE_PASSWORD"
-            temp_2fa = "SOME_2FA_VALUE"
-
-            mofsl_service = MofslApiService(
-                api_key=decrypted_api_key,
-                api_secret=decrypted_api_secret,
-                client_id=client.client_id,
-                password=temp_password,
-                two_fa=temp_2fa,
-            )
-
-            # 1. Get client's current positions to find the quantity of the token
-            all_positions = mofsl_service.get_positions()
-            position_found = False
-            quantity_to_exit = 0
-            current_ltp = 0.0
-
-            if all_positions and isinstance(all_positions, dict) and "data" in all_positions:
-                for position in all_positions["data"]:
-                    if position.get("symbol") == exit_payload.token_symbol:
-                        buy_quantity = position.get("buyquantity", 0)
-                        sell_quantity = position.get("sellquantity", 0)
-                        net_quantity = buy_quantity - sell_quantity
-
-                        if net_quantity != 0: # Only consider open positions
-                            quantity_to_exit = abs(net_quantity) # Exit the absolute net quantity
-                            current_ltp = position.get("LTP", 0.0)
-                            position_found = True
-                            break
-            
-            if not position_found or quantity_to_exit == 0:
-                responses.append(OrderResponse(
-                    mofsl_order_id="N/A",
-                    client_id=client_id,
-                    status="SKIPPED",
-                    message=f"No open position found for {exit_payload.token_symbol} for client {client.client_id}"
-                ))
-                continue
-
-            # 2. Construct and place the SELL order
-            order_details = {
-                "symbol": exit_payload.token_symbol,
-                "exchange": exit_payload.token_exchange,
-                "quantity": quantity_to_exit,
-                "type": "MARKET", # Always market order for exit
-                "side": "SELL",
-                "producttype": "INTRADAY", # Assuming intraday for exits, adjust if needed
-                # Add other necessary fields for MOFSL API place order
-            }
-            mofsl_response = mofsl_service.place_order(order_details)
-
-            order_status = mofsl_response.get("status", "ERROR")
-            mofsl_order_id = mofsl_response.get("data", {}).get("orderid", "N/A")
-            message = mofsl_response.get("message", "Order placement failed")
-
-            # 3. Update Trade status and record Execution in DB
-            trade = db.query(TradeModel).filter(
-                and_(
-                    TradeModel.client_id == client.id,
-                    TradeModel.token_id == token.id,
-                    TradeModel.status == TradeStatus.open
-                )
-            ).first()
+        exits.append((len(responses), client, mofsl_service, quantity_to_exit, current_ltp))
+        responses.append(None)
+
+    # 3. Place all the SELL orders concurrently
+    calls = []
+    for _, _, mofsl_service, quantity_to_exit, _ in exits:
+        order_details = {
+            "symbol": exit_payload.token_symbol,
+            "exchange": exit_payload.token_exchange,
+            "quantity": quantity_to_exit,
+            "type": "MARKET", # Always market order for exit
+            "side": "SELL",
+            "producttype": "INTRADAY", # Assuming intraday for exits, adjust if needed
+            # Add other necessary fields for MOFSL API place order
+        }
+        calls.append(partial(_place_order, mofsl_service, order_details))
+
+    # No timeout: cancelling a sent SELL would leave its outcome unknown and a retry could sell twice
+    results = await gather_bounded(calls, settings.ORDER_FANOUT_CONCURRENCY, None)
+
+    # 4. Close the trades and record the executions in one transaction
+    recorded = []
+    executions = []
+    order_ids = set()
+    for (index, client, _, quantity_to_exit, current_ltp), result in zip(exits, results):
+        client_id = exit_payload.clients_to_exit[index]
+        if isinstance(result, BaseException):
+            responses[index] = _broker_error_response(client_id, result)
+            continue
+        mofsl_response, fill_price = result
+        exit_price = fill_price or current_ltp  # The LTP of the position snapshot until the fill is known
 
-            if trade:
-                trade.status = TradeStatus.closed
-                trade.exit_price = current_ltp # Use current LTP as exit price
-                trade.exit_timestamp = datetime.now()
-                db.add(trade)
+        order_status = mofsl_response.get("status", "ERROR")
+        mofsl_order_id = mofsl_response.get("data", {}).get("orderid", "N/A")
+        message = mofsl_response.get("message", "Order placement failed")
 
-            new_execution = ExecutionModel(
-                trade_id=trade.id if trade else None, # Associate with trade if exists
-                mofsl_order_id=mofsl_order_id,
-                type=ExecutionType.sell,
-                quantity=quantity_to_exit,
-                price=current_ltp, # Use current LTP as execution price
-            )
-            db.add(new_execution)
-            db.commit()
-            db.refresh(new_execution)
-            if trade: db.refresh(trade)
+        failure = _placement_failure(client_id, order_status, mofsl_order_id, message)
+        if failure:
+            responses[index] = failure
+            continue
 
-            responses.append(OrderResponse(
-                mofsl_order_id=mofsl_order_id,
-                client_id=client_id,
-                status=order_status,
-                message=message
-            ))
+        trade = open_trades.pop(client.id, None)
+        if trade:
+            trade.status = TradeStatus.closed
+            trade.exit_price = exit_price
+            trade.exit_timestamp = datetime.now()
 
-        except HTTPException as e:
-            responses.append(OrderResponse(
-                mofsl_order_id="N/A",
-                client_id=client_id,
-                status="ERROR",
-                message=f"API Error: {e.detail}"
-            ))
-        except Exception as e:
-            responses.append(OrderResponse(
-                mofsl_order_id="N/A",
-                client_id=client_id,
-                status="ERROR",
-                message=f"An unexpected error occurred: {e}"
-            ))
+        error = _execution_error(trade, mofsl_order_id, order_ids)
+        if error:
+            responses[index] = _error_response(client_id, error)
+            continue
 
+        order_ids.add(mofsl_order_id)
+        executions.append(dict(
+            id=uuid4(),
+            trade_id=trade.id,
+            mofsl_order_id=mofsl_order_id,
+            type=ExecutionType.sell,
+            quantity=quantity_to_exit,
+            price=exit_price,
+        ))
+        recorded.append(index)
+        responses[index] = OrderResponse(
+            mofsl_order_id=mofsl_order_id,
+            client_id=client_id,
+            status=order_status,
+            message=message
+        )
+
+    await _commit_executions(db, executions, responses, recorded)
+    pnl_engine.mark_stale()
     return responses
@@ -1,47 +1,55 @@
 from typing import List, Dict, Any
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 
-from app.db.session import SessionLocal
+from app.api.deps import get_read_db
 from app.models.client import Client as ClientModel
 from app.models.trade import Trade as TradeModel, TradeStatus
 from app.models.token import Token as TokenModel
+from app.services.live_mofsl_handler import quote_book
 
 router = APIRouter()
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.get("/quotes/{exchange}/{scrip}", response_model=Dict[str, Any])
+def get_quote(exchange: str, scrip: int):
+    """
+    Retrieve the last known live feed values of a scrip (LTP, market depth, day OHLC, DPR, open interest),
+    keyed by message type in the format of the /ws/pl messages. Read from memory, the broker is not called.
+    """
+    snapshot = quote_book.Snapshot(exchange, scrip)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail=f"No live data received for scrip {scrip} on {exchange}.")
+    return snapshot
 
 @router.get("/{token_symbol}/holders", response_model=List[Dict[str, Any]])
 async def get_token_holders(
     token_symbol: str,
     token_exchange: str, # Assuming exchange is also needed to uniquely identify a token
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Retrieve a list of clients holding open positions for a specific token.
     """
-    token = db.query(TokenModel).filter(
-        and_(TokenModel.symbol == token_symbol, TokenModel.exchange == token_exchange)
-    ).first()
+    result = await db.execute(
+        select(TokenModel).where(and_(TokenModel.symbol == token_symbol, TokenModel.exchange == token_exchange))
+    )
+    token = result.scalars().first()
 
     if not token:
         raise HTTPException(status_code=404, detail=f"Token {token_symbol} on {token_exchange} not found.")
 
     # Query for open trades of this token and join with client details
-    token_holders = db.query(ClientModel, TradeModel).join(TradeModel).filter(
-        and_(
-            TradeModel.token_id == token.id,
-            TradeModel.status == TradeStatus.open
+    result = await db.execute(
+        select(ClientModel, TradeModel).join(TradeModel).where(
+            and_(
+                TradeModel.token_id == token.id,
+                TradeModel.status == TradeStatus.open
+            )
         )
-    ).all()
+    )
+    token_holders = result.all()
 
     result = []
     for client, trade in token_holders:
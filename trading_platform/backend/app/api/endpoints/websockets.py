@@ -1,18 +1,70 @@
+import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.schemas.websocket import ConfigureMessage, SubscriptionMessage
+from app.services.live_mofsl_handler import build_snapshot
+from app.services.pnl_engine import pnl_engine
 from app.websockets.connection_manager import connection_manager
+from app.websockets.encoding import encode_frame
 
 router = APIRouter()
 
-@router.websocket("/ws/pl")
+@router.websocket("/pl")  # Mounted under /ws in app.main
 async def websocket_pl_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time P/L data. Manages client connections.
+
+    P/L updates go to every connection: {"type": "pnl", "clientId": ..., "pnl": ...} per client and
+    {"type": "token_pnl", "exchange": ..., "scrip": ..., "symbol": ..., "pnl": ...} per token, the
+    mark-to-market of the open positions whenever it changes (app.services.pnl_engine). The current
+    totals are sent right after connecting. Market data only goes to the scrips a connection
+    subscribed to, by sending e.g.
+        {"action": "subscribe", "topics": [{"exchange": "NSE", "scrip": 2885, "types": ["LTP"]}]}
+    ("types" defaults to all message types; "unsubscribe" takes the same topics). Each request
+    is answered with {"type": "subscribed"|"unsubscribed", "subscriptions": <count>}, or
+    {"type": "error", "message": ...} when it can not be parsed.
+
+    A subscribe is followed by a snapshot of the last known values of its topics, so a
+    dashboard does not wait for the next tick of an illiquid scrip:
+        {"type": "snapshot", "epoch": <run>, "seq": <latest>, "resumed": false, "messages": [<message>, ...]}
+    Market data messages, in the snapshot and after it, are {"type": ..., "seq": <n>, "data": {...}};
+    a dashboard applies a message only when its seq is above the last one it applied for the same
+    scrip, type (and depth level). To resume after a reconnect, subscribe with the epoch of the
+    snapshot and the highest seq seen, e.g. {"action": "subscribe", "topics": [...], "epoch": 1718000000000,
+    "since_seq": 52311}: the snapshot then only holds what changed since ("resumed": true). After a
+    server restart the epoch differs and the full snapshot is sent.
+
+    Ticks are conflated and sent at most every 100 ms (WS_FLUSH_INTERVAL) with the latest
+    value per scrip, a dashboard can change that with
+        {"action": "configure", "interval_ms": 250}
+    answered with {"type": "configured", "interval_ms": <interval>}.
     """
     await connection_manager.connect(websocket)
+    for frame in pnl_engine.snapshot_frames():
+        connection_manager.send_nowait(websocket, frame)
     try:
         while True:
-            # Keep the connection alive. Frontend sends no messages to this endpoint.
-            await websocket.receive_text()
+            request = await websocket.receive_text()
+            try:
+                payload = json.loads(request)
+                if isinstance(payload, dict) and payload.get("action") == "configure":
+                    configure = ConfigureMessage(**payload)
+                    interval = connection_manager.set_interval(websocket, configure.interval_ms / 1000)
+                    connection_manager.send_nowait(websocket, encode_frame({"type": "configured", "interval_ms": round(interval * 1000)}))
+                    continue
+                subscription = SubscriptionMessage(**payload)
+            except (ValueError, TypeError) as e:
+                connection_manager.send_nowait(websocket, encode_frame({"type": "error", "message": f"Invalid subscription request: {e}"}))
+                continue
+
+            topics = [key for topic in subscription.topics for key in topic.topic_keys()]
+            if subscription.action == "subscribe":
+                count = connection_manager.subscribe(websocket, topics)
+            else:
+                count = connection_manager.unsubscribe(websocket, topics)
+            connection_manager.send_nowait(websocket, encode_frame({"type": f"{subscription.action}d", "subscriptions": count}))
+            if subscription.action == "subscribe":
+                snapshot = build_snapshot(topics, subscription.epoch, subscription.since_seq)
+                connection_manager.send_nowait(websocket, encode_frame(snapshot))
     except WebSocketDisconnect:
         print("Client disconnected from P/L WebSocket.")
     except Exception as e:
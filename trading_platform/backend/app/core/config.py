@@ -1,9 +1,48 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
     REDIS_URL: str
     SECRET_KEY: str
+    # Used by the async endpoints; derived from DATABASE_URL (asyncpg / aiosqlite driver) when unset
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Read replica for the read-only session (app.api.deps.get_read_db), the primary is used when unset
+    READ_REPLICA_URL: Optional[str] = None
+
+    # SQLAlchemy engine pool (app.db.session), ignored for an in-memory SQLite database
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0     # Seconds to wait for a connection before failing
+    DB_POOL_RECYCLE: int = 1800       # Seconds before a connection is replaced, -1 to never recycle
+    DB_POOL_PRE_PING: bool = True     # Test connections with a round-trip on checkout
+
+    # Broker calls fanned out across clients by the order endpoints
+    ORDER_FANOUT_CONCURRENCY: int = 20
+    ORDER_CLIENT_TIMEOUT: float = 10.0
+
+    # Decrypted client credentials kept in memory (app.core.security.credential_cache)
+    CREDENTIAL_CACHE_SIZE: int = 1024
+    CREDENTIAL_CACHE_TTL: float = 300.0
+    # Logged in MOFSL sessions (app.services.mofsl_api_service.session_registry), these hold the decrypted
+    # credentials too; a session unused for its token lifetime is dropped, the least recently used beyond this
+    MOFSL_SESSION_CACHE_SIZE: int = 1024
+
+    # Per-dashboard send queues (app.websockets.connection_manager)
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_OVERFLOW_POLICY: str = "coalesce_latest"  # or "drop_oldest"
+    WS_SEND_TIMEOUT: float = 5.0      # Seconds a single send may take before the connection is evicted
+    WS_WIRE_FORMAT: str = "json"      # "json" text frames, or "msgpack" binary frames (needs msgpack)
+    WS_FLUSH_INTERVAL: float = 0.1    # Seconds between sends to a dashboard, ticks in between are conflated; 0 to send at once
+
+    # Hand-off of ticks from the MOFSL feed thread to the event loop (app.services.feed_bridge)
+    FEED_BRIDGE_QUEUE_SIZE: int = 10000  # Ticks waiting for the loop, the oldest is dropped beyond this
+    FEED_BRIDGE_BATCH_SIZE: int = 500    # Ticks published per loop callback
+
+    # Live P&L of the open positions (app.services.pnl_engine)
+    PNL_INTERVAL: float = 0.25        # Seconds between recomputes from the ticks received meanwhile
+    PNL_RELOAD_INTERVAL: float = 30.0 # Seconds between rereads of the open trades
 
     class Config:
         env_file = ".env"
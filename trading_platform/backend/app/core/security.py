@@ -5,7 +5,11 @@ from app.core.config import settings
 # For simplicity, we'll use a key derived from the settings, but in production,
 # ensure the SECRET_KEY is generated from Fernet.generate_key()
 from base64 import urlsafe_b64encode
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
 import hashlib
+import threading
+import time
 
 # Derive a 32-byte key from the SECRET_KEY
 key = hashlib.sha256(settings.SECRET_KEY.encode()).digest()
@@ -18,3 +22,77 @@ def encrypt(data: str) -> bytes:
 def decrypt(encrypted_data: bytes) -> str:
     """Decrypts bytes and returns a string."""
     return fernet.decrypt(encrypted_data).decode()
+
+
+class CredentialCache:
+    """
+    Bounded LRU cache of decrypted client credentials with a TTL.
+
+    Entries are keyed by client UUID and remember the ciphertexts they were
+    decrypted from, so a client whose stored credentials changed is a miss even
+    before it is explicitly invalidated. The plaintext is kept in bytearrays that
+    are overwritten with zeros when an entry expires, is evicted or invalidated.
+    The str copies handed to callers are immutable and cannot be wiped.
+    """
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes, bytes, bytearray, bytearray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, client_id: Hashable, api_key_encrypted: bytes, api_secret_encrypted: bytes) -> Tuple[str, str]:
+        """Returns (api_key, api_secret), decrypting them only on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is not None:
+                expires_at, key_token, secret_token, api_key, api_secret = entry
+                if expires_at > now and key_token == api_key_encrypted and secret_token == api_secret_encrypted:
+                    self._entries.move_to_end(client_id)
+                    self.hits += 1
+                    return api_key.decode(), api_secret.decode()
+                self._discard(client_id)
+            self.misses += 1
+
+        api_key = bytearray(fernet.decrypt(api_key_encrypted))
+        api_secret = bytearray(fernet.decrypt(api_secret_encrypted))
+        result = api_key.decode(), api_secret.decode()
+
+        with self._lock:
+            self._discard(client_id)
+            self._entries[client_id] = (now + self.ttl, bytes(api_key_encrypted), bytes(api_secret_encrypted), api_key, api_secret)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+        return result
+
+    def invalidate(self, client_id: Hashable):
+        """Drops a client's cached credentials, call it whenever they are changed."""
+        with self._lock:
+            self._discard(client_id)
+
+    def clear(self):
+        with self._lock:
+            for client_id in list(self._entries):
+                self._discard(client_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _discard(self, client_id: Hashable):
+        entry = self._entries.pop(client_id, None)
+        if entry is not None:
+            for plaintext in entry[3:]:
+                plaintext[:] = bytes(len(plaintext))
+
+
+credential_cache = CredentialCache(settings.CREDENTIAL_CACHE_SIZE, settings.CREDENTIAL_CACHE_TTL)
+
+def decrypt_client_credentials(client_id: Hashable, api_key_encrypted: bytes, api_secret_encrypted: bytes) -> Tuple[str, str]:
+    """Returns the decrypted (api_key, api_secret) of a client through the credential cache."""
+    return credential_cache.get(client_id, api_key_encrypted, api_secret_encrypted)
+
+def invalidate_client_credentials(client_id: Hashable):
+    """Removes a client's decrypted credentials from the cache."""
+    credential_cache.invalidate(client_id)
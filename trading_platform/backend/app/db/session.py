@@ -1,6 +1,239 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.exc import InvalidRequestError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+# asyncio drivers used for the async engine when DATABASE_URL names a blocking one
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+class PoolMetrics:
+    """Connection checkout wait times and usage of the engine pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.in_use = 0
+        self.in_use_max = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.checkout_timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def on_checkout(self, *args):
+        with self._lock:
+            self.in_use += 1
+            self.in_use_max = max(self.in_use_max, self.in_use)
+
+    def on_checkin(self, *args):
+        with self._lock:
+            self.in_use -= 1
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+read_pool_metrics = PoolMetrics()
+
+
+class _InstrumentedPoolMixin:
+    """Records how long every checkout waited for a connection, and the checkouts that timed out, in `metrics`."""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics = pool_metrics
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+
+class InstrumentedReadQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = read_pool_metrics
+
+
+def _engine_options(url: URL, poolclass: type) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        # An in-memory SQLite database keeps its single connection per thread pool
+        options.update(
+            poolclass=poolclass,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def _async_url(database_url: str, async_database_url: Optional[str]) -> URL:
+    """The URL of the async engine: ASYNC_DATABASE_URL, else DATABASE_URL with its asyncio driver."""
+    if async_database_url:
+        return make_url(async_database_url)
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}") if driver else url
+
+
+# Blocking engine, used by the sync endpoints, the startup hook and scripts/seed.py
+engine = create_engine(settings.DATABASE_URL, **_engine_options(make_url(settings.DATABASE_URL), InstrumentedQueuePool))
+event.listen(engine, "checkout", pool_metrics.on_checkout)
+event.listen(engine, "checkin", pool_metrics.on_checkin)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# asyncio engine for the async endpoints, so a query only suspends the awaiting request
+_async_database_url = _async_url(settings.DATABASE_URL, settings.ASYNC_DATABASE_URL)
+async_engine = create_async_engine(_async_database_url, **_engine_options(_async_database_url, InstrumentedAsyncQueuePool))
+event.listen(async_engine.sync_engine, "checkout", async_pool_metrics.on_checkout)
+event.listen(async_engine.sync_engine, "checkin", async_pool_metrics.on_checkin)
+# Objects stay loaded after commit, an expired attribute can not be lazy loaded on an AsyncSession
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read-only sessions go to READ_REPLICA_URL when it is set, otherwise to the primary
+if settings.READ_REPLICA_URL:
+    _read_database_url = _async_url(settings.READ_REPLICA_URL, None)
+    read_engine = create_async_engine(_read_database_url, **_engine_options(_read_database_url, InstrumentedReadQueuePool))
+    event.listen(read_engine.sync_engine, "checkout", read_pool_metrics.on_checkout)
+    event.listen(read_engine.sync_engine, "checkin", read_pool_metrics.on_checkin)
+else:
+    read_engine = async_engine
+
+
+class ReadOnlySession(Session):
+    """Session behind ReadSessionLocal, refuses to write pending changes."""
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            raise InvalidRequestError("Changes can not be flushed from a read-only session")
+        super().flush(objects)
+
+
+ReadSessionLocal = async_sessionmaker(read_engine, sync_session_class=ReadOnlySession, autoflush=False, expire_on_commit=False)
+
+
+class QueryStats:
+    """Number and total duration of the SQL statements run while it is the current one."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Set per request by the query stats middleware in app.main
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_time"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - start
+
+
+for _engine in {engine, async_engine.sync_engine, read_engine.sync_engine}:
+    event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# Columns added to existing tables after they were first created: (table, column, DDL type)
+ADDED_COLUMNS = [
+    ("tokens", "scrip_code", "INTEGER"),
+    ("tokens", "exchange_type", "VARCHAR"),
+]
+
+# Indexes added to existing tables, as declared on the models: (table, name, columns, WHERE clause or None).
+# PostgreSQL and SQLite both support CREATE INDEX IF NOT EXISTS and partial indexes
+ADDED_INDEXES = [
+    ("trades", "ix_trades_client_id_token_id_status", "client_id, token_id, status", None),
+    ("trades", "ix_trades_token_id_status", "token_id, status", None),
+    ("trades", "ix_trades_open_token_id_client_id", "token_id, client_id", "status = 'open'"),
+    ("executions", "ix_executions_trade_id", "trade_id", None),
+]
+
+
+def upgrade_schema(bind: Engine = engine) -> None:
+    """
+    Adds the ADDED_COLUMNS and ADDED_INDEXES missing from existing tables, safe to run on
+    every start.
+
+    Tables that do not exist yet are left alone, creating them adds every column and index.
+    """
+    with bind.begin() as connection:
+        inspector = inspect(connection)
+        for table, column, ddl_type in ADDED_COLUMNS:
+            if not inspector.has_table(table):
+                continue
+            if connection.dialect.name == "postgresql":
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {ddl_type}"))
+            elif column not in {c["name"] for c in inspector.get_columns(table)}:
+                # SQLite has no ADD COLUMN IF NOT EXISTS
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+        for table, name, columns, where in ADDED_INDEXES:
+            if not inspector.has_table(table):
+                continue
+            where_clause = f" WHERE {where}" if where else ""
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}){where_clause}"))
+
+
+def pool_stats(bind: Engine = engine, metrics: PoolMetrics = pool_metrics) -> Dict[str, Any]:
+    """Pool configuration, current usage and checkout wait metrics."""
+    pool = bind.pool
+    checkouts = metrics.checkouts
+    stats = {
+        "pool": type(pool).__name__,
+        "in_use": metrics.in_use,
+        "in_use_max": metrics.in_use_max,
+        "checkouts": checkouts,
+        "checkout_timeouts": metrics.checkout_timeouts,
+        "avg_checkout_wait_ms": round(metrics.wait_seconds_total * 1000 / checkouts, 3) if checkouts else 0.0,
+        "max_checkout_wait_ms": round(metrics.wait_seconds_max * 1000, 3),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), idle=pool.checkedin(), overflow=pool.overflow())
+    return stats
+
+
+def async_pool_stats() -> Dict[str, Any]:
+    """pool_stats of the async engine."""
+    return pool_stats(async_engine.sync_engine, async_pool_metrics)
+
+
+def read_pool_stats() -> Optional[Dict[str, Any]]:
+    """pool_stats of the read replica engine, None when reads go to the async engine."""
+    if read_engine is async_engine:
+        return None
+    return pool_stats(read_engine.sync_engine, read_pool_metrics)
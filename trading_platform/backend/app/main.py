@@ -1,18 +1,22 @@
 import threading
 import asyncio
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.endpoints import clients as client_router
 from app.api.endpoints import orders as order_router
 from app.api.endpoints import websockets as websocket_router
 from app.api.endpoints import tokens as token_router
-from app.services.live_mofsl_handler import LiveMofslHandler
+from app.services.live_mofsl_handler import LiveMofslHandler, quote_book
+from app.services.pnl_engine import pnl_engine
 from app.core.config import settings
-from app.core.security import decrypt
-from app.db.session import SessionLocal
+from app.core.security import decrypt, credential_cache
+from app.api.deps import session_scope
+from app.db.session import QueryStats, current_query_stats, pool_stats, async_pool_stats, read_pool_stats, upgrade_schema
 from app.models.client import Client as ClientModel
-from app.services.mofsl_api_service import BASE_URL # Import BASE_URL
+from app.services.feed_bridge import feed_bridge
+from app.services.mofsl_api_service import BASE_URL, close_async_client, session_registry # Import BASE_URL
+from app.websockets.connection_manager import connection_manager
 
 app = FastAPI(
     title="Multi-Client Trading Platform API",
@@ -39,14 +43,35 @@ app.include_router(order_router.router, prefix="/api/v1/orders", tags=["Orders"]
 app.include_router(websocket_router.router, prefix="/ws", tags=["WebSockets"])
 app.include_router(token_router.router, prefix="/api/v1/tokens", tags=["Tokens"])
 
+@app.middleware("http")
+async def db_query_stats(request: Request, call_next):
+    # Count and time the SQL statements each request runs, reported in the response headers
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        current_query_stats.reset(token)
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Query-Time-Ms"] = f"{stats.seconds * 1000:.3f}"
+    return response
+
 @app.on_event("startup")
 async def startup_event():
     print("Application startup: Initializing MOFSL Live Data Handler...")
-    db = SessionLocal()
+    # Ticks arrive on the feed thread, the bridge publishes them on this (the server's) event loop
+    feed_bridge.start(asyncio.get_running_loop())
+    # Live P&L of the open trades, priced from the quote book and then from every LTP tick. Its first
+    # reload runs once this hook yields, after the schema upgrade below
+    pnl_engine.start(quote_book)
     try:
+        # Columns and indexes added since the tables were created, before anything queries them
+        upgrade_schema()
+
         # Fetch a primary client to use its credentials for the MOFSL live feed
         # In a real application, you might have a dedicated admin client or a more robust way to manage these credentials.
-        primary_client = db.query(ClientModel).first() # Gets the first client in the DB
+        with session_scope() as db:
+            primary_client = db.query(ClientModel).first() # Gets the first client in the DB
 
         if primary_client:
             decrypted_api_key = decrypt(primary_client.api_key_encrypted)
@@ -71,22 +96,37 @@ async def startup_event():
             threading.Thread(target=mofsl_live_handler.Broadcast_connect, daemon=True).start()
             print("MOFSL Live Data Handler started in background thread.")
 
-            # Register for some example scrips (token codes) to receive live data
-            # Replace with actual scrip codes you want to monitor
-            # Example: NSE, CASH, ScripCode (e.g., 1660 for RELIANCE)
-            # You might want to fetch these dynamically or from configuration
-            # Give a small delay to allow the connection to establish
+            # Give a small delay to allow the connection to establish, then register the scrips of the
+            # open positions so the live P&L ticks (new ones are registered as trades are recorded)
             await asyncio.sleep(5) 
-            mofsl_live_handler.Register("NSE", "CASH", 1660) # Example scrip for RELIANCE
-            mofsl_live_handler.Register("NSE", "CASH", 22) # Example scrip for another token
-            print("Registered for example scrips.")
+            pnl_engine.set_feed(mofsl_live_handler)
+            print("Registered the scrips of the open positions.")
         else:
             print("No primary client found in database. MOFSL Live Data Handler not started.")
     except Exception as e:
         print(f"Error during MOFSL Live Data Handler startup: {e}")
-    finally:
-        db.close()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    feed_bridge.stop()
+    pnl_engine.stop()
+    # Close the keep-alive connections of the shared MOFSL REST pool
+    await close_async_client()
 
 @app.get("/")
 def read_root():
     return {"status": "healthy"}
+
+@app.get("/metrics")
+def read_metrics():
+    return {
+        "db_pool": pool_stats(),
+        "db_async_pool": async_pool_stats(),
+        "db_read_pool": read_pool_stats(),
+        "mofsl_sessions": session_registry.stats(),
+        "credential_cache": credential_cache.stats(),
+        "websockets": connection_manager.stats(),
+        "feed_bridge": feed_bridge.stats(),
+        "quote_book": quote_book.Stats(),
+        "pnl": pnl_engine.stats(),
+    }
@@ -13,7 +13,7 @@ class Execution(Base):
     __tablename__ = 'executions'
 
     id = Column(pgUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    trade_id = Column(pgUUID(as_uuid=True), ForeignKey('trades.id'), nullable=False)
+    trade_id = Column(pgUUID(as_uuid=True), ForeignKey('trades.id'), nullable=False, index=True)
     mofsl_order_id = Column(String, unique=True, nullable=False)
     type = Column(Enum(ExecutionType), nullable=False)
     quantity = Column(Integer, nullable=False)
@@ -8,6 +8,10 @@ class Token(Base):
     id = Column(Integer, Sequence('token_id_seq'), primary_key=True)
     symbol = Column(String, unique=True, index=True, nullable=False)
     exchange = Column(String, nullable=False)
+    # Scrip code of the token in the live feed, links its trades to the ticks (app.services.pnl_engine)
+    scrip_code = Column(Integer, nullable=True)
+    # Exchange type the live feed registers the scrip under, e.g. 'CASH' or 'DERIVATIVES'
+    exchange_type = Column(String, nullable=True)
     description = Column(Text)
 
     trades = relationship("Trade", back_populates="token")
@@ -1,6 +1,6 @@
 import uuid
 import enum
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Enum, DECIMAL
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Enum, DECIMAL, Index
 from sqlalchemy.dialects.postgresql import UUID as pgUUID
 from sqlalchemy.orm import relationship
 from .base import Base
@@ -25,3 +25,16 @@ class Trade(Base):
     client = relationship("Client", back_populates="trades")
     token = relationship("Token", back_populates="trades")
     executions = relationship("Execution", back_populates="trade", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Open trade of a client in a token (order endpoints)
+        Index("ix_trades_client_id_token_id_status", "client_id", "token_id", "status"),
+        # Holders of a token (tokens.get_token_holders)
+        Index("ix_trades_token_id_status", "token_id", "status"),
+        # Partial index on the open trades, a small and hot subset of the history (PostgreSQL, SQLite)
+        Index(
+            "ix_trades_open_token_id_client_id", "token_id", "client_id",
+            postgresql_where=(status == TradeStatus.open.name),
+            sqlite_where=(status == TradeStatus.open.name),
+        ),
+    )
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
@@ -12,6 +14,11 @@ class ClientCreate(ClientBase):
     password: str
     two_fa: str
 
+class ClientUpdate(BaseModel):
+    name: Optional[str] = None
+    api_key: Optional[str] = None
+    api_secret: Optional[str] = None
+
 class Client(ClientBase):
     id: UUID
     created_at: datetime
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
 class OrderExecutionPayload(BaseModel):
     client_id: UUID
@@ -9,6 +9,8 @@ class OrderExecutionPayload(BaseModel):
 class OrderPayload(BaseModel):
     token_symbol: str
     token_exchange: str
+    token_scrip_code: Optional[int] = None  # Scrip code in the live feed, stored on the token for the live P&L
+    token_exchange_type: Optional[str] = None  # e.g. 'CASH' or 'DERIVATIVES', the live feed registers the scrip with it
     trade_type: str  # e.g., 'MTF' or 'INTRADAY'
     order_type: str  # e.g., 'MARKET'
     buy_or_sell: str # e.g., 'BUY' or 'SELL'
@@ -3,6 +3,7 @@ from pydantic import BaseModel
 class TokenBase(BaseModel):
     symbol: str
     exchange: str
+    scrip_code: int | None = None
     description: str | None = None
 
 class Token(TokenBase):
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, get_args
+
+# Message types published by the live feed (app.services.live_mofsl_handler)
+MessageType = Literal["LTP", "MarketDepth", "DayOHLC", "DPR", "Index", "OpenInterest"]
+MESSAGE_TYPES = get_args(MessageType)
+
+class TopicPayload(BaseModel):
+    exchange: str  # As in the feed messages, e.g. 'NSE', 'NSEFO', 'BSE'
+    scrip: int     # Scrip code
+    types: Optional[List[MessageType]] = None  # All message types when omitted
+
+    def topic_keys(self):
+        return [(self.exchange, self.scrip, message_type) for message_type in (self.types or MESSAGE_TYPES)]
+
+class SubscriptionMessage(BaseModel):
+    action: Literal["subscribe", "unsubscribe"]
+    topics: List[TopicPayload]
+    # Resume after a reconnect: the epoch and the highest "seq" received before, see build_snapshot
+    epoch: Optional[int] = None
+    since_seq: Optional[int] = None
+
+class ConfigureMessage(BaseModel):
+    action: Literal["configure"]
+    interval_ms: int = Field(ge=0, le=60000)  # How often the connection is flushed, 0 sends every tick at once
@@ -0,0 +1,24 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+
+async def gather_bounded(
+    calls: Sequence[Callable[[], Awaitable[Any]]],
+    limit: int,
+    timeout: Optional[float],
+) -> List[Any]:
+    """
+    Runs the given coroutine factories concurrently, at most `limit` at a time.
+
+    Each call gets its own `timeout` (seconds), counted from when it acquires a slot; None
+    for no timeout, e.g. for calls that must not be cancelled once they sent an order.
+    Results are returned in input order; a call that raised or timed out has its
+    exception (asyncio.TimeoutError for a timeout) in its place instead of a result.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(call: Callable[[], Awaitable[Any]]) -> Any:
+        async with semaphore:
+            return await asyncio.wait_for(call(), timeout)
+
+    return await asyncio.gather(*(run(call) for call in calls), return_exceptions=True)
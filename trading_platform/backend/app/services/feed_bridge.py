@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from app.core.config import settings
+from app.websockets.connection_manager import Topic, connection_manager
+from app.websockets.encoding import Frame
+
+EXCHANGE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class FeedBridge:
+    """
+    Hands ticks from the MOFSL feed thread to the server's event loop.
+
+    submit() runs on the feed thread. It appends to a bounded deque and, when no drain is
+    pending yet, schedules one with loop.call_soon_threadsafe, so a burst of ticks costs a
+    single wake-up of the loop instead of a coroutine per tick. _drain() runs on the loop and
+    publishes at most batch_size ticks per callback, letting other callbacks run in between.
+    When the loop falls behind and the deque is full, the oldest tick is dropped.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[Topic, Frame, Optional[float], Optional[Hashable]], None],
+        max_pending: int = settings.FEED_BRIDGE_QUEUE_SIZE,
+        batch_size: int = settings.FEED_BRIDGE_BATCH_SIZE,
+    ):
+        self.publish = publish
+        self.max_pending = max(1, max_pending)
+        self.batch_size = max(1, batch_size)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._pending: Deque[Tuple[Topic, Frame, Optional[float], Optional[Hashable], float]] = deque()
+        self._scheduled = False
+        # Ticks of the same second share the time string, it is parsed once per second
+        self._exchange_time: Optional[str] = None
+        self._exchange_epoch: Optional[float] = None
+        self.submitted = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Binds the bridge to the server's loop, call from a startup hook running on it."""
+        self.loop = loop
+
+    def stop(self):
+        """Unbinds the loop and drops the queued ticks, a later start() begins with an empty queue."""
+        with self._lock:
+            self.loop = None
+            self._scheduled = False
+            self._pending.clear()
+
+    def submit(
+        self,
+        topic: Topic,
+        message: Frame,
+        exchange_time: Optional[str] = None,
+        key: Optional[Hashable] = None,
+    ) -> bool:
+        """Queues a tick for publishing on the loop, key is its coalescing key. Safe to call from any thread."""
+        with self._lock:
+            loop = self.loop
+            if loop is None:
+                return False
+            source_time = self._parse_exchange_time(exchange_time)
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((topic, message, source_time, key, time.perf_counter()))
+            self.submitted += 1
+            if len(self._pending) > self.max_depth:
+                self.max_depth = len(self._pending)
+            if self._scheduled:
+                return True
+            self._scheduled = True
+        try:
+            loop.call_soon_threadsafe(self._drain)
+        except RuntimeError:
+            # The loop is closed, the server is shutting down
+            with self._lock:
+                self._scheduled = False
+            return False
+        return True
+
+    def _drain(self):
+        with self._lock:
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.batch_size))]
+            more = bool(self._pending)
+            self._scheduled = more
+        if batch:
+            # The first tick of a batch has waited longest
+            latency = time.perf_counter() - batch[0][4]
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            for topic, message, source_time, key, _ in batch:
+                try:
+                    self.publish(topic, message, source_time, key)
+                except Exception as e:
+                    print(f"Error publishing tick for {topic}: {e}")
+            self.batches += 1
+            self.delivered += len(batch)
+        if more:
+            # Yield to the other callbacks (socket writers, requests) before the next batch
+            asyncio.get_running_loop().call_soon(self._drain)
+
+    def _parse_exchange_time(self, exchange_time: Optional[str]) -> Optional[float]:
+        if exchange_time is None:
+            return None
+        if exchange_time != self._exchange_time:
+            try:
+                self._exchange_epoch = time.mktime(time.strptime(exchange_time, EXCHANGE_TIME_FORMAT))
+            except (TypeError, ValueError):
+                self._exchange_epoch = None
+            self._exchange_time = exchange_time
+        return self._exchange_epoch
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.loop is not None,
+            "depth": len(self._pending),
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "avg_batch": round(self.delivered / self.batches, 1) if self.batches else 0.0,
+            "avg_latency_ms": round(self.latency_total / self.batches * 1000, 3) if self.batches else 0.0,
+            "max_latency_ms": round(self.latency_max * 1000, 3),
+        }
+
+
+feed_bridge = FeedBridge(connection_manager.publish_nowait)
@@ -1,20 +1,102 @@
-import json
-import asyncio
 import threading
-from MOFSLOPENAPI import MOFSLOPENAPI
-from app.websockets.connection_manager import connection_manager
+import time
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from MOFSLOPENAPI import MOFSLOPENAPI, BroadcastQuoteBook
+from app.services.feed_bridge import feed_bridge
+from app.services.pnl_engine import pnl_engine
+from app.websockets.connection_manager import Topic, connection_manager
+from app.websockets.encoding import encode_frame
+
+# Last known LTP, depth, OHLC, DPR and OI per (exchange, scrip code), kept up to date by the live feed.
+# Module level so endpoints can read it whether or not the feed was started.
+quote_book = BroadcastQuoteBook()
+
+
+class FeedSequence:
+    """
+    Numbers every tick of the live feed and remembers the last number per coalescing key.
+
+    Numbers only grow within one epoch (one run of the server), a dashboard that reconnects
+    with the epoch and the last number it saw is sent only what changed after it.
+    """
+
+    def __init__(self):
+        self.epoch = int(time.time() * 1000)
+        self.seq = 0
+        self.last: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def next(self, key: Hashable) -> int:
+        with self._lock:
+            self.seq += 1
+            self.last[key] = self.seq
+            return self.seq
+
+
+feed_sequence = FeedSequence()
+
+
+def coalescing_key(topic: Topic, message: Dict[str, Any]) -> Hashable:
+    # The five depth levels share a topic but must not conflate each other
+    return topic + (message.get("Level"),) if topic[2] == "MarketDepth" else topic
+
+
+def build_snapshot(topics: Iterable[Topic], epoch: Optional[int] = None, since_seq: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Returns the snapshot message sent to a dashboard when it subscribes to topics: the last
+    known message per topic (per level for MarketDepth) from the quote book, each with its
+    sequence number. With the epoch of the current run and since_seq it only holds what
+    changed after since_seq, otherwise (first connect, or the server restarted) everything.
+    """
+    resumed = since_seq is not None and epoch == feed_sequence.epoch
+    last = feed_sequence.last
+    quotes: Dict[tuple, Dict[str, Any]] = {}
+    messages = []
+    for topic in topics:
+        exchange, scrip, message_type = topic
+        if (exchange, scrip) not in quotes:
+            quotes[(exchange, scrip)] = quote_book.Snapshot(exchange, scrip)
+        known = quotes[(exchange, scrip)].get(message_type)
+        if known is None:
+            continue
+        for message in known if isinstance(known, list) else [known]:
+            seq = last.get(coalescing_key(topic, message))
+            if resumed and (seq is None or seq <= since_seq):
+                continue
+            messages.append({"type": message_type, "seq": seq or 0, "data": message})
+    return {
+        "type": "snapshot",
+        "epoch": feed_sequence.epoch,
+        "seq": feed_sequence.seq,
+        "resumed": resumed,
+        "messages": messages,
+    }
+
 
 class LiveMofslHandler(MOFSLOPENAPI):
     def __init__(self, api_key, base_url, client_code, source_id, browser_name, browser_version):
         super().__init__(api_key, base_url, client_code, source_id, browser_name, browser_version)
+        # The broadcast handlers update this book in place before publishing each tick
+        self.m_QuoteBook = quote_book
 
     def _Broadcast_on_message(self, ws, message_type, message):
-        # The 'message' parameter is already a dictionary containing live data.
-        # Convert it to a JSON string and broadcast to all connected frontend clients.
+        # Runs on the websocket-client thread. The 'message' parameter is already a dictionary containing live data.
+        # Serialize it once here and hand the frame to the feed bridge, which publishes it on the server's event loop
+        # to the frontend clients subscribed to the scrip.
         try:
-            json_message = json.dumps({"type": message_type, "data": message})
-            # Use asyncio.run_coroutine_threadsafe to run the async broadcast in the main event loop
-            asyncio.run_coroutine_threadsafe(connection_manager.broadcast(json_message), asyncio.get_event_loop())
+            topic = (message.get("Exchange"), message.get("Scrip Code"), message_type)
+            key = coalescing_key(topic, message)
+            # Numbered even when nobody watches, so a later snapshot carries the number of the value it holds
+            seq = feed_sequence.next(key)
+            if message_type == "LTP":
+                # Reprices the open positions in the scrip, whether or not a dashboard watches it
+                pnl_engine.submit_ltp(topic[0], topic[1], message.get("LTP_Rate"))
+            # Only a lookup in the topic index, nothing is serialized for a scrip nobody watches
+            if not connection_manager.has_subscribers(topic):
+                return
+            frame = encode_frame({"type": message_type, "seq": seq, "data": message})
+            feed_bridge.submit(topic, frame, message.get("Time"), key)
         except Exception as e:
             print(f"Error broadcasting message: {e}")
 
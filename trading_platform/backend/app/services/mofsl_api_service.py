@@ -1,18 +1,51 @@
 import requests
+import httpx
 import json
 import hashlib
+import re
+import time
 import uuid
-from typing import Optional, Dict, Any
+import asyncio
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Tuple
 
 from fastapi import HTTPException
 
+from app.core.config import settings
+
 # A realistic, configurable base URL for the MOFSL API
 BASE_URL = "https://api.motilaloswal.com"
 API_VERSION = "V.1.1.0"
 
-class MofslApiService:
+# Limits of the connection pool shared by every AsyncMofslApiService instance
+ASYNC_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+ASYNC_TIMEOUT = httpx.Timeout(10.0)
+
+# How long a MOFSL AuthToken is reused before logging in again (tokens are valid for the trading day)
+SESSION_TTL_SECONDS = 6 * 60 * 60
+
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the process wide httpx.AsyncClient, creating it on first use."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(limits=ASYNC_POOL_LIMITS, timeout=ASYNC_TIMEOUT)
+    return _async_client
+
+
+async def close_async_client():
+    """Closes the shared connection pool, called on application shutdown."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+class _MofslApiBase:
     """
-    A reusable service class to interact with the MOFSL Trading API.
+    Request building shared by the blocking and the asyncio MOFSL service.
     """
     def __init__(
         self,
@@ -37,9 +70,6 @@ class MofslApiService:
         self.auth_token = None
         self.user_agent = f"MOSL/{API_VERSION}"
 
-        # Perform login to get the auth token upon initialization
-        self._login()
-
     def _get_device_info(self) -> Dict[str, Any]:
         """Provides realistic default device and network information."""
         return {
@@ -77,9 +107,9 @@ class MofslApiService:
             raise ValueError(f"Invalid API path provided: {api_path}")
         return f"{self.base_url}{path}"
 
-    def _make_request(self, method: str, url: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Handles making requests to the MOFSL API and processes the response."""
-        headers = {
+    def _get_headers(self) -> Dict[str, str]:
+        """Builds the request headers for the current auth token."""
+        return {
             "Content-Type": "application/json",
             "Accept": "application/json",
             "Authorization": self.auth_token or "",
@@ -91,19 +121,62 @@ class MofslApiService:
             **self._get_device_info(),
         }
 
+    def _get_login_payload(self) -> Dict[str, Any]:
+        """Builds the login request body, the password is sent as sha256(password + api key)."""
+        combined_string = self.password + self.api_key
+        checksum = hashlib.sha256(combined_string.encode("utf-8")).hexdigest()
+
+        return {
+            "userid": self.client_id,
+            "password": checksum,
+            "2FA": self.two_fa,
+            "totp": self.totp,
+        }
+
+    def _check_response(self, response_json: Dict[str, Any]) -> Dict[str, Any]:
+        """Raises an HTTPException for a MOFSL level error response."""
+        if response_json.get("status") == "ERROR":
+            raise HTTPException(
+                status_code=400,
+                detail=response_json.get("message", "An unknown API error occurred."),
+            )
+
+        return response_json
+
+    def _set_auth_token(self, response: Dict[str, Any]):
+        """Stores the auth token of a login response."""
+        if response.get("status") == "SUCCESS" and response.get("AuthToken"):
+            self.auth_token = response["AuthToken"]
+        else:
+            raise HTTPException(status_code=401, detail="MOFSL login failed.")
+
+
+class OrderNotConfirmed(HTTPException):
+    """
+    Raised when an order request may have reached MOFSL but no response came back: the
+    order may or may not have been placed, so it must neither be resent nor reported as failed.
+    """
+
+
+class MofslApiService(_MofslApiBase):
+    """
+    A reusable service class to interact with the MOFSL Trading API.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Perform login to get the auth token upon initialization
+        self._login()
+
+    def _make_request(self, method: str, url: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Handles making requests to the MOFSL API and processes the response."""
+        headers = self._get_headers()
+
         try:
             response = requests.request(method, url, headers=headers, data=json.dumps(data) if data else None, timeout=10)
             response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
             
-            response_json = response.json()
-
-            if response_json.get("status") == "ERROR":
-                raise HTTPException(
-                    status_code=400,
-                    detail=response_json.get("message", "An unknown API error occurred."),
-                )
-            
-            return response_json
+            return self._check_response(response.json())
 
         except requests.exceptions.RequestException as e:
             raise HTTPException(status_code=503, detail=f"Failed to connect to MOFSL API: {e}")
@@ -113,23 +186,8 @@ class MofslApiService:
     def _login(self):
         """Logs into the MOFSL API to retrieve an authentication token."""
         url = self._get_url("Login")
-        
-        combined_string = self.password + self.api_key
-        checksum = hashlib.sha256(combined_string.encode("utf-8")).hexdigest()
-        
-        payload = {
-            "userid": self.client_id,
-            "password": checksum,
-            "2FA": self.two_fa,
-            "totp": self.totp,
-        }
-        
-        response = self._make_request("POST", url, data=payload)
-        
-        if response.get("status") == "SUCCESS" and response.get("AuthToken"):
-            self.auth_token = response["AuthToken"]
-        else:
-            raise HTTPException(status_code=401, detail="MOFSL login failed.")
+        response = self._make_request("POST", url, data=self._get_login_payload())
+        self._set_auth_token(response)
 
     def place_order(self, order_details: Dict[str, Any]) -> Dict[str, Any]:
         """Places an order."""
@@ -162,3 +220,208 @@ class MofslApiService:
             "uniqueorderid": unique_order_id
         }
         return self._make_request("POST", url, data=payload)
+
+
+class AsyncMofslApiService(_MofslApiBase):
+    """
+    asyncio variant of MofslApiService for the FastAPI endpoints.
+
+    Requests go through the shared httpx.AsyncClient pool, so a slow broker call
+    only suspends the awaiting handler instead of blocking the event loop.
+    Use `await AsyncMofslApiService.create(...)` to get a logged in instance, or
+    `session_registry.get(...)` to reuse the client's cached session.
+
+    The AuthToken is refreshed lazily: on the first request after it expired and
+    on a 401 from MOFSL. Concurrent refreshes of one instance share a single login.
+    """
+    def __init__(self, *args, session_ttl: float = SESSION_TTL_SECONDS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session_ttl = session_ttl
+        self.token_expires_at = 0.0
+        self.on_login: Optional[Callable[[float, bool], None]] = None  # (seconds, succeeded)
+        self._login_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "AsyncMofslApiService":
+        """Creates the service and logs in."""
+        service = cls(*args, **kwargs)
+        await service.ensure_login()
+        return service
+
+    def has_valid_token(self) -> bool:
+        return self.auth_token is not None and time.monotonic() < self.token_expires_at
+
+    async def ensure_login(self):
+        """Logs in unless the current AuthToken is still valid."""
+        if not self.has_valid_token():
+            await self._refresh_login()
+
+    async def _refresh_login(self, stale_token: Optional[str] = None):
+        """Single-flight login: callers arriving while a login is running wait for that one."""
+        if self._login_task is None:
+            if stale_token is not None and self.auth_token != stale_token:
+                return  # Another request already replaced the rejected token
+            self._login_task = asyncio.ensure_future(self._login())
+            self._login_task.add_done_callback(self._clear_login_task)
+        await asyncio.shield(self._login_task)
+
+    def _clear_login_task(self, task: asyncio.Task):
+        self._login_task = None
+
+    async def _make_request(self, method: str, url: str, data: Optional[Dict[str, Any]] = None, retry_auth: bool = True,
+                            idempotent: bool = True) -> Dict[str, Any]:
+        """
+        Handles making requests to the MOFSL API and processes the response.
+
+        For a non idempotent request (an order) a transport error after the connection was
+        made raises OrderNotConfirmed instead of the usual 503.
+        """
+        headers = self._get_headers()
+
+        try:
+            response = await get_async_client().request(method, url, headers=headers, content=json.dumps(data) if data else None)
+            if response.status_code == 401 and retry_auth and self.auth_token is not None:
+                # The token was rejected, so the request was not acted on: log in again and resend it once
+                await self._refresh_login(stale_token=headers["Authorization"])
+                return await self._make_request(method, url, data, retry_auth=False, idempotent=idempotent)
+            response.raise_for_status()  # Raise HTTPStatusError for bad responses (4xx or 5xx)
+
+            return self._check_response(response.json())
+
+        except httpx.HTTPError as e:
+            if not idempotent and isinstance(e, httpx.TransportError) and not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+                raise OrderNotConfirmed(status_code=504, detail=f"No response from MOFSL API: {e!r}")
+            raise HTTPException(status_code=503, detail=f"Failed to connect to MOFSL API: {e}")
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=500, detail="Failed to decode response from MOFSL API.")
+
+    async def _login(self):
+        """Logs into the MOFSL API to retrieve an authentication token."""
+        url = self._get_url("Login")
+        start = time.perf_counter()
+        succeeded = False
+        try:
+            response = await self._make_request("POST", url, data=self._get_login_payload(), retry_auth=False)
+            self._set_auth_token(response)
+            self.token_expires_at = time.monotonic() + self.session_ttl
+            succeeded = True
+        except Exception:
+            self.auth_token = None
+            self.token_expires_at = 0.0
+            raise
+        finally:
+            if self.on_login is not None:
+                self.on_login(time.perf_counter() - start, succeeded)
+
+    async def place_order(self, order_details: Dict[str, Any]) -> Dict[str, Any]:
+        """Places an order."""
+        url = self._get_url("PlaceOrder")
+        return await self._make_request("POST", url, data=order_details, idempotent=False)
+
+    async def get_positions(self) -> Dict[str, Any]:
+        """Retrieves the client's current positions."""
+        url = self._get_url("GetPosition")
+        payload = {"clientcode": self.client_id}
+        return await self._make_request("POST", url, data=payload)
+
+    async def get_margin(self) -> Dict[str, Any]:
+        """Retrieves the client's margin report."""
+        url = self._get_url("GetReportMargin")
+        payload = {"clientcode": self.client_id}
+        return await self._make_request("POST", url, data=payload)
+
+    async def get_order_book(self) -> Dict[str, Any]:
+        """Retrieves the client's order book."""
+        url = self._get_url("OrderBook")
+        payload = {"clientcode": self.client_id}
+        return await self._make_request("POST", url, data=payload)
+
+    async def cancel_order(self, unique_order_id: str) -> Dict[str, Any]:
+        """Cancels a specific order."""
+        url = self._get_url("CancelOrder")
+        payload = {
+            "clientcode": self.client_id,
+            "uniqueorderid": unique_order_id
+        }
+        return await self._make_request("POST", url, data=payload)
+
+
+class MofslSessionRegistry:
+    """
+    Process wide cache of logged in AsyncMofslApiService instances, keyed by client.
+
+    A request for a client whose AuthToken is still valid is a hit and costs no
+    login round-trip; concurrent requests for a client that needs a login share one.
+    Sessions hold the decrypted credentials, so the registry is a bounded LRU and a
+    session unused for session_ttl (its AuthToken has expired by then) is dropped.
+    """
+    def __init__(self, session_ttl: float = SESSION_TTL_SECONDS, max_sessions: int = settings.MOFSL_SESSION_CACHE_SIZE):
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        # (client_id, api_key) -> (last used, service), least recently used first
+        self._sessions: "OrderedDict[Tuple[str, str], Tuple[float, AsyncMofslApiService]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.logins = 0
+        self.login_failures = 0
+        self.login_seconds_total = 0.0
+        self.login_seconds_max = 0.0
+
+    async def get(self, api_key: str, api_secret: str, client_id: str, password: str, two_fa: str, **kwargs) -> AsyncMofslApiService:
+        """Returns a logged in service for the client, reusing its cached session when possible."""
+        now = time.monotonic()
+        key = (client_id, api_key)
+        entry = self._sessions.pop(key, None)
+        service = entry[1] if entry is not None else None
+        if service is None or (service.api_secret, service.password, service.two_fa) != (api_secret, password, two_fa):
+            service = AsyncMofslApiService(api_key, api_secret, client_id, password, two_fa,
+                                           session_ttl=self.session_ttl, **kwargs)
+            service.on_login = self._record_login
+        self._sessions[key] = (now, service)
+        self._evict(now)
+
+        if service.has_valid_token():
+            self.hits += 1
+        else:
+            self.misses += 1
+            await service.ensure_login()
+        return service
+
+    def invalidate(self, client_id: str):
+        """Drops the cached sessions of a client, e.g. after its credentials changed."""
+        for key in [key for key in self._sessions if key[0] == client_id]:
+            del self._sessions[key]
+
+    def clear(self):
+        self._sessions.clear()
+
+    def _evict(self, now: float):
+        """Drops the sessions unused for session_ttl, then the least recently used beyond max_sessions."""
+        while self._sessions:
+            last_used, _ = next(iter(self._sessions.values()))
+            if now - last_used < self.session_ttl and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def _record_login(self, seconds: float, succeeded: bool):
+        self.logins += 1
+        if not succeeded:
+            self.login_failures += 1
+        self.login_seconds_total += seconds
+        self.login_seconds_max = max(self.login_seconds_max, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "logins": self.logins,
+            "login_failures": self.login_failures,
+            "avg_login_ms": round(self.login_seconds_total * 1000 / self.logins, 3) if self.logins else 0.0,
+            "max_login_ms": round(self.login_seconds_max * 1000, 3),
+        }
+
+
+session_registry = MofslSessionRegistry()
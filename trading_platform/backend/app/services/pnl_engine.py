@@ -0,0 +1,325 @@
+import asyncio
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import and_, select
+
+from app.core.config import settings
+from app.db.session import ReadSessionLocal
+from app.models.token import Token as TokenModel
+from app.models.trade import Trade as TradeModel, TradeStatus
+from app.websockets.connection_manager import connection_manager
+from app.websockets.encoding import Frame, encode_frame
+
+# (exchange, scrip code) as in the feed messages, e.g. ("NSE", 2885)
+Scrip = Tuple[str, int]
+
+
+def net_position(position: Dict[str, Any]) -> Tuple[int, float]:
+    """Returns (net quantity, average price) of a MOFSL position entry."""
+    buy_quantity = position.get("buyquantity", 0)
+    sell_quantity = position.get("sellquantity", 0)
+    net_quantity = buy_quantity - sell_quantity
+    avg_price = 0.0
+    if net_quantity > 0 and buy_quantity > 0:
+        avg_price = position.get("buyamount", 0) / buy_quantity
+    elif net_quantity < 0 and sell_quantity > 0:
+        avg_price = position.get("sellamount", 0) / sell_quantity
+    return net_quantity, avg_price
+
+
+class PnlEngine:
+    """
+    Mark-to-market P&L of the open positions, recomputed from the live LTP ticks.
+
+    Open positions, one row per client and scrip, are kept in parallel NumPy arrays with the
+    rows of every scrip indexed, so a tick only touches the positions in its scrip. submit_ltp
+    runs on the feed thread and only records the latest price per scrip. Every `interval` the
+    loop recomputes the affected rows in one vectorized pass and publishes the per-client and
+    per-token totals that changed to every dashboard.
+
+    Positions are read from the open trades whose token has a scrip code, every
+    reload_interval or after mark_stale. Once a feed is set (set_feed) the scrips of the
+    positions are registered with it, those whose token has an exchange type, so they tick
+    whether or not a dashboard watches them. Broker position snapshots fetched by the endpoints
+    (apply_broker_positions) take precedence over the DB quantity and average price.
+    A position without a known average price (NaN, e.g. the 0.0 execute-all records when
+    the fill price was not in the order book yet) is left out of the totals until a broker snapshot provides one.
+    """
+
+    def __init__(
+        self,
+        interval: float = settings.PNL_INTERVAL,
+        reload_interval: float = settings.PNL_RELOAD_INTERVAL,
+    ):
+        self.interval = interval
+        self.reload_interval = reload_interval
+        self.quotes = None  # Anything with GetLTPs([(exchange, scrip), ...]), used to price new scrips at once
+        self.feed = None  # Anything with RegisterMany([(exchange, exchange type, scrip code), ...])
+        self._registered: Set[Scrip] = set()
+        self._exchange_types: Dict[Scrip, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[Scrip, float] = {}
+        self._dirty: Set[int] = set()
+        self._stale = True
+        # (client id, symbol) -> (net quantity, average price) from the last broker snapshot of the client
+        self._broker: Dict[UUID, Dict[str, Tuple[int, float]]] = {}
+        self._published_clients: Dict[UUID, float] = {}
+        self._published_tokens: Dict[Scrip, float] = {}
+        self.ticks = 0
+        self.batches = 0
+        self.reloads = 0
+        self.published = 0
+        self.scrips: List[Scrip] = []
+        self.ltp = np.empty(0)
+        self._build([])
+
+    def _build(self, positions: List[Tuple[UUID, Scrip, str, float, float]]):
+        """Replaces the position arrays with (client id, scrip, symbol, quantity, average price) rows."""
+        # Prices of the scrips already tracked are kept, new ones are looked up in the quotes
+        previous = dict(zip(self.scrips, self.ltp.tolist()))
+        self.scrip_index: Dict[Scrip, int] = {}
+        self.scrips = []
+        self.symbols: List[str] = []
+        self.client_index: Dict[UUID, int] = {}
+        self.clients: List[UUID] = []
+        self.row_by_symbol: Dict[Tuple[UUID, str], int] = {}
+        row_client, row_scrip, quantity, avg_price = [], [], [], []
+        for client_id, scrip, symbol, qty, price in positions:
+            if scrip not in self.scrip_index:
+                self.scrip_index[scrip] = len(self.scrips)
+                self.scrips.append(scrip)
+                self.symbols.append(symbol)
+            if client_id not in self.client_index:
+                self.client_index[client_id] = len(self.clients)
+                self.clients.append(client_id)
+            self.row_by_symbol[(client_id, symbol)] = len(row_client)
+            row_client.append(self.client_index[client_id])
+            row_scrip.append(self.scrip_index[scrip])
+            quantity.append(qty)
+            avg_price.append(price)
+
+        self.row_client = np.array(row_client, dtype=np.intp)
+        self.row_scrip = np.array(row_scrip, dtype=np.intp)
+        self.quantity = np.array(quantity, dtype=np.float64)
+        self.avg_price = np.array(avg_price, dtype=np.float64)
+        self.pnl = np.zeros(len(row_client))
+        # Row numbers grouped by scrip: rows_by_scrip[index] are the positions in scrip index
+        order = np.argsort(self.row_scrip, kind="stable")
+        bounds = np.searchsorted(self.row_scrip[order], np.arange(1, len(self.scrips)))
+        self.rows_by_scrip = np.split(order, bounds) if len(self.scrips) else []
+        self.ltp = np.array([previous.get(scrip, np.nan) for scrip in self.scrips], dtype=np.float64)
+        unknown = np.flatnonzero(np.isnan(self.ltp))
+        if self.quotes is not None and len(unknown):
+            self.ltp[unknown] = self.quotes.GetLTPs([self.scrips[index] for index in unknown])
+        self.client_pnl = np.zeros(len(self.clients))
+        self.token_pnl = np.zeros(len(self.scrips))
+        self._dirty = set(range(len(self.scrips)))
+
+    def start(self, quotes=None):
+        """Starts the recompute loop, call from a startup hook running on the server's loop."""
+        self.quotes = quotes
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def set_feed(self, feed):
+        """Registers the scrips of the open positions with the live feed, now and after every reload."""
+        self.feed = feed
+        self._registered = set()
+        self._register_scrips()
+
+    def _register_scrips(self):
+        if self.feed is None:
+            return
+        # Scrips are left registered once their positions are closed, a dashboard may still watch them
+        scrips = [scrip for scrip in self.scrips if scrip not in self._registered and scrip in self._exchange_types]
+        if not scrips:
+            return
+        self.feed.RegisterMany([(exchange, self._exchange_types[(exchange, scrip_code)], scrip_code) for exchange, scrip_code in scrips])
+        self._registered.update(scrips)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def mark_stale(self):
+        """Rereads the open positions before the next recompute, e.g. after trades were recorded."""
+        self._stale = True
+
+    def submit_ltp(self, exchange: str, scrip: int, ltp: Optional[float]) -> None:
+        """Records the latest traded price of a scrip. Safe to call from any thread."""
+        key = (exchange, scrip)
+        if ltp is None or key not in self.scrip_index:
+            return
+        with self._lock:
+            self._pending[key] = ltp
+            self.ticks += 1
+
+    def apply_broker_positions(self, client_id: UUID, all_positions: Dict[str, Any]) -> None:
+        """Takes quantities and average prices from a client's MOFSL positions response."""
+        if not (all_positions and isinstance(all_positions, dict) and "data" in all_positions):
+            return
+        broker = {}
+        for position in all_positions["data"]:
+            symbol = position.get("symbol")
+            if symbol is not None:
+                broker[symbol] = net_position(position)
+        self._broker[client_id] = broker
+        self._apply_broker(client_id)
+
+    def _apply_broker(self, client_id: UUID):
+        for symbol, (net_quantity, avg_price) in self._broker.get(client_id, {}).items():
+            # Positions without an open trade in the DB are not tracked, they have no scrip code
+            row = self.row_by_symbol.get((client_id, symbol))
+            if row is not None:
+                self.quantity[row] = net_quantity
+                self.avg_price[row] = avg_price if avg_price > 0 else np.nan
+                self._dirty.add(int(self.row_scrip[row]))
+
+    async def reload(self):
+        async with ReadSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    TradeModel.client_id, TokenModel.exchange, TokenModel.scrip_code, TokenModel.symbol,
+                    TokenModel.exchange_type, TradeModel.quantity, TradeModel.avg_entry_price,
+                ).join(TokenModel, TradeModel.token_id == TokenModel.id).where(
+                    and_(TradeModel.status == TradeStatus.open, TokenModel.scrip_code.isnot(None))
+                )
+            )
+            trades = result.all()
+
+        # Several open trades of a client in a token are one position, its cost is unknown (NaN)
+        # when any of them has no entry price yet
+        merged: Dict[Tuple[UUID, Scrip, str], List[float]] = {}
+        for client_id, exchange, scrip_code, symbol, exchange_type, quantity, avg_entry_price in trades:
+            if exchange_type:
+                self._exchange_types[(exchange, scrip_code)] = exchange_type.upper()
+            position = merged.setdefault((client_id, (exchange, scrip_code), symbol), [0.0, 0.0])
+            position[0] += quantity
+            position[1] += quantity * float(avg_entry_price) if avg_entry_price else np.nan
+        self._build([
+            (client_id, scrip, symbol, quantity, cost / quantity if quantity else np.nan)
+            for (client_id, scrip, symbol), (quantity, cost) in merged.items()
+        ])
+        self._register_scrips()
+        for client_id in list(self._broker):
+            if client_id in self.client_index:
+                self._apply_broker(client_id)
+            else:
+                del self._broker[client_id]
+        self.reloads += 1
+        # Clients and tokens without positions anymore go back to 0 and are forgotten
+        self._publish(
+            [(client_id, 0.0) for client_id in self._published_clients if client_id not in self.client_index],
+            [(scrip, 0.0) for scrip in self._published_tokens if scrip not in self.scrip_index],
+        )
+        self._published_clients = {k: v for k, v in self._published_clients.items() if k in self.client_index}
+        self._published_tokens = {k: v for k, v in self._published_tokens.items() if k in self.scrip_index}
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_reload = 0.0
+        while True:
+            try:
+                if self._stale or loop.time() >= next_reload:
+                    # Cleared first: a failed reload is retried after reload_interval, not on every pass,
+                    # and a mark_stale while reading is not lost
+                    self._stale = False
+                    next_reload = loop.time() + self.reload_interval
+                    await self.reload()
+                self.recompute()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error recomputing P&L: {e}")
+            await asyncio.sleep(self.interval)
+
+    def recompute(self):
+        """Reprices the positions in the scrips that ticked (or changed) since the last call."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for key, ltp in pending.items():
+            index = self.scrip_index.get(key)
+            if index is not None:
+                self.ltp[index] = ltp
+                self._dirty.add(index)
+        if not self._dirty:
+            return
+        scrips = np.fromiter(self._dirty, dtype=np.intp, count=len(self._dirty))
+        self._dirty = set()
+        rows = np.concatenate([self.rows_by_scrip[index] for index in scrips])
+        if not len(rows):
+            return
+
+        ltp = self.ltp[self.row_scrip[rows]]
+        quantity = self.quantity[rows]
+        avg_price = self.avg_price[rows]
+        # No price yet, or an open quantity without a known cost: not part of the totals
+        unpriced = np.isnan(ltp) | (np.isnan(avg_price) & (quantity != 0))
+        pnl = np.where(unpriced, 0.0, (ltp - np.nan_to_num(avg_price)) * quantity)
+        delta = pnl - self.pnl[rows]
+        self.pnl[rows] = pnl
+        np.add.at(self.client_pnl, self.row_client[rows], delta)
+        np.add.at(self.token_pnl, self.row_scrip[rows], delta)
+        self.batches += 1
+
+        clients = np.unique(self.row_client[rows])
+        self._publish(
+            [(self.clients[index], value) for index, value in zip(clients.tolist(), self.client_pnl[clients].tolist())],
+            [(self.scrips[index], value) for index, value in zip(scrips.tolist(), self.token_pnl[scrips].tolist())],
+        )
+
+    def _publish(self, clients: Iterable[Tuple[UUID, float]], tokens: Iterable[Tuple[Scrip, float]]):
+        """Sends the totals that moved by at least a paisa since they were last published."""
+        for client_id, value in clients:
+            value = round(value, 2)
+            if self._published_clients.get(client_id, 0.0) != value:
+                self._published_clients[client_id] = value
+                self._send(("pnl", client_id), self._client_frame(client_id, value))
+        for scrip, value in tokens:
+            value = round(value, 2)
+            if self._published_tokens.get(scrip, 0.0) != value:
+                self._published_tokens[scrip] = value
+                self._send(("token_pnl",) + scrip, self._token_frame(scrip, value))
+
+    def _send(self, key, frame: Frame):
+        # Keyed per client / token, a dashboard that falls behind only gets the latest total of each
+        connection_manager.broadcast_nowait(frame, key)
+        self.published += 1
+
+    def _client_frame(self, client_id: UUID, value: float) -> Frame:
+        return encode_frame({"type": "pnl", "clientId": str(client_id), "pnl": value})
+
+    def _token_frame(self, scrip: Scrip, value: float) -> Frame:
+        index = self.scrip_index.get(scrip)
+        symbol = self.symbols[index] if index is not None else None
+        return encode_frame({"type": "token_pnl", "exchange": scrip[0], "scrip": scrip[1], "symbol": symbol, "pnl": value})
+
+    def snapshot_frames(self) -> List[Frame]:
+        """The current totals, sent to a dashboard when it connects."""
+        frames = [self._client_frame(client_id, value) for client_id, value in self._published_clients.items()]
+        frames.extend(self._token_frame(scrip, value) for scrip, value in self._published_tokens.items())
+        return frames
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "positions": len(self.row_client),
+            "clients": len(self.clients),
+            "scrips": len(self.scrips),
+            "priced_scrips": int(np.count_nonzero(~np.isnan(self.ltp))),
+            "registered_scrips": len(self._registered),
+            "scrips_without_exchange_type": sum(scrip not in self._exchange_types for scrip in self.scrips),
+            "positions_without_cost": int(np.count_nonzero(np.isnan(self.avg_price) & (self.quantity != 0))),
+            "ticks": self.ticks,
+            "batches": self.batches,
+            "reloads": self.reloads,
+            "published": self.published,
+        }
+
+
+pnl_engine = PnlEngine()
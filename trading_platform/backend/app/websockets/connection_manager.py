@@ -1,19 +1,320 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
 from fastapi import WebSocket
-from typing import List
+
+from app.core.config import settings
+from app.websockets.encoding import Frame
+
+DROP_OLDEST = "drop_oldest"
+COALESCE_LATEST = "coalesce_latest"
+
+# (exchange, scrip code, message type), e.g. ("NSE", 2885, "LTP")
+Topic = Tuple[str, int, str]
+
+
+class _Connection:
+    """
+    One dashboard connection: a bounded send queue drained by its own writer task.
+
+    Pending messages are kept in an OrderedDict in arrival order. Under either overflow
+    policy a message sent with a key replaces the pending message with the same key (in
+    place), so a client that falls behind gets the latest tick per key instead of every
+    tick. Only when the queue is full is the oldest pending message dropped.
+
+    With a flush interval the writer sends the queue at most once per interval, ticks
+    arriving in between are conflated per key, e.g. a scrip ticking 50 times a second
+    costs a dashboard on a 100 ms interval 10 frames a second, the last one always current.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, websocket: WebSocket, max_queue: int, policy: str, interval: float = 0.0):
+        self.websocket = websocket
+        self.id = next(self._ids)
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.interval = max(0.0, interval)
+        self.last_flush = 0.0
+        self.pending: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.ready = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        self.topics: Set[Topic] = set()
+        self.sending = False
+        self.watched_sent = -1  # sent as seen by the previous _watch_sends pass while sending
+        self.timed_out = False
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.feed_latency = 0.0
+        self.max_feed_latency = 0.0
+
+    def enqueue(self, message: Frame, key: Optional[Hashable], now: float, source_time: Optional[float] = None) -> None:
+        if key is not None and key in self.pending:
+            # Keep the queue position (and enqueue time) of the message being replaced
+            self.pending[key] = (message, self.pending[key][1], source_time)
+            self.coalesced += 1
+            return
+        if len(self.pending) >= self.max_queue:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        if key is None:
+            key = object()
+        self.pending[key] = (message, now, source_time)
+        self.ready.set()
+
+    def stats(self) -> Dict[str, Any]:
+        client = self.websocket.client
+        oldest_lag = time.perf_counter() - next(iter(self.pending.values()))[1] if self.pending else 0.0
+        return {
+            "id": self.id,
+            "client": f"{client.host}:{client.port}" if client else None,
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+            "subscriptions": len(self.topics),
+            "interval_ms": round(self.interval * 1000),
+            "queued": len(self.pending),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "lag_ms": round(max(self.last_lag, oldest_lag) * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "feed_latency_ms": round(self.feed_latency * 1000, 3),
+            "max_feed_latency_ms": round(self.max_feed_latency * 1000, 3),
+        }
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """
+    Fans messages out to the connected dashboards without waiting on any of them.
+
+    broadcast and publish only enqueue; every connection has a writer task that sends its
+    queue in order. Messages are pre-serialized frames (app.websockets.encoding), the same
+    str or bytes object is queued for every connection and never re-encoded here. A send
+    that fails or stalls for send_timeout evicts the connection, so one slow or dead browser
+    never delays or breaks delivery to the others.
+
+    broadcast goes to every connection. Market data is published to a topic and only goes
+    to the connections subscribed to it, looked up in the topic index.
+
+    Every connection is flushed at most once per flush_interval (adjustable per connection
+    with set_interval), only the latest tick per key is sent whatever the overflow policy.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = settings.WS_SEND_QUEUE_SIZE,
+        policy: str = settings.WS_OVERFLOW_POLICY,
+        send_timeout: float = settings.WS_SEND_TIMEOUT,
+        flush_interval: float = settings.WS_FLUSH_INTERVAL,
+    ):
+        if policy not in (DROP_OLDEST, COALESCE_LATEST):
+            raise ValueError(f"Unknown WebSocket overflow policy: {policy}")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.flush_interval = flush_interval
+        self.connections: Dict[WebSocket, _Connection] = {}
+        self.subscribers: Dict[Topic, Set[_Connection]] = {}
+        self.evicted = 0
+        self._watchdog: Optional[asyncio.Task] = None
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.connections)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = _Connection(websocket, self.max_queue, self.policy, self.flush_interval)
+        connection.writer = asyncio.create_task(self._writer(connection))
+        self.connections[websocket] = connection
+        if self._watchdog is None or self._watchdog.done():
+            self._watchdog = asyncio.create_task(self._watch_sends())
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        connection = self.connections.pop(websocket, None)
+        if connection is not None:
+            self._unsubscribe(connection, list(connection.topics))
+            if connection.writer is not None:
+                connection.writer.cancel()
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[Topic]) -> int:
+        """Adds topics to the connection's subscriptions, returns how many it now has."""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return 0
+        for topic in topics:
+            if topic not in connection.topics:
+                connection.topics.add(topic)
+                self.subscribers.setdefault(topic, set()).add(connection)
+        return len(connection.topics)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[Topic]) -> int:
+        """Removes topics from the connection's subscriptions, returns how many it has left."""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return 0
+        self._unsubscribe(connection, topics)
+        return len(connection.topics)
+
+    def _unsubscribe(self, connection: _Connection, topics: Iterable[Topic]):
+        for topic in topics:
+            connection.topics.discard(topic)
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    def set_interval(self, websocket: WebSocket, interval: float) -> float:
+        """Sets how often the connection is flushed in seconds (0 sends as soon as queued), returns it."""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return 0.0
+        connection.interval = max(0.0, interval)
+        return connection.interval
+
+    def has_subscribers(self, topic: Topic) -> bool:
+        """Lets publishers skip serializing a message nobody will receive."""
+        return topic in self.subscribers
+
+    def send_nowait(self, websocket: WebSocket, message: Frame) -> None:
+        """Queues message for a single connection, e.g. a reply to one of its requests."""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            connection.enqueue(message, None, time.perf_counter())
+
+    def broadcast_nowait(self, message: Frame, key: Optional[Hashable] = None) -> None:
+        """Queues message for every connection. Must be called on the event loop thread."""
+        now = time.perf_counter()
+        for connection in self.connections.values():
+            connection.enqueue(message, key, now)
+
+    async def broadcast(self, message: Frame, key: Optional[Hashable] = None):
+        self.broadcast_nowait(message, key)
+
+    def publish_nowait(
+        self,
+        topic: Topic,
+        message: Frame,
+        source_time: Optional[float] = None,
+        key: Optional[Hashable] = None,
+    ) -> None:
+        """
+        Queues message for the connections subscribed to topic. Must be called on the event
+        loop thread.
+
+        key is the coalescing key, the topic when omitted; messages that must not replace
+        each other within a topic (e.g. the five MarketDepth levels) need distinct keys.
+        source_time is the exchange timestamp of the tick (epoch seconds), when given the
+        writers measure the feed latency from it up to the send.
+        """
+        subscribers = self.subscribers.get(topic)
+        if not subscribers:
+            return
+        now = time.perf_counter()
+        if key is None:
+            key = topic
+        for connection in subscribers:
+            connection.enqueue(message, key, now, source_time)
+
+    async def publish(
+        self,
+        topic: Topic,
+        message: Frame,
+        source_time: Optional[float] = None,
+        key: Optional[Hashable] = None,
+    ):
+        self.publish_nowait(topic, message, source_time, key)
+
+    async def _writer(self, connection: _Connection):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await connection.ready.wait()
+                if connection.interval:
+                    # Let ticks accumulate, and replace each other per key, until the next flush is due
+                    delay = connection.last_flush + connection.interval - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    connection.last_flush = loop.time()
+                connection.ready.clear()
+                if not connection.pending:
+                    continue
+                # Lag is measured per burst: from the oldest message being queued until the queue is written
+                queued_at = next(iter(connection.pending.values()))[1]
+                # Send timeouts are enforced by _watch_sends, asyncio.wait_for would start a task for every send
+                connection.sending = True
+                # Send what is queued now, ticks arriving meanwhile set ready and wait for the next flush
+                for _ in range(len(connection.pending)):
+                    if not connection.pending:
+                        break
+                    _, (message, _, source_time) = connection.pending.popitem(last=False)
+                    if isinstance(message, bytes):
+                        await connection.websocket.send_bytes(message)
+                    else:
+                        await connection.websocket.send_text(message)
+                    connection.sent += 1
+                    if source_time is not None:
+                        connection.feed_latency = time.time() - source_time
+                        connection.max_feed_latency = max(connection.max_feed_latency, connection.feed_latency)
+                connection.sending = False
+                connection.last_lag = time.perf_counter() - queued_at
+                connection.max_lag = max(connection.max_lag, connection.last_lag)
+        except asyncio.CancelledError:
+            if not connection.timed_out:
+                raise
+            print(f"Evicting WebSocket connection {connection.id}: no send completed in {self.send_timeout}s")
+            await self._evict(connection)
+        except Exception as e:
+            print(f"Evicting WebSocket connection {connection.id}: {type(e).__name__} {e}")
+            await self._evict(connection)
+
+    async def _watch_sends(self):
+        """
+        Cancels the writers that completed no send for a whole send_timeout while sending
+        (evicted between one and two send_timeouts after they got stuck). Runs while anyone
+        is connected.
+        """
+        while self.connections:
+            await asyncio.sleep(self.send_timeout)
+            for connection in list(self.connections.values()):
+                if connection.sending and connection.sent == connection.watched_sent and not connection.timed_out:
+                    connection.timed_out = True
+                    connection.writer.cancel()
+                connection.watched_sent = connection.sent if connection.sending else -1
+
+    async def _evict(self, connection: _Connection):
+        if self.connections.get(connection.websocket) is connection:
+            del self.connections[connection.websocket]
+            self._unsubscribe(connection, list(connection.topics))
+            self.evicted += 1
+        try:
+            await connection.websocket.close()
+        except Exception:
+            pass
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+    def stats(self) -> Dict[str, Any]:
+        connections = [connection.stats() for connection in self.connections.values()]
+        return {
+            "policy": self.policy,
+            "max_queue": self.max_queue,
+            "connections": len(connections),
+            "topics": len(self.subscribers),
+            "evicted": self.evicted,
+            "flush_interval_ms": round(self.flush_interval * 1000),
+            "queued": sum(c["queued"] for c in connections),
+            "sent": sum(c["sent"] for c in connections),
+            "dropped": sum(c["dropped"] for c in connections),
+            "coalesced": sum(c["coalesced"] for c in connections),
+            "max_lag_ms": max((c["max_lag_ms"] for c in connections), default=0.0),
+            "max_feed_latency_ms": max((c["max_feed_latency_ms"] for c in connections), default=0.0),
+            "per_connection": connections,
+        }
 
 connection_manager = ConnectionManager()
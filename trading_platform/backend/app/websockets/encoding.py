@@ -0,0 +1,47 @@
+import json
+from typing import Any, Callable, Union
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson is in requirements.txt, the stdlib encoder keeps things working without it
+    orjson = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+# A pre-serialized message: str goes out as a text frame, bytes as a binary frame
+Frame = Union[str, bytes]
+
+
+def _json_frame(payload: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload).decode()
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def get_encoder(wire_format: str = settings.WS_WIRE_FORMAT) -> Callable[[Any], Frame]:
+    """
+    Returns the function that serializes a payload into a Frame for the given wire format.
+
+    "json" produces text frames (what the dashboard's JSON.parse expects), "msgpack" produces
+    compact binary frames and needs the msgpack package.
+    """
+    if wire_format == JSON:
+        return _json_frame
+    if wire_format == MSGPACK:
+        try:
+            import msgpack
+        except ImportError as e:
+            raise RuntimeError("WS_WIRE_FORMAT=msgpack requires the msgpack package") from e
+
+        def _msgpack_frame(payload: Any) -> bytes:
+            return msgpack.packb(payload, use_bin_type=True)
+
+        return _msgpack_frame
+    raise ValueError(f"Unknown WebSocket wire format: {wire_format}")
+
+
+# Serializes a payload once; the resulting frame is shared by every connection it is sent to
+encode_frame = get_encoder()
@@ -0,0 +1,99 @@
+# Measures how many frames reach a dashboard when the feed ticks faster than it renders.
+#
+# A simulated feed publishes LTP and all five MarketDepth levels for a set of scrips at a
+# fixed rate for a few seconds. The dashboard is subscribed to every scrip and counts the
+# frames it is sent, once without conflation (flush interval 0) and once per interval.
+#
+# Usage: python scripts/bench_conflation.py [ticks per scrip per second] [seconds]
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add the backend directory to the Python path to allow imports from `app`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Settings are required to import the app, the script never connects to them
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from app.websockets.connection_manager import COALESCE_LATEST, ConnectionManager
+from app.websockets.encoding import encode_frame
+
+SCRIPS = 50
+
+
+class CountingSocket:
+    """Stands in for a connected dashboard, keeps the last frame it was sent per scrip, type and level."""
+
+    client = None
+
+    def __init__(self):
+        self.frames = 0
+        self.latest = {}
+
+    async def accept(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.frames += 1
+        message = json.loads(data)
+        self.latest[(message["data"]["Scrip Code"], message["type"], message["data"]["Level"])] = data
+
+    async def send_bytes(self, data: bytes):
+        self.frames += 1
+
+
+def topics():
+    for scrip in range(1000, 1000 + SCRIPS):
+        yield ("NSE", scrip, "LTP"), None
+        for level in range(1, 6):
+            yield ("NSE", scrip, "MarketDepth"), level
+
+
+async def run(interval: float, rate: int, seconds: float):
+    manager = ConnectionManager(max_queue=10000, policy=COALESCE_LATEST, send_timeout=60, flush_interval=interval)
+    socket = CountingSocket()
+    await manager.connect(socket)
+    manager.subscribe(socket, {topic for topic, _ in topics()})
+
+    published = 0
+    latest = {}
+    start = time.perf_counter()
+    step = 1 / rate
+    while time.perf_counter() - start < seconds:
+        for topic, level in topics():
+            message = encode_frame({"type": topic[2], "data": {"Scrip Code": topic[1], "Level": level, "Seq": published}})
+            manager.publish_nowait(topic, message, key=topic + (level,) if level else topic)
+            latest[(topic[1], topic[2], level)] = message
+            published += 1
+        await asyncio.sleep(step)
+    # Let the last flush go out
+    await asyncio.sleep(interval + 0.05)
+
+    assert socket.latest == latest, "the latest tick of a topic was not delivered"
+    stats = manager.stats()
+    manager.disconnect(socket)
+    return published, socket.frames, stats["coalesced"]
+
+
+async def main():
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    print(f"{SCRIPS} scrips x 6 topics, ~{rate} ticks/s each, {seconds:.0f}s")
+    for interval in (0.0, 0.05, 0.1, 0.25):
+        published, frames, coalesced = await run(interval, rate, seconds)
+        print(
+            f"interval {interval * 1000:>4.0f} ms  published {published:>8,}  sent {frames:>8,}"
+            f"  conflated {coalesced:>8,}  reduction {published / max(frames, 1):>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
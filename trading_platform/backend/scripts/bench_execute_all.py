@@ -0,0 +1,90 @@
+# Benchmarks the execute-all broker fan-out (login + place_order per client) against a local
+# stub broker that answers every request after a fixed latency.
+#
+# "sequential" awaits one client after another like execute_all_orders used to,
+# "concurrent" is app.services.fanout.gather_bounded as used by the endpoint now.
+#
+# Usage: python scripts/bench_execute_all.py [latency_ms] [concurrency]
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI
+
+# Add the backend directory to the Python path to allow imports from `app`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services import mofsl_api_service
+from app.services.fanout import gather_bounded
+from app.services.mofsl_api_service import AsyncMofslApiService
+
+STUB_PORT = 8765
+CLIENT_COUNTS = (1, 10, 50, 100)
+
+
+def start_stub_broker(latency):
+    stub = FastAPI()
+
+    @stub.post("/rest/login/v4/authdirectapi")
+    async def login():
+        await asyncio.sleep(latency)
+        return {"status": "SUCCESS", "AuthToken": "stub-token"}
+
+    @stub.post("/rest/trans/v1/placeorder")
+    async def place_order():
+        await asyncio.sleep(latency)
+        return {"status": "SUCCESS", "message": "Order placed", "data": {"orderid": "1"}}
+
+    server = uvicorn.Server(uvicorn.Config(stub, port=STUB_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+async def login_and_place_order(client_index):
+    service = await AsyncMofslApiService.create(
+        api_key="key", api_secret="secret", client_id=f"CLIENT{client_index}",
+        password="password", two_fa="2fa",
+    )
+    return await service.place_order({"symbol": "RELIANCE", "quantity": 1, "side": "BUY"})
+
+
+async def sequential(count, concurrency):
+    for i in range(count):
+        await login_and_place_order(i)
+
+
+async def concurrent(count, concurrency):
+    calls = [lambda i=i: login_and_place_order(i) for i in range(count)]
+    for result in await gather_bounded(calls, concurrency, 30):
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def run(label, func, count, concurrency):
+    start = time.perf_counter()
+    await func(count, concurrency)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {count:>4} clients {elapsed * 1000:>10.1f} ms")
+
+
+async def main():
+    latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 50) / 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    start_stub_broker(latency)
+    mofsl_api_service.BASE_URL = f"http://127.0.0.1:{STUB_PORT}"
+
+    print(f"broker latency {latency * 1000:.0f} ms per request, concurrency cap {concurrency}")
+    for count in CLIENT_COUNTS:
+        await run("sequential", sequential, count, concurrency)
+        await run("concurrent", concurrent, count, concurrency)
+    await mofsl_api_service.close_async_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
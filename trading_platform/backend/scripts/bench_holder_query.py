@@ -0,0 +1,123 @@
+# Seeds a trades table and compares the latency of the token holder query
+# (tokens.get_token_holders) without and with the trade indexes declared in app/models/trade.py.
+#
+# Runs against a throwaway SQLite file by default, pass a DATABASE_URL of an empty
+# PostgreSQL database to measure there (the tables are dropped at the end).
+#
+# Usage: python scripts/bench_holder_query.py [trades] [database_url]
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import and_, create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+# Add the backend directory to the Python path to allow imports from `app`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Settings are required to import the app, the script uses its own engine
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from app.models import execution  # noqa: F401 - registers the executions table
+from app.models.base import Base
+from app.models.client import Client as ClientModel
+from app.models.token import Token as TokenModel
+from app.models.trade import Trade as TradeModel, TradeStatus
+
+CLIENTS = 2_000
+TOKENS = 5_000
+OPEN_RATIO = 0.1
+CHUNK = 50_000
+QUERIES = 200
+
+
+def seed(engine, trade_count):
+    client_ids = [uuid.uuid4() for _ in range(CLIENTS)]
+    with engine.begin() as conn:
+        conn.execute(insert(ClientModel.__table__), [
+            {"id": client_id, "client_id": f"CLIENT{i}", "name": f"Client {i}", "api_key_encrypted": b"", "api_secret_encrypted": b""}
+            for i, client_id in enumerate(client_ids)
+        ])
+        conn.execute(insert(TokenModel.__table__), [
+            {"id": i, "symbol": f"TOKEN{i}", "exchange": "NSE", "description": ""} for i in range(1, TOKENS + 1)
+        ])
+
+    rng = random.Random(42)
+    for start in range(0, trade_count, CHUNK):
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "client_id": rng.choice(client_ids),
+                "token_id": rng.randint(1, TOKENS),
+                "status": TradeStatus.open if rng.random() < OPEN_RATIO else TradeStatus.closed,
+                "quantity": rng.randint(1, 100),
+                "avg_entry_price": 100.0,
+            }
+            for _ in range(min(CHUNK, trade_count - start))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(TradeModel.__table__), rows)
+
+
+def holder_query_latency(session_factory):
+    rng = random.Random(7)
+    timings = []
+    db = session_factory()
+    try:
+        for _ in range(QUERIES):
+            token_id = rng.randint(1, TOKENS)
+            start = time.perf_counter()
+            db.query(ClientModel, TradeModel).join(TradeModel).filter(
+                and_(TradeModel.token_id == token_id, TradeModel.status == TradeStatus.open)
+            ).all()
+            timings.append(time.perf_counter() - start)
+            db.expunge_all()
+    finally:
+        db.close()
+    return statistics.median(timings) * 1000, max(timings) * 1000
+
+
+def analyze(engine):
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def main():
+    trade_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    database_url = sys.argv[2] if len(sys.argv) > 2 else "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_holders.db")
+
+    engine = create_engine(database_url)
+    session_factory = sessionmaker(bind=engine)
+    trade_indexes = list(TradeModel.__table__.indexes)
+
+    Base.metadata.create_all(engine)
+    for index in trade_indexes:
+        index.drop(engine)
+
+    start = time.perf_counter()
+    seed(engine, trade_count)
+    analyze(engine)
+    print(f"seeded {trade_count:,} trades in {time.perf_counter() - start:.1f} s ({engine.dialect.name})")
+
+    median, worst = holder_query_latency(session_factory)
+    print(f"{'without indexes':<16} median {median:>9.3f} ms   max {worst:>9.3f} ms")
+
+    for index in trade_indexes:
+        index.create(engine)
+    analyze(engine)
+
+    median, worst = holder_query_latency(session_factory)
+    print(f"{'with indexes':<16} median {median:>9.3f} ms   max {worst:>9.3f} ms")
+
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Counts the SQL statements issued by /orders/execute-all and /orders/exit-token for a basket
+# of clients, with MOFSL answered by an in-process stub, against an in-memory SQLite database
+# (aiosqlite).
+#
+# The statement count must not grow with the number of clients: clients and open trades are
+# loaded with IN queries and the trades / executions are written in a single transaction.
+#
+# Usage: python scripts/bench_order_queries.py [clients]
+
+import asyncio
+import itertools
+import os
+import sys
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Add the backend directory to the Python path to allow imports from `app`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Settings are required to import the app, the script never connects to them
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from app.api.endpoints import orders
+from app.core.security import encrypt
+from app.models import client, execution, token, trade  # noqa: F401 - registers the tables
+from app.models.base import Base
+from app.models.client import Client as ClientModel
+from app.schemas.order import OrderPayload, TokenExitPayload
+from app.services import mofsl_api_service
+
+order_ids = itertools.count(1)
+
+
+def stub_broker(request):
+    path = request.url.path
+    if path.endswith("authdirectapi"):
+        return httpx.Response(200, json={"status": "SUCCESS", "AuthToken": "stub-token"})
+    if path.endswith("getposition"):
+        return httpx.Response(200, json={"status": "SUCCESS", "data": [
+            {"symbol": "RELIANCE", "buyquantity": 10, "sellquantity": 0, "LTP": 2500.5},
+        ]})
+    return httpx.Response(200, json={"status": "SUCCESS", "message": "Order placed", "data": {"orderid": str(next(order_ids))}})
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+
+async def count(label, counter, endpoint, payload, db):
+    counter.count = 0
+    responses = await endpoint(payload, db)
+    ok = sum(response.status == "SUCCESS" for response in responses)
+    print(f"{label:<12} {len(responses):>5} clients {ok:>5} succeeded {counter.count:>5} SQL statements")
+
+
+async def main():
+    client_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(engine, expire_on_commit=False)()
+    counter = StatementCounter(engine.sync_engine)
+
+    clients = [
+        ClientModel(client_id=f"CLIENT{i}", name=f"Client {i}", api_key_encrypted=encrypt("key"), api_secret_encrypted=encrypt("secret"))
+        for i in range(client_count)
+    ]
+    db.add_all(clients)
+    await db.commit()
+    client_ids = [client.id for client in clients]
+
+    mofsl_api_service._async_client = httpx.AsyncClient(transport=httpx.MockTransport(stub_broker))
+
+    buy = OrderPayload(
+        token_symbol="RELIANCE", token_exchange="NSE", trade_type="INTRADAY", order_type="MARKET", buy_or_sell="BUY",
+        client_orders=[{"client_id": client_id, "quantity": 10} for client_id in client_ids],
+    )
+    await count("execute-all", counter, orders.execute_all_orders, buy, db)
+
+    exit_payload = TokenExitPayload(token_symbol="RELIANCE", token_exchange="NSE", clients_to_exit=client_ids)
+    await count("exit-token", counter, orders.exit_token_for_clients, exit_payload, db)
+
+    await mofsl_api_service.close_async_client()
+    await db.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+# Benchmarks decoding of MOFSL broadcast messages (30-byte frames) in frames/second.
+#
+# "before" is the original per-frame slicing loop that used to live in Packet_Parsing,
+# "after" is MOFSLOPENAPI.DecodeBroadcastFrames (frames grouped by message type into typed
+# columns) and the full Packet_Parsing dispatch, which hands every group to its handler at once.
+#
+# Usage: python scripts/bench_packet_parsing.py [scrips] [messages]
+
+import os
+import sys
+import time
+from datetime import datetime
+from struct import pack
+
+# Add the repository root to the Python path to allow importing MOFSLOPENAPI
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from MOFSLOPENAPI import MOFSLOPENAPI, DecodeBroadcastFrames, AddBroadcastSubscriber
+
+
+class BenchFeed(MOFSLOPENAPI):
+    """Feed that skips the network bound constructor and only counts decoded ticks."""
+
+    def __init__(self, scrips):
+        self.ticks = 0
+        self.InitBroadcastState()
+        for scrip in scrips:
+            AddBroadcastSubscriber(self.m_ScripSubscriptions, ("N", scrip), None)
+
+    def _Broadcast_on_message(self, ws1, message_type, message):
+        self.ticks += 1
+
+
+def build_message(scrips):
+    """One websocket message carrying an LTP frame and a depth frame for every scrip."""
+    now = int(time.time() - datetime(1980, 1, 1).timestamp())
+    frames = []
+    for scrip in scrips:
+        frames.append(pack("<cii c fiifi", b"N", scrip, now, b"A", 2500.55, 10, 1000, 2499.75, 0))
+        frames.append(pack("<cii c fih fih", b"N", scrip, now, b"B", 2500.5, 25, 3, 2500.6, 40, 2))
+    return b"".join(frames)
+
+
+def legacy_decode(msg):
+    """The decoding loop Packet_Parsing used before DecodeBroadcastFrames."""
+    l_Response30bytes = []
+    l_headerdecodedlist = []
+    for i in range(0, len(msg), 30):
+        l_Response30bytes.append(msg[i:i + 30])
+
+    for i in l_Response30bytes:
+        b_exchange, b_scrip, b_time, b_msgtype = i[:1], i[1:5], i[5:9], i[9:10]
+        b_20bytesbody = i[10:30]
+
+        exchange = b_exchange.decode()
+        scrip = int.from_bytes(b_scrip, byteorder="little", signed=True)
+        epoch1 = int.from_bytes(b_time, byteorder="little", signed=True)
+        epoch2 = datetime(1980, 1, 1, 0, 0, 0).timestamp()
+        my_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(epoch1 + epoch2))
+        msgtype = b_msgtype.decode()
+
+        l_headerdecodedlist.extend((exchange, scrip, my_time, msgtype, b_20bytesbody))
+
+    return [l_headerdecodedlist[i:i + 5] for i in range(0, len(l_headerdecodedlist), 5)]
+
+
+def run(label, func, message, messages):
+    frames = len(message) // 30
+    start = time.perf_counter()
+    for _ in range(messages):
+        func(message)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {frames * messages / elapsed:>14,.0f} frames/s")
+
+
+def main():
+    scrip_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    scrips = range(1000, 1000 + scrip_count)
+    message = build_message(scrips)
+    feed = BenchFeed(scrips)
+
+    print(f"{scrip_count} scrips, {len(message) // 30} frames per message, {messages} messages")
+    run("header decode (before)", legacy_decode, message, messages)
+    run("header decode (after)", DecodeBroadcastFrames, message, messages)
+    run("Packet_Parsing + handlers", feed.Packet_Parsing, message, messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Benchmarks subscribing a watchlist on the MOFSL broadcast feed.
+#
+# Compares one Register call per scrip (login packet + register packet + log line each) with a
+# single RegisterMany call (one login packet, one coalesced write of all register packets).
+#
+# Usage: python scripts/bench_register.py [scrips] [rounds]
+
+import os
+import sys
+import time
+
+# Add the repository root to the Python path to allow importing MOFSLOPENAPI
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from MOFSLOPENAPI import MOFSLOPENAPI
+
+
+class CountingSocket:
+    """Stands in for the broadcast websocket and counts writes."""
+
+    def __init__(self):
+        self.writes = 0
+        self.bytes = 0
+
+    def send(self, data):
+        self.writes += 1
+        self.bytes += len(data)
+
+
+class BenchFeed(MOFSLOPENAPI):
+    """Feed that skips the network bound constructor."""
+
+    def __init__(self):
+        self.m_strMOFSLToken = "bench-token"
+        self.m_clientcode = "BENCH01"
+        self.ws1 = CountingSocket()
+        self.InitBroadcastState()
+
+
+def run(label, subscribe, scrips, rounds):
+    elapsed = 0.0
+    for _ in range(rounds):
+        feed = BenchFeed()
+        start = time.perf_counter()
+        subscribe(feed, scrips)
+        elapsed += time.perf_counter() - start
+    print(f"{label:<24} {elapsed / rounds * 1000:>9.2f} ms  {feed.ws1.writes:>5} writes  {feed.ws1.bytes:>6} bytes")
+
+
+def register_each(feed, scrips):
+    for exchange, exchangetype, scripcode in scrips:
+        feed.Register(exchange, exchangetype, scripcode)
+
+
+def register_many(feed, scrips):
+    feed.RegisterMany(scrips)
+
+
+def main():
+    scrip_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    scrips = [("NSE", "CASH", scripcode) for scripcode in range(1000, 1000 + scrip_count)]
+
+    print(f"Subscribing {scrip_count} scrips, average of {rounds} rounds")
+    run("Register (before)", register_each, scrips, rounds)
+    run("RegisterMany (after)", register_many, scrips, rounds)
+
+
+if __name__ == "__main__":
+    main()
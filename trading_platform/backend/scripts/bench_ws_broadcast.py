@@ -0,0 +1,125 @@
+# Benchmarks tick fan-out to connected dashboards in ticks/second at 1, 50 and 500 connections.
+#
+# Dashboards are in-process sockets that do what the ASGI server does with every send: a text
+# message is UTF-8 encoded, then framed with the websockets library. Nothing reaches a network.
+#
+# "before" is the original path: json.dumps per tick and ConnectionManager.broadcast awaiting
+# send_text on every connection in turn. "after" is app.websockets.encoding (one frame per
+# tick) queued by ConnectionManager and sent by the per-connection writer tasks.
+#
+# Usage: python scripts/bench_ws_broadcast.py [ticks]
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add the backend directory to the Python path to allow imports from `app`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Settings are required to import the app, the script never connects to them
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from websockets.frames import Frame, Opcode
+
+from app.websockets.connection_manager import DROP_OLDEST, ConnectionManager
+from app.websockets.encoding import JSON, MSGPACK, get_encoder
+
+
+class BenchSocket:
+    """Stands in for a connected dashboard, counts what the server would write to it."""
+
+    client = None
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.write(Frame(Opcode.TEXT, data.encode("utf-8")))
+
+    async def send_bytes(self, data: bytes):
+        self.write(Frame(Opcode.BINARY, data))
+
+    def write(self, frame: Frame):
+        self.frames += 1
+        self.bytes += len(frame.serialize(mask=False, extensions=[]))
+
+
+def build_tick(i: int):
+    return {
+        "type": "LTP",
+        "data": {
+            "Exchange": "NSE",
+            "Scrip Code": 1000 + i % 300,
+            "Time": "2024-01-01 09:15:00",
+            "LTP_Rate": 2500.55 + i % 100 / 20,
+            "LTP_Qty": 10,
+            "LTP_Cumulative Qty": 1000 + i,
+            "LTP_AvgTradePrice": 2499.75,
+            "LTP_Open Interest": 0,
+        },
+    }
+
+
+async def run_before(sockets, ticks):
+    # The broadcast loop as it was before the per-connection send queues
+    for i in range(ticks):
+        message = json.dumps(build_tick(i))
+        for socket in sockets:
+            await socket.send_text(message)
+
+
+async def run_after(sockets, ticks, encode):
+    manager = ConnectionManager(max_queue=ticks, policy=DROP_OLDEST, send_timeout=60, flush_interval=0)
+    for socket in sockets:
+        await manager.connect(socket)
+    for i in range(ticks):
+        manager.broadcast_nowait(encode(build_tick(i)))
+        if i % 100 == 99:
+            # Let the writers run, as the event loop would between feed messages
+            await asyncio.sleep(0)
+    while any(connection.sent < ticks for connection in manager.connections.values()):
+        await asyncio.sleep(0)
+    for socket in sockets:
+        manager.disconnect(socket)
+
+
+async def measure(label, dashboards, ticks, run, *args):
+    sockets = [BenchSocket() for _ in range(dashboards)]
+    start = time.perf_counter()
+    await run(sockets, ticks, *args)
+    elapsed = time.perf_counter() - start
+    assert all(socket.frames == ticks for socket in sockets), "frames were dropped"
+    frame_size = sockets[0].bytes / ticks
+    print(f"{dashboards:>4} dashboards  {label:<34} {ticks / elapsed:>12,.0f} ticks/s  {frame_size:>5.0f} B/frame")
+
+
+async def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    variants = [("before: json.dumps, sequential send", run_before)]
+    variants.append(("after: json frame, send queues", run_after, get_encoder(JSON)))
+    try:
+        variants.append(("after: msgpack frame, send queues", run_after, get_encoder(MSGPACK)))
+    except RuntimeError as e:
+        print(f"Skipping msgpack: {e}")
+
+    for dashboards in (1, 50, 500):
+        # Keep the total number of frames per run in the same range
+        run_ticks = max(200, ticks // dashboards)
+        for label, run, *args in variants:
+            await measure(label, dashboards, run_ticks, run, *args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
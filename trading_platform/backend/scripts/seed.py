@@ -13,7 +13,7 @@ import sys
 # Add the parent directory to the Python path to allow imports from `app`
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from trading_platform.backend.app.db.session import SessionLocal
+from trading_platform.backend.app.db.session import SessionLocal, upgrade_schema
 from trading_platform.backend.app.models.token import Token as TokenModel
 
 # --- Configuration ---
@@ -24,6 +24,8 @@ CSV_PATH = './instruments (1).csv' # Update this path!
 symbol_column = 'scripshortname'    # Confirm this matches your CSV
 exchange_column = 'exchangename'    # Confirm this matches your CSV
 description_column = 'scripname'    # Confirm this matches your CSV
+scrip_code_column = 'scripcode'     # Confirm this matches your CSV, optional (links tokens to the live feed)
+exchange_type_column = 'exchangetype'  # Confirm this matches your CSV, optional (e.g. CASH, DERIVATIVES)
 # --- End Configuration ---
 
 def seed_tokens_from_csv():
@@ -41,6 +43,8 @@ def seed_tokens_from_csv():
         print(f"Error reading CSV file: {e}")
         return
 
+    # tokens.scrip_code and exchange_type are written below, add it to a database created before it existed
+    upgrade_schema()
     db: Session = SessionLocal()
     added_count = 0
 
@@ -55,12 +59,16 @@ def seed_tokens_from_csv():
             symbol = str(row[symbol_column]).strip()
             exchange = str(row[exchange_column]).strip()
             description = str(row[description_column]).strip() if description_column in row and pd.notna(row[description_column]) else ""
+            scrip_code = int(row[scrip_code_column]) if scrip_code_column in row and pd.notna(row[scrip_code_column]) else None
+            exchange_type = str(row[exchange_type_column]).strip().upper() if exchange_type_column in row and pd.notna(row[exchange_type_column]) else None
 
             # Check if the token already exists to ensure idempotency
             if (symbol, exchange) not in existing_tokens:
                 new_token = TokenModel(
                     symbol=symbol,
                     exchange=exchange,
+                    scrip_code=scrip_code,
+                    exchange_type=exchange_type,
                     description=description
                 )
                 db.add(new_token)
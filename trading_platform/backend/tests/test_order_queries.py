@@ -0,0 +1,144 @@
+# The order endpoints must issue the same number of SQL statements whatever the number of
+# clients: clients and open trades are loaded with IN queries and the trades / executions are
+# written in a single transaction. Runs them against an in-memory SQLite database (aiosqlite)
+# with MOFSL answered by an in-process stub, see also scripts/bench_order_queries.py.
+
+import asyncio
+import itertools
+import os
+import sys
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Add the backend directory to the Python path to allow imports from `app`
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Settings are required to import the app, the tests never connect to them
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.api.endpoints import orders
+from app.core.security import encrypt
+from app.models import client, execution, token, trade  # noqa: F401 - registers the tables
+from app.models.base import Base
+from app.models.client import Client as ClientModel
+from app.models.execution import Execution as ExecutionModel
+from app.models.trade import Trade as TradeModel
+from app.schemas.order import OrderPayload, TokenExitPayload
+from app.services import mofsl_api_service
+
+
+def stub_broker(failed_every=0, timeout_every=0):
+    order_ids = itertools.count(1)
+    placed = []
+
+    def handle(request):
+        path = request.url.path
+        if path.endswith("authdirectapi"):
+            return httpx.Response(200, json={"status": "SUCCESS", "AuthToken": "stub-token"})
+        if path.endswith("getposition"):
+            return httpx.Response(200, json={"status": "SUCCESS", "data": [
+                {"symbol": "RELIANCE", "buyquantity": 10, "sellquantity": 0, "LTP": 2500.5},
+            ]})
+        if path.endswith("getorderbook"):
+            return httpx.Response(200, json={"status": "SUCCESS", "data": [
+                {"uniqueorderid": order_id, "averageprice": 2499.75} for order_id in placed
+            ]})
+        order_id = next(order_ids)
+        if timeout_every and order_id % timeout_every == 0:
+            raise httpx.ReadTimeout("stub timeout", request=request)
+        if failed_every and order_id % failed_every == 0:
+            return httpx.Response(200, json={"status": "FAILURE", "message": "Insufficient margin", "data": {}})
+        placed.append(str(order_id))
+        return httpx.Response(200, json={"status": "SUCCESS", "message": "Order placed", "data": {"orderid": str(order_id)}})
+
+    return handle
+
+
+async def run_orders(client_count, failed_every=0, timeout_every=0):
+    """Buys then exits RELIANCE for client_count clients, returns (statement count, responses, executions) per endpoint."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(engine, expire_on_commit=False)()
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    clients = [
+        ClientModel(client_id=f"CLIENT{i}", name=f"Client {i}", api_key_encrypted=encrypt("key"), api_secret_encrypted=encrypt("secret"))
+        for i in range(client_count)
+    ]
+    db.add_all(clients)
+    await db.commit()
+    client_ids = [client.id for client in clients]
+
+    mofsl_api_service.session_registry.clear()
+    mofsl_api_service._async_client = httpx.AsyncClient(transport=httpx.MockTransport(stub_broker(failed_every, timeout_every)))
+    results = {}
+    try:
+        buy = OrderPayload(
+            token_symbol="RELIANCE", token_exchange="NSE", trade_type="INTRADAY", order_type="MARKET", buy_or_sell="BUY",
+            client_orders=[{"client_id": client_id, "quantity": 10} for client_id in client_ids],
+        )
+        exit_payload = TokenExitPayload(token_symbol="RELIANCE", token_exchange="NSE", clients_to_exit=client_ids)
+        for label, endpoint, payload in (
+            ("execute-all", orders.execute_all_orders, buy),
+            ("exit-token", orders.exit_token_for_clients, exit_payload),
+        ):
+            statements.clear()
+            responses = await endpoint(payload, db)
+            count = len(statements)
+            executions = (await db.execute(ExecutionModel.__table__.select())).all()
+            results[label] = (count, responses, executions)
+            results[label + " trades"] = (await db.execute(TradeModel.__table__.select())).all()
+    finally:
+        await mofsl_api_service.close_async_client()
+        await db.close()
+        await engine.dispose()
+    return results
+
+
+def test_statement_count_does_not_grow_with_clients():
+    few = asyncio.run(run_orders(2))
+    many = asyncio.run(run_orders(100))
+    for label in ("execute-all", "exit-token"):
+        few_count, _, _ = few[label]
+        many_count, responses, _ = many[label]
+        assert all(response.status == "SUCCESS" for response in responses)
+        assert many_count == few_count, f"{label}: {few_count} statements for 2 clients, {many_count} for 100"
+
+
+def test_fill_prices_are_recorded():
+    results = asyncio.run(run_orders(3))
+    assert [float(trade.avg_entry_price) for trade in results["execute-all trades"]] == [2499.75] * 3
+    assert [float(trade.exit_price) for trade in results["exit-token trades"]] == [2499.75] * 3
+    _, _, executions = results["exit-token"]
+    assert [float(execution.price) for execution in executions] == [2499.75] * 6
+
+
+def test_failed_orders_are_not_recorded():
+    results = asyncio.run(run_orders(10, failed_every=2))
+    _, responses, executions = results["execute-all"]
+    failed = [response for response in responses if response.status != "SUCCESS"]
+    assert len(failed) == 5
+    assert all(response.status == "FAILURE" and response.message == "Insufficient margin" for response in failed)
+    assert len(executions) == 5
+
+
+def test_unanswered_orders_are_unknown():
+    # Order ids 3, 6, 9 (buys) and 12, 15, 18 (exits) time out
+    results = asyncio.run(run_orders(10, timeout_every=3))
+    _, responses, executions = results["execute-all"]
+    unknown = [response for response in responses if response.status != "SUCCESS"]
+    assert len(unknown) == 3
+    assert all(response.status == "UNKNOWN" and "check the order book" in response.message for response in unknown)
+    assert len(executions) == 7
+
+    # The exits of clients 1, 4 and 7 time out, those clients still hold the position they bought
+    _, responses, executions = results["exit-token"]
+    assert [response.status for response in responses].count("UNKNOWN") == 3
+    sold = [execution for execution in executions if execution.type.name == "sell"]
+    assert len(sold) == 7 - 3